@@ -0,0 +1,108 @@
+"""
+Clarification answer extraction: local resolution rate, accuracy and speed
+
+Replays a corpus of clarification replies through PreferenceExtractor with
+the same coverage threshold as the API, and compares it with the four
+regexes it replaced.
+
+    python benchmarks/bench_preference_extractor.py --show-errors
+
+The corpus is JSON lines: {"message": "...", "missing_info": [...], "expected": {...} | null}.
+"expected": null marks replies that should be left to the LLM.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from preference_extractor import PreferenceExtractor
+
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "clarification_replies.jsonl")
+
+# The per-category regexes used before the extractor, for comparison
+LEGACY_PATTERNS = {
+    "color": (r"\b(white|black|blue|red|green|yellow|purple|gray|grey|brown|pink|orange)\b", "Color"),
+    "size": (r"\b(small|medium|large|xl|xxl|xs|s|m|l|extra large|extra small)\b|\b(size\s+\d+(\.\d+)?)\b", "Size"),
+    "budget": (r"\$\d+|\b\d+\s+dollars\b|\bunder\s+\$?\d+\b|\b\d+\s*-\s*\d+\b", "Budget"),
+    "brand": (r"\b(nike|adidas|new balance|asics|brooks|hoka|puma|reebok|saucony|under armour)\b", "Brand")
+}
+
+
+def legacy_extract(message: str, missing_info: list) -> dict:
+    missing_info_lower = [item.lower() for item in missing_info]
+    extracted = {}
+    for keyword, (pattern, category) in LEGACY_PATTERNS.items():
+        if any(keyword in item for item in missing_info_lower):
+            matches = re.findall(pattern, message.lower())
+            if matches:
+                value = next((x for x in matches[0] if x), None) if isinstance(matches[0], tuple) else matches[0]
+                if value:
+                    extracted[category] = value.capitalize()
+    return extracted
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data", default=DEFAULT_DATA, help="Clarification replies (JSON lines)")
+    arg_parser.add_argument("--min-coverage", type=float, default=float(os.getenv("PREFERENCE_LOCAL_MIN_COVERAGE", 0.75)))
+    arg_parser.add_argument("--repeat", type=int, default=500)
+    arg_parser.add_argument("--show-errors", action="store_true")
+    args = arg_parser.parse_args()
+
+    with open(args.data, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    extractor = PreferenceExtractor()
+    print(f"{len(rows)} replies, {extractor.stats()['patterns']} vocabulary patterns, automaton built in {extractor.build_seconds * 1000:.1f} ms")
+
+    resolved, exact, wrongly_resolved, errors = 0, 0, 0, []
+    legacy_resolved = 0
+    for row in rows:
+        extraction = extractor.extract(row["message"], row["missing_info"])
+        local = extraction.preferences if extraction.preferences and extraction.coverage >= args.min_coverage else None
+        if legacy_extract(row["message"], row["missing_info"]):
+            legacy_resolved += 1
+        if local is None:
+            if row["expected"] is not None:
+                errors.append(("fell back", row, extraction))
+            continue
+        resolved += 1
+        if row["expected"] is None:
+            wrongly_resolved += 1
+            errors.append(("resolved", row, extraction))
+        elif local == row["expected"]:
+            exact += 1
+        else:
+            errors.append(("mismatch", row, extraction))
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for row in rows:
+            extractor.extract(row["message"], row["missing_info"])
+    local_us = (time.perf_counter() - started) / (args.repeat * len(rows)) * 1e6
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for row in rows:
+            legacy_extract(row["message"], row["missing_info"])
+    legacy_us = (time.perf_counter() - started) / (args.repeat * len(rows)) * 1e6
+
+    answerable = sum(row["expected"] is not None for row in rows)
+    print(f"resolved locally:  {resolved}/{len(rows)} ({resolved / len(rows):.1%}); {answerable} are locally answerable")
+    print(f"exact matches:     {exact}/{resolved}" if resolved else "exact matches:     n/a")
+    print(f"wrongly resolved:  {wrongly_resolved} (should have gone to the LLM)")
+    print(f"extractor:         {local_us:.1f} us per reply")
+    print(f"legacy regexes:    {legacy_us:.1f} us per reply, {legacy_resolved} replies with any match")
+
+    if args.show_errors:
+        for kind, row, extraction in errors:
+            print(f"  {kind}: {row['message']!r} -> {extraction.preferences} (coverage {extraction.coverage}), expected {row['expected']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Hybrid product de-duplication: match accuracy and detailing work saved
+
+Scores same_product() on labelled pairs of product names, then simulates a
+hybrid merge per "same" pair (each model recommending the product under
+its own name) and reports how many detailing pipelines the merge saves.
+
+    python benchmarks/bench_product_dedupe.py --show-errors
+
+The data file is JSON lines: {"a": "...", "b": "...", "same": true|false}.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from product_dedupe import ProductDeduplicator, product_key, same_product
+
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "product_name_pairs.jsonl")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--data", default=DEFAULT_DATA, help="Labelled name pairs (JSON lines)")
+    arg_parser.add_argument("--min-similarity", type=float, default=float(os.getenv("PRODUCT_DEDUPE_MIN_SIMILARITY", 0.5)))
+    arg_parser.add_argument("--repeat", type=int, default=200)
+    arg_parser.add_argument("--show-errors", action="store_true")
+    args = arg_parser.parse_args()
+
+    with open(args.data, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    true_pos, false_pos, false_neg, errors = 0, 0, 0, []
+    for row in rows:
+        predicted = same_product(product_key(row["a"]), product_key(row["b"]), args.min_similarity)
+        if predicted and row["same"]:
+            true_pos += 1
+        elif predicted:
+            false_pos += 1
+            errors.append(("merged", row))
+        elif row["same"]:
+            false_neg += 1
+            errors.append(("missed", row))
+
+    # Two model responses per query, one product each, as the hybrid merge sees them
+    deduplicator = ProductDeduplicator(min_similarity=args.min_similarity)
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for row in rows:
+            deduplicator.dedupe([{"name": row["a"], "source": "OpenAI"}, {"name": row["b"], "source": "Perplexity"}])
+    dedupe_us = (time.perf_counter() - started) / (args.repeat * len(rows)) * 1e6
+    stats = deduplicator.stats()
+
+    same = sum(row["same"] for row in rows)
+    print(f"{len(rows)} labelled pairs ({same} same product)")
+    print(f"precision:         {true_pos}/{true_pos + false_pos}" if true_pos + false_pos else "precision:         n/a")
+    print(f"recall:            {true_pos}/{same}" if same else "recall:            n/a")
+    print(f"detailing runs:    {stats['output'] // args.repeat} instead of {stats['input'] // args.repeat} ({stats['merge_rate']:.1%} saved)")
+    print(f"dedupe:            {dedupe_us:.1f} us per pair")
+
+    if args.show_errors:
+        for kind, row in errors:
+            print(f"  {kind}: {row['a']!r} / {row['b']!r}")
+
+
+if __name__ == "__main__":
+    main()
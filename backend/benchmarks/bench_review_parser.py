@@ -0,0 +1,101 @@
+"""
+Review page parsing throughput
+
+Compares every installed parser backend on a corpus of saved review pages,
+first in-process and then through ReviewParser's process pool.
+
+    python benchmarks/bench_review_parser.py --corpus path/to/pages --workers 4
+
+The corpus is a directory of .html files (save a few real review articles
+with your browser). Without --corpus a synthetic corpus is generated.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from review_parser import ReviewParser, available_backends, extract_review_text
+
+
+WORDS = ("battery noise cancelling comfort sound bass treble latency bluetooth codec "
+         "fit weight case charging microphone call quality app equalizer price value").split()
+
+
+def synthetic_page(rng: random.Random, paragraphs: int) -> str:
+    """A review-like page with navigation, scripts and a long article body"""
+    nav = "".join(f"<li><a href='/c/{i}'>Category {i}</a></li>" for i in range(60))
+    script = "<script>" + "var x=1;" * 2000 + "</script>"
+    body = "".join(
+        "<p>" + " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120))) + "</p>"
+        for _ in range(paragraphs)
+    )
+    footer = "".join(f"<div class='related'><a href='/r/{i}'>Related article {i}</a></div>" for i in range(40))
+    return (f"<html><head><title>Review</title>{script}<style>p{{margin:0}}</style></head>"
+            f"<body><nav><ul>{nav}</ul></nav><article><h1>Review</h1>{body}</article>"
+            f"<footer>{footer}</footer></body></html>")
+
+
+def load_corpus(path: str, size: int) -> list:
+    if path:
+        pages = []
+        for name in sorted(os.listdir(path)):
+            if name.endswith((".html", ".htm")):
+                with open(os.path.join(path, name), encoding="utf-8", errors="replace") as f:
+                    pages.append(f.read())
+        if not pages:
+            raise SystemExit(f"No .html files in {path}")
+        return pages
+    rng = random.Random(42)
+    return [synthetic_page(rng, rng.randint(20, 150)) for _ in range(size)]
+
+
+def bench_inline(pages: list, backend: str, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            extract_review_text(page, backend)
+    return time.perf_counter() - started
+
+
+async def bench_pool(pages: list, backend: str, workers: int, repeat: int) -> float:
+    parser = ReviewParser(workers=workers, backend=backend)
+    try:
+        await parser.parse(pages[0])  # start the worker processes
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await asyncio.gather(*(parser.parse(page) for page in pages))
+        return time.perf_counter() - started
+    finally:
+        parser.shutdown()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--corpus", help="Directory of saved .html review pages")
+    arg_parser.add_argument("--size", type=int, default=40, help="Synthetic corpus size when --corpus is not given")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    args = arg_parser.parse_args()
+
+    pages = load_corpus(args.corpus, args.size)
+    total_mb = sum(len(page) for page in pages) / 1e6
+    print(f"{len(pages)} pages, {total_mb:.1f} MB, repeat={args.repeat}, workers={args.workers}")
+    print(f"{'backend':<12} {'mode':<8} {'pages/s':>9} {'MB/s':>7}")
+
+    for backend in available_backends():
+        for mode in ("inline", "pool"):
+            if mode == "inline":
+                seconds = bench_inline(pages, backend, args.repeat)
+            else:
+                seconds = asyncio.run(bench_pool(pages, backend, args.workers, args.repeat))
+            pages_per_second = len(pages) * args.repeat / seconds
+            mb_per_second = total_mb * args.repeat / seconds
+            print(f"{backend:<12} {mode:<8} {pages_per_second:>9.1f} {mb_per_second:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
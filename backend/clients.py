@@ -0,0 +1,132 @@
+from openai import AsyncOpenAI
+from typing import Dict, Optional
+import importlib.util
+import httpx
+import os
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Connection settings for every outbound provider
+PROVIDERS = {
+    'openai': {
+        'api_key_env': 'OPENAI_API_KEY',
+        'base_url': None
+    },
+    'perplexity': {
+        'api_key_env': 'PERPLEXITY_API_KEY',
+        'base_url': 'https://api.perplexity.ai'
+    },
+    'serper': {
+        'api_key_env': 'SERPER_API_KEY',
+        'base_url': 'https://google.serper.dev'
+    },
+    # Review pages on arbitrary sites (no key)
+    'web': {
+        'api_key_env': None,
+        'base_url': None
+    }
+}
+
+# Browser-like User-Agent for review page fetches
+WEB_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+class ClientRegistry:
+    """
+    Long-lived, pooled clients shared by every request
+
+    One httpx connection pool is kept per provider so TLS sessions and
+    keep-alive connections are reused across sessions. LLM providers are
+    exposed as AsyncOpenAI clients, Serper and review page fetches ('web')
+    as plain httpx.AsyncClients.
+    """
+
+    def __init__(self, max_connections: Optional[int] = None,
+                 max_keepalive_connections: Optional[int] = None,
+                 keepalive_expiry: Optional[float] = None,
+                 timeout: Optional[float] = None,
+                 http2: Optional[bool] = None):
+        self.max_connections = max_connections or int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+        self.max_keepalive_connections = max_keepalive_connections or int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+        self.keepalive_expiry = keepalive_expiry or float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+        self.timeout = timeout or float(os.getenv("HTTP_TIMEOUT", 60))
+
+        if http2 is None:
+            http2 = os.getenv("HTTP2", "auto").lower()
+            http2 = HTTP2_AVAILABLE if http2 == "auto" else http2 in ("1", "true", "yes")
+        if http2 and not HTTP2_AVAILABLE:
+            raise RuntimeError("HTTP/2 requested but the h2 package is not installed")
+        self.http2 = http2
+
+        self._clients: Dict[str, object] = {}
+        self._http_clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _new_http_client(self, provider: str, **kwargs) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+        http_client = httpx.AsyncClient(
+            limits=limits,
+            timeout=self.timeout,
+            http2=self.http2,
+            **kwargs
+        )
+        self._http_clients[provider] = http_client
+        return http_client
+
+    def _create(self, provider: str):
+        config = PROVIDERS[provider]
+        api_key = os.getenv(config['api_key_env']) if config['api_key_env'] else None
+
+        if provider == 'web':
+            return self._new_http_client(
+                provider,
+                follow_redirects=True,
+                headers={'User-Agent': WEB_USER_AGENT}
+            )
+        if provider == 'serper':
+            return self._new_http_client(
+                provider,
+                base_url=config['base_url'],
+                headers={
+                    'X-API-KEY': api_key or '',
+                    'Content-Type': 'application/json'
+                }
+            )
+        if not api_key:
+            raise RuntimeError(f"{config['api_key_env']} is not set")
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=config['base_url'],
+            http_client=self._new_http_client(provider)
+        )
+
+    def start(self):
+        """Create the pooled client of every configured provider (idempotent)"""
+        for provider, config in PROVIDERS.items():
+            configured = config['api_key_env'] is None or os.getenv(config['api_key_env'])
+            if provider not in self._clients and configured:
+                self._clients[provider] = self._create(provider)
+
+    def get(self, provider: str):
+        """Return the shared client for a provider, creating it on first use"""
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown provider: {provider}")
+        if provider not in self._clients:
+            self._clients[provider] = self._create(provider)
+        return self._clients[provider]
+
+    async def aclose(self):
+        """Close every connection pool (FastAPI shutdown hook)"""
+        http_clients = list(self._http_clients.values())
+        self._clients.clear()
+        self._http_clients.clear()
+        for http_client in http_clients:
+            await http_client.aclose()
+
+
+# Global registry, started and closed by the FastAPI lifecycle hooks in main.py
+registry = ClientRegistry()
@@ -0,0 +1,106 @@
+from clients import ClientRegistry
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import codecs
+import httpx
+import os
+
+# Content types worth parsing as review pages
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+
+class FetchError(Exception):
+    """A review page was rejected before or while downloading it"""
+
+
+class PageFetcher:
+    """
+    Streamed, size-limited GET for review pages
+
+    The Content-Type is checked before the body is read, and reading stops
+    at max_bytes (the page is then used truncated), so peak memory per fetch
+    is bounded by max_bytes. The raw body is returned with its charset:
+    decoding and parsing happen in the ReviewParser pool, off the event loop.
+    """
+
+    def __init__(self, registry: ClientRegistry, max_bytes: int = 2 * 1024 * 1024,
+                 timeout: float = 10.0, scheduler=None):
+        self.registry = registry
+        self.scheduler = scheduler
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.counters = {'fetched': 0, 'not_modified': 0, 'truncated': 0, 'rejected': 0, 'bytes': 0}
+
+    @staticmethod
+    def _charset(response: httpx.Response) -> str:
+        charset = response.charset_encoding or "utf-8"
+        try:
+            codecs.lookup(charset)
+        except LookupError:
+            charset = "utf-8"
+        return charset
+
+    async def fetch(self, url: str, headers: Optional[Dict] = None) -> Dict:
+        """
+        Returns {'status', 'body', 'charset', 'etag', 'last_modified', 'truncated'}
+        'body' holds the raw page bytes for status 200 and is empty otherwise.
+        Raises FetchError for non-HTML content.
+        """
+        if self.scheduler is not None:
+            # Per-host politeness: bounded concurrency and rate per site
+            async with self.scheduler.slot("web", host=urlsplit(url).hostname or ""):
+                return await self._fetch(url, headers)
+        return await self._fetch(url, headers)
+
+    async def _fetch(self, url: str, headers: Optional[Dict]) -> Dict:
+        client = self.registry.get("web")
+        async with client.stream("GET", url, headers=headers or {}, timeout=self.timeout) as response:
+            result = {
+                'status': response.status_code,
+                'body': b"",
+                'charset': self._charset(response),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'truncated': False
+            }
+            if response.status_code == 304:
+                self.counters['not_modified'] += 1
+                return result
+            if response.status_code != 200:
+                return result
+
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type and content_type not in HTML_CONTENT_TYPES:
+                self.counters['rejected'] += 1
+                raise FetchError(f"Unsupported content type: {content_type}")
+
+            chunks: List[bytes] = []
+            received = 0
+            async for chunk in response.aiter_bytes():
+                if received + len(chunk) > self.max_bytes:
+                    chunk = chunk[:self.max_bytes - received]
+                    result['truncated'] = True
+                received += len(chunk)
+                chunks.append(chunk)
+                if result['truncated']:
+                    break
+
+            self.counters['fetched'] += 1
+            self.counters['bytes'] += received
+            if result['truncated']:
+                self.counters['truncated'] += 1
+            result['body'] = b"".join(chunks)
+            return result
+
+    def stats(self) -> Dict:
+        return dict(self.counters)
+
+    @classmethod
+    def from_env(cls, registry: ClientRegistry, scheduler=None) -> "PageFetcher":
+        """Configure from REVIEW_FETCH_* environment variables"""
+        return cls(
+            registry,
+            max_bytes=int(os.getenv("REVIEW_FETCH_MAX_BYTES", 2 * 1024 * 1024)),
+            timeout=float(os.getenv("REVIEW_FETCH_TIMEOUT", 10)),
+            scheduler=scheduler
+        )
@@ -0,0 +1,236 @@
+from typing import Awaitable, Callable, Dict, List, Optional
+from resp_client import RespClient
+import asyncio
+import json
+import random
+import socket
+import time
+import uuid
+import os
+
+# Job handler: receives the job dict, raises to request a retry
+JobHandler = Callable[[Dict], Awaitable[None]]
+# Status callback: (job, status, error) with status in running/retrying/done/failed
+StatusCallback = Callable[[Dict, str, Optional[str]], Awaitable[None]]
+
+
+def new_job(kind: str, payload: Dict, max_attempts: int = 3, timeout: float = 180.0) -> Dict:
+    return {
+        'id': str(uuid.uuid4()),
+        'kind': kind,
+        'payload': payload,
+        'attempt': 0,
+        'max_attempts': max_attempts,
+        'timeout': timeout,
+        'submitted_at': time.time()
+    }
+
+
+class JobQueue:
+    """FIFO of job dicts shared by producers (web) and a WorkerPool"""
+
+    # True when workers run in a separate process
+    external = False
+
+    def __init__(self):
+        self.counters = {'submitted': 0, 'completed': 0, 'retried': 0, 'failed': 0, 'recovered': 0}
+
+    async def submit(self, job: Dict):
+        raise NotImplementedError
+
+    async def reserve(self, timeout: float = 5.0) -> Optional[Dict]:
+        """Take the next job, waiting up to timeout seconds; None if there is none"""
+        raise NotImplementedError
+
+    async def ack(self, job: Dict):
+        """The reserved job is finished (done or permanently failed)"""
+
+    async def recover(self) -> int:
+        """Requeue jobs reserved by a previous run of this worker; returns how many"""
+        return 0
+
+    async def depth(self) -> int:
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+    def stats(self) -> Dict:
+        return dict(self.counters)
+
+
+class MemoryJobQueue(JobQueue):
+    """In-process queue; the worker pool runs inside the web process"""
+
+    def __init__(self):
+        super().__init__()
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    async def submit(self, job: Dict):
+        self.counters['submitted'] += 1
+        self._queue.put_nowait(job)
+
+    async def reserve(self, timeout: float = 5.0) -> Optional[Dict]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def depth(self) -> int:
+        return self._queue.qsize()
+
+
+class RedisJobQueue(JobQueue):
+    """
+    Durable queue on a Redis list
+
+    Reserving moves a job atomically (BRPOPLPUSH) onto this worker's
+    processing list, where it stays until ack(). A restarted worker with the
+    same name puts whatever it was processing back on the queue.
+    """
+
+    external = True
+
+    def __init__(self, client: RespClient, name: str = "detailing", worker_name: Optional[str] = None):
+        super().__init__()
+        self.client = client
+        self.key = f"jobs:{name}"
+        self.worker_name = worker_name or socket.gethostname()
+        self.processing_key = f"{self.key}:processing:{self.worker_name}"
+        # Raw payloads of reserved jobs, needed to remove them on ack
+        self._reserved: Dict[str, str] = {}
+
+    async def submit(self, job: Dict):
+        self.counters['submitted'] += 1
+        await self.client.execute("LPUSH", self.key, json.dumps(job))
+
+    async def reserve(self, timeout: float = 5.0) -> Optional[Dict]:
+        raw = await self.client.execute(
+            "BRPOPLPUSH", self.key, self.processing_key, int(max(1, timeout)),
+            timeout=timeout + self.client.timeout
+        )
+        if raw is None:
+            return None
+        job = json.loads(raw)
+        self._reserved[job['id']] = raw
+        return job
+
+    async def ack(self, job: Dict):
+        raw = self._reserved.pop(job['id'], None)
+        if raw is not None:
+            await self.client.execute("LREM", self.processing_key, 1, raw)
+
+    async def recover(self) -> int:
+        recovered = 0
+        while await self.client.execute("RPOPLPUSH", self.processing_key, self.key) is not None:
+            recovered += 1
+        return recovered
+
+    async def depth(self) -> int:
+        return await self.client.execute("LLEN", self.key)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def create_job_queue(kind: str = "memory", url: Optional[str] = None, name: str = "detailing") -> JobQueue:
+    """Build a job queue by name ('memory' or 'redis')"""
+    if kind == "memory":
+        return MemoryJobQueue()
+    if kind == "redis":
+        return RedisJobQueue(RespClient(url or "redis://localhost:6379/0"), name, os.getenv("JOB_WORKER_NAME"))
+    raise ValueError(f"Unknown job queue: {kind}")
+
+
+class WorkerPool:
+    """
+    Fixed number of coroutines consuming a JobQueue
+
+    Each job runs under its own deadline. A handler error or an expired
+    deadline is retried with jittered exponential backoff until the job's
+    max_attempts is reached; the job is then reported as failed.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, JobHandler], concurrency: int = 4,
+                 on_status: Optional[StatusCallback] = None, backoff_base: float = 2.0, backoff_max: float = 30.0):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.on_status = on_status
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.running = 0
+        self._tasks: List[asyncio.Task] = []
+
+    async def _report(self, job: Dict, status: str, error: Optional[str] = None):
+        if self.on_status is not None:
+            try:
+                await self.on_status(job, status, error)
+            except Exception:
+                pass
+
+    async def _run_job(self, job: Dict):
+        handler = self.handlers.get(job['kind'])
+        while True:
+            job['attempt'] += 1
+            await self._report(job, "running")
+            try:
+                if handler is None:
+                    raise ValueError(f"No handler for job kind: {job['kind']}")
+                await asyncio.wait_for(handler(job), job.get('timeout'))
+                self.queue.counters['completed'] += 1
+                await self._report(job, "done")
+                return
+            except Exception as e:
+                error = "deadline exceeded" if isinstance(e, asyncio.TimeoutError) else str(e)
+                if handler is None or job['attempt'] >= job.get('max_attempts', 1):
+                    self.queue.counters['failed'] += 1
+                    await self._report(job, "failed", error)
+                    return
+                self.queue.counters['retried'] += 1
+                await self._report(job, "retrying", error)
+                delay = min(self.backoff_max, self.backoff_base * (2 ** (job['attempt'] - 1)))
+                await asyncio.sleep(random.uniform(0, delay))
+
+    async def _consume(self):
+        while True:
+            try:
+                job = await self.queue.reserve()
+            except Exception:
+                # Queue unreachable: back off instead of spinning
+                await asyncio.sleep(self.backoff_base)
+                continue
+            if job is None:
+                continue
+            self.running += 1
+            try:
+                await self._run_job(job)
+            finally:
+                self.running -= 1
+            # Not reached on shutdown, so an interrupted job is recovered on restart
+            await self.queue.ack(job)
+
+    async def start(self):
+        self.queue.counters['recovered'] += await self.queue.recover()
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run_forever(self):
+        await self.start()
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+    async def stats(self) -> Dict:
+        return {
+            **self.queue.stats(),
+            'queued': await self.queue.depth(),
+            'running': self.running,
+            'workers': len(self._tasks)
+        }
@@ -0,0 +1,133 @@
+from clients import registry
+from outbound import scheduler
+from collections import deque
+from typing import AsyncIterator, List, Dict, Optional
+import asyncio
+import time
+
+# Default model per provider when the caller does not pass one
+DEFAULT_MODELS = {
+    'openai': 'gpt-4o-2024-11-20',
+    'perplexity': 'sonar-pro'
+}
+
+
+class LatencyTracker:
+    """Rolling per-provider latency samples with tail percentiles"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._outcomes: Dict[str, Dict[str, int]] = {}
+
+    def record(self, provider: str, seconds: float, outcome: str = "ok"):
+        self._samples.setdefault(provider, deque(maxlen=self.window)).append(seconds)
+        outcomes = self._outcomes.setdefault(provider, {})
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    @staticmethod
+    def _percentile(ordered: List[float], pct: float) -> float:
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+        return ordered[index]
+
+    def summary(self) -> Dict:
+        result = {}
+        for provider, samples in self._samples.items():
+            ordered = sorted(samples)
+            result[provider] = {
+                'count': len(ordered),
+                'p50_ms': round(self._percentile(ordered, 50) * 1000, 1),
+                'p95_ms': round(self._percentile(ordered, 95) * 1000, 1),
+                'p99_ms': round(self._percentile(ordered, 99) * 1000, 1),
+                'max_ms': round(ordered[-1] * 1000, 1),
+                'outcomes': dict(self._outcomes.get(provider, {}))
+            }
+        return result
+
+
+# Latency of every completion, by provider
+latency_tracker = LatencyTracker()
+
+
+async def chat_completion(provider: str, messages: List[Dict], model: Optional[str] = None, **kwargs) -> str:
+    """
+    Run a chat completion without blocking the event loop
+
+    Parameters:
+    provider (str): 'openai' or 'perplexity'
+    messages (List[Dict]): Chat messages
+    model (str): Model name, defaults to the provider's default model
+    **kwargs: Extra completion parameters (temperature, max_tokens, ...)
+
+    Returns:
+    str: Content of the first choice
+    """
+    if provider not in DEFAULT_MODELS:
+        raise ValueError(f"Unknown LLM provider: {provider}")
+
+    client = registry.get(provider)
+    async with scheduler.slot(provider):
+        # Latency excludes time queued for admission (reported by the scheduler)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await client.chat.completions.create(
+                model=model or DEFAULT_MODELS[provider],
+                messages=messages,
+                **kwargs
+            )
+            outcome = "ok"
+            return response.choices[0].message.content
+        except asyncio.CancelledError:
+            # Raised when a caller's deadline (asyncio.wait_for) expires
+            outcome = "cancelled"
+            raise
+        finally:
+            latency_tracker.record(provider, time.perf_counter() - started, outcome)
+
+
+async def embed(texts: List[str], model: str = "text-embedding-3-small") -> List[List[float]]:
+    """Return one embedding vector per input text (OpenAI embeddings API)"""
+    client = registry.get("openai")
+    async with scheduler.slot("openai"):
+        response = await client.embeddings.create(model=model, input=texts)
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+async def stream_chat_completion(provider: str, messages: List[Dict], model: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+    """
+    Stream a chat completion, yielding content deltas as the provider sends them
+
+    Time to first token is recorded under '<provider>:first_token'.
+    """
+    if provider not in DEFAULT_MODELS:
+        raise ValueError(f"Unknown LLM provider: {provider}")
+
+    client = registry.get(provider)
+    # The admission slot is held until the stream ends
+    async with scheduler.slot(provider):
+        started = time.perf_counter()
+        first_token = True
+        outcome = "error"
+        try:
+            stream = await client.chat.completions.create(
+                model=model or DEFAULT_MODELS[provider],
+                messages=messages,
+                stream=True,
+                **kwargs
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if first_token:
+                        latency_tracker.record(f"{provider}:first_token", time.perf_counter() - started)
+                        first_token = False
+                    yield delta
+            outcome = "ok"
+        except (asyncio.CancelledError, GeneratorExit):
+            outcome = "cancelled"
+            raise
+        finally:
+            latency_tracker.record(provider, time.perf_counter() - started, outcome)
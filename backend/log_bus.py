@@ -0,0 +1,101 @@
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional, Set
+import asyncio
+import datetime
+
+# Session whose request is being served; tagged onto every log record
+current_session: ContextVar[Optional[str]] = ContextVar("current_session", default=None)
+
+
+class LogSubscriber:
+    """
+    Bounded queue of log records for one connected client
+
+    offer() never blocks: when the queue is full the oldest record is
+    dropped. Drops are coalesced into a single "N log lines dropped" record
+    that is delivered ahead of the next batch.
+    """
+
+    def __init__(self, session_id: Optional[str] = None, maxsize: int = 500):
+        self.session_id = session_id
+        self._queue: Deque[Dict] = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+        self.dropped = 0
+        self._pending_drops = 0
+        self.closed = False
+
+    def wants(self, record: Dict) -> bool:
+        return self.session_id is None or record.get('session_id') == self.session_id
+
+    def offer(self, record: Dict):
+        if self.closed:
+            return
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+            self._pending_drops += 1
+        self._queue.append(record)
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def next_batch(self) -> List[Dict]:
+        """Wait for records and return everything queued (empty list once closed)"""
+        while not self._queue and not self.closed:
+            self._ready.clear()
+            await self._ready.wait()
+        batch = []
+        if self._pending_drops:
+            batch.append({
+                'timestamp': datetime.datetime.now().strftime("%H:%M:%S"),
+                'message': f"[Log] {self._pending_drops} log lines dropped (slow connection)",
+                'session_id': self.session_id
+            })
+            self._pending_drops = 0
+        batch.extend(self._queue)
+        self._queue.clear()
+        return batch
+
+
+class LogBus:
+    """Fan-out of log records to subscribers, filtered by session_id"""
+
+    def __init__(self, maxsize: int = 500):
+        self.maxsize = maxsize
+        self._subscribers: Set[LogSubscriber] = set()
+        self.published = 0
+        self._dropped_closed = 0   # drops of subscribers that have left
+
+    def subscribe(self, session_id: Optional[str] = None) -> LogSubscriber:
+        subscriber = LogSubscriber(session_id, self.maxsize)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: LogSubscriber):
+        subscriber.close()
+        if subscriber in self._subscribers:
+            self._subscribers.discard(subscriber)
+            self._dropped_closed += subscriber.dropped
+
+    def publish(self, message: str, session_id: Optional[str] = None):
+        """Queue a log line for every interested subscriber; never waits on a socket"""
+        self.published += 1
+        if not self._subscribers:
+            return
+        record = {
+            'timestamp': datetime.datetime.now().strftime("%H:%M:%S"),
+            'message': message,
+            'session_id': session_id if session_id is not None else current_session.get()
+        }
+        for subscriber in self._subscribers:
+            if subscriber.wants(record):
+                subscriber.offer(record)
+
+    def stats(self) -> Dict:
+        return {
+            'published': self.published,
+            'subscribers': len(self._subscribers),
+            'dropped': self._dropped_closed + sum(subscriber.dropped for subscriber in self._subscribers)
+        }
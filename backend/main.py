@@ -1,18 +1,35 @@
 from fastapi import FastAPI, HTTPException, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from openai import OpenAI
-from typing import List, Dict, Optional, Any
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import List, Dict, Optional, AsyncIterable, Callable, Tuple, Union
 import json
-import requests
-from bs4 import BeautifulSoup
 import time
 import datetime
 import asyncio
 import uuid
-import re
 import os
 from dotenv import load_dotenv
+import llm_gateway
+from clients import registry as client_registry
+from outbound import scheduler as outbound_scheduler
+from serper_client import SerperClient
+from session_store import SessionStore
+from job_queue import WorkerPool, create_job_queue, new_job
+from search_cache import SearchCache
+from review_store import ReviewStore
+from review_parser import ReviewParser, select_relevant_text
+from fetcher import PageFetcher
+from recommendation_cache import RecommendationCache
+from summary_cache import SummaryCache
+from query_classifier import QueryClassifier
+from preference_extractor import PreferenceExtractor
+from product_dedupe import ProductDeduplicator
+from structured_output import (BatchSummaries, ClarificationQuestions, ExtractedPreferences, ProductRecommendation,
+                               RecommendationResponse, SpecificityAnalysis, StructuredOutputError, dump_structured,
+                               normalize_structured, response_format_for, structured_completion)
+from log_bus import LogBus, current_session
+from streaming import EventSink, RecommendationFeed, RecommendationStreamParser, SessionEventBus, current_sink, format_sse
 
 # Load environment variables from .env file
 load_dotenv()
@@ -33,6 +50,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Create pooled provider clients once per process and close them on shutdown
+@app.on_event("startup")
+async def startup_clients():
+    client_registry.start()
+    app.state.session_sweeper = asyncio.create_task(
+        conversation_store.run_sweeper(float(os.getenv("SESSION_STORE_SWEEP_INTERVAL", 60)))
+    )
+    # External queues are consumed by worker.py instead
+    if detailing_pool is not None and not detailing_queue.external:
+        await detailing_pool.start()
+
+@app.on_event("shutdown")
+async def shutdown_clients():
+    app.state.session_sweeper.cancel()
+    if detailing_pool is not None:
+        await detailing_pool.stop()
+        await detailing_queue.aclose()
+    review_parser.shutdown()
+    await conversation_store.backend.aclose()
+    await client_registry.aclose()
+
 openai_model_applied="gpt-4o-2024-11-20"
 
 # Define state machine states
@@ -67,45 +105,38 @@ STATES = {
 #     is_clarified: bool                 # Flag indicating if query is clarified
 #   }
 # }
-conversation_store = {}
-
-# WebSocket Management
-active_connections: List[WebSocket] = []
-
-# WebSocket Log Handler
-class WebSocketLogHandler:
-    def __init__(self):
-        self.connections = active_connections
+# Bounded: idle sessions expire and LRU sessions are evicted past the byte budget
+conversation_store = SessionStore.from_env()
 
-    async def log(self, message: str):
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        log_data = {
-            "timestamp": timestamp,
-            "message": message
-        }
-        # Broadcast log to all connected clients
-        for connection in self.connections:
-            try:
-                await connection.send_json(log_data)
-            except:
-                continue
-
-# Create global log handler instance
-ws_logger = WebSocketLogHandler()
+# Log fan-out to /ws/logs subscribers (bounded per-subscriber queues)
+log_bus = LogBus(maxsize=int(os.getenv("LOG_SUBSCRIBER_QUEUE_SIZE", 500)))
 
 # Async logging function
 async def log(message: str):
     print(message)  # Keep console output
-    await ws_logger.log(message)
+    log_bus.publish(message)
 
 @app.websocket("/ws/logs")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, session_id: Optional[str] = None):
+    """Stream log lines; pass ?session_id= to receive only that session's logs"""
     await log(f"New WebSocket connection attempt from {websocket.client}")
+    subscriber = None
+    sender = None
     try:
         await websocket.accept()
-        active_connections.append(websocket)
+        subscriber = log_bus.subscribe(session_id)
         await log(f"WebSocket connection accepted")
         
+        # Drain the subscriber's queue; a slow socket only delays its own queue
+        async def send_logs():
+            while True:
+                batch = await subscriber.next_batch()
+                if not batch:
+                    break
+                for log_data in batch:
+                    await websocket.send_json(log_data)
+        sender = asyncio.create_task(send_logs())
+        
         while True:
             try:
                 await websocket.receive_text()
@@ -115,9 +146,11 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         await log(f"Error accepting WebSocket connection: {e}")
     finally:
+        if subscriber is not None:
+            log_bus.unsubscribe(subscriber)
+        if sender is not None:
+            sender.cancel()
         await log("WebSocket connection closed")
-        if websocket in active_connections:
-            active_connections.remove(websocket)
 
 # Request/Response Models
 class Query(BaseModel):
@@ -137,56 +170,26 @@ class Response(BaseModel):
     product_details: List[ProductDetail] = []
     session_id: str
 
+# Vocabulary-based extraction of clarification answers (brands, colors, sizes, materials, prices)
+preference_extractor = PreferenceExtractor()
+# Share of an answer's content words the local extraction must explain to skip the LLM
+PREFERENCE_LOCAL_MIN_COVERAGE = float(os.getenv("PREFERENCE_LOCAL_MIN_COVERAGE", 0.75))
+
 # Check if a user message is a potential answer to clarification questions
 async def is_clarification_answer(message: str, missing_info: List[str]) -> Dict:
     """
     Determine if a user message is answering clarification questions
     Returns extracted preferences if it is, empty dict if not
+    Answers the local extractor does not mostly explain are left to the LLM.
     """
-    # Convert missing_info to lowercase for easier matching
-    missing_info_lower = [item.lower() for item in missing_info]
-    message_lower = message.lower()
-    
-    extracted_prefs = {}
-    
-    # Common patterns for each category of missing info
-    patterns = {
-        "color": {
-            "regex": r"\b(white|black|blue|red|green|yellow|purple|gray|grey|brown|pink|orange)\b",
-            "category": "Color"
-        },
-        "size": {
-            "regex": r"\b(small|medium|large|xl|xxl|xs|s|m|l|extra large|extra small)\b|\b(size\s+\d+(\.\d+)?)\b",
-            "category": "Size"
-        },
-        "budget": {
-            "regex": r"\$\d+|\b\d+\s+dollars\b|\bunder\s+\$?\d+\b|\b\d+\s*-\s*\d+\b",
-            "category": "Budget"
-        },
-        "brand": {
-            "regex": r"\b(nike|adidas|new balance|asics|brooks|hoka|puma|reebok|saucony|under armour)\b",
-            "category": "Brand"
-        }
-    }
-    
-    # Check for possible answers
-    for category_keyword, pattern_data in patterns.items():
-        # See if this category is in missing_info
-        if any(category_keyword in item for item in missing_info_lower):
-            matches = re.findall(pattern_data["regex"], message_lower)
-            if matches:
-                # Use the first match
-                if isinstance(matches[0], tuple):
-                    # Some regex matches return tuples, get the first non-empty item
-                    value = next((x for x in matches[0] if x), None)
-                else:
-                    value = matches[0]
-                    
-                if value:
-                    extracted_prefs[pattern_data["category"]] = value.capitalize()
+    extraction = preference_extractor.extract(message, missing_info)
+    if not extraction.preferences or extraction.coverage < PREFERENCE_LOCAL_MIN_COVERAGE:
+        preference_extractor.counters['fallback'] += 1
+        return {}
     
-    await log(f"Extracted preferences from user message: {extracted_prefs}")
-    return extracted_prefs
+    preference_extractor.counters['local'] += 1
+    await log(f"Extracted preferences from user message: {extraction.preferences}")
+    return extraction.preferences
 
 # Extract keywords from follow-up questions
 async def extract_followup_keywords(followup_text: str, original_query: str,
@@ -204,8 +207,6 @@ async def extract_followup_keywords(followup_text: str, original_query: str,
     Returns:
     str: Comma-separated list of keywords representing complete user context
     """
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    
     # Build complete context prompt
     context = f"Original product search: \"{original_query}\"\n"
     
@@ -241,7 +242,8 @@ async def extract_followup_keywords(followup_text: str, original_query: str,
     try:
         await log(f"Extracting keywords from follow-up with full context: '{followup_text}'")
         
-        response = client.chat.completions.create(
+        response_text = await llm_gateway.chat_completion(
+            "openai",
             model=openai_model_applied,
             messages=[
                 {"role": "system", "content": "You are a keyword extraction specialist who maintains context continuity across multiple follow-up questions. You avoid extracting brand names and price information."},
@@ -250,7 +252,7 @@ async def extract_followup_keywords(followup_text: str, original_query: str,
             max_tokens=100
         )
         
-        keywords = response.choices[0].message.content.strip()
+        keywords = response_text.strip()
         await log(f"Extracted comprehensive context keywords: {keywords}")
         return keywords
     except Exception as e:
@@ -325,29 +327,12 @@ Example format:
     
     # Use appropriate model to generate questions
     try:
-        if model_choice == "openai":
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            response = client.chat.completions.create(
-                model=openai_model_applied,
-                messages=messages
-            )
-        else:
-            client = OpenAI(
-                api_key=PERPLEXITY_API_KEY,
-                base_url="https://api.perplexity.ai"
-            )
-            response = client.chat.completions.create(
-                model="sonar-pro", 
-                messages=messages
-            )
-        
-        response_text = response.choices[0].message.content
-        json_start = response_text.find('{')
-        json_end = response_text.rfind('}') + 1
-        
-        # Validate JSON format
-        if json_start == -1 or json_end <= json_start:
-            await log(f"Invalid JSON structure in generate_dynamic_questions: {response_text}")
+        provider, model = recommendation_provider(model_choice)
+        try:
+            questions, _ = await structured_completion(provider, model, messages, ClarificationQuestions)
+            result = dump_structured(questions)
+        except StructuredOutputError as e:
+            await log(f"Invalid JSON structure in generate_dynamic_questions: {str(e)}")
             # Provide a default question as fallback
             result = {
                 "Details": {
@@ -355,8 +340,6 @@ Example format:
                     "options": ["Budget option", "Mid-range", "Premium", "No preference"]
                 }
             }
-        else:
-            result = json.loads(response_text[json_start:json_end])
         
         await log(f"Generated {len(result)} dynamic questions")
         return result
@@ -371,19 +354,123 @@ Example format:
             }
         }
 
+# Per-provider deadline for hybrid mode (seconds)
+HYBRID_PROVIDER_TIMEOUT = float(os.getenv("HYBRID_PROVIDER_TIMEOUT", 45))
+
+# Call one provider, returning None if it fails or misses its deadline
+async def call_provider_with_deadline(provider: str, model: str, messages: List[Dict], timeout: float = None,
+                                      **kwargs) -> Optional[str]:
+    timeout = timeout or HYBRID_PROVIDER_TIMEOUT
+    started = time.perf_counter()
+    try:
+        response_text = await asyncio.wait_for(
+            llm_gateway.chat_completion(provider, model=model, messages=messages, **kwargs),
+            timeout=timeout
+        )
+        await log(f" {provider} responded in {time.perf_counter() - started:.2f}s")
+        return response_text
+    except asyncio.TimeoutError:
+        await log(f" {provider} missed its {timeout:.0f}s deadline")
+        return None
+    except Exception as e:
+        await log(f" {provider} request failed: {str(e)}")
+        return None
+
+# Validated recommendation JSON of a model response, None if it cannot be used
+def parse_recommendations(response_text: Optional[str]) -> Optional[Dict]:
+    try:
+        return dump_structured(normalize_structured(response_text, RecommendationResponse)[0])
+    except StructuredOutputError:
+        return None
+
+# Entity resolution for the hybrid merge, so each distinct product is detailed once
+product_deduplicator = ProductDeduplicator.from_env()
+
+# Cache of recommendation responses keyed on canonical query + preferences + model
+recommendation_cache = RecommendationCache.from_env(embedder=llm_gateway.embed)
+
 # Generate recommendations
-async def generate_recommendations(query: str, preferences: Dict = None, model_choice: str = "perplexity") -> str:
-    """Generate recommendations using the specified model"""
+async def generate_recommendations(query: str, preferences: Dict = None, model_choice: str = "perplexity",
+                                   on_recommendation: Callable[[Dict], None] = None,
+                                   base_query: Optional[str] = None) -> str:
+    """
+    Generate recommendations using the specified model, served from cache when possible
+    on_recommendation is called with each recommendation as soon as it has streamed in
+    base_query is the request before clarification answers were added to it; its cached
+    recommendations are reused when the answers barely change it
+    """
     await log(f"\n Generating recommendations using model: {model_choice}")
     
+    # Streaming requests (/api/chat/stream) forward output through this sink
+    sink = current_sink.get()
+    
+    cached_text = await recommendation_cache.get(query, preferences, model_choice, base_query=base_query)
+    if cached_text is not None:
+        await log(f" Using cached recommendations for: {query}")
+        if sink is not None:
+            await emit_response_text(sink, cached_text)
+        return cached_text
+    
+    # Stream single-provider completions whenever someone consumes them early
+    if (sink is not None or on_recommendation is not None) and model_choice in ("openai", "perplexity"):
+        response_text = await stream_recommendations(query, model_choice, sink, on_recommendation)
+        response_text = await validate_recommendations(query, model_choice, response_text)
+    else:
+        # Hybrid mode merges two complete responses, so it is emitted in one piece
+        response_text = await request_recommendations(query, model_choice)
+        response_text = await validate_recommendations(query, model_choice, response_text)
+        if sink is not None:
+            await emit_response_text(sink, response_text)
+    
+    # Only cache responses that carry a valid recommendations payload
+    if parse_recommendations(response_text) is not None:
+        await recommendation_cache.set(query, preferences, model_choice, response_text)
+    return response_text
+
+# Provider and model serving a single-provider model choice
+def recommendation_provider(model_choice: str) -> Tuple[str, str]:
+    if model_choice == "openai":
+        return "openai", openai_model_applied
+    return "perplexity", "sonar-pro"
+
+# response_format argument enforcing the recommendation schema, where the provider supports it
+def recommendation_format(provider: str) -> Dict:
+    response_format = response_format_for(provider, RecommendationResponse)
+    return {"response_format": response_format} if response_format else {}
+
+# Validate a recommendation response once, repairing it or asking the provider again if needed
+async def validate_recommendations(query: str, model_choice: str, response_text: str) -> str:
+    """
+    Return the response text as valid recommendation JSON (after any prose)
+    Single-provider responses that cannot be repaired are sent back to the
+    provider with the error (STRUCTURED_OUTPUT_RETRIES attempts); if that
+    fails too the text is returned unchanged.
+    """
+    try:
+        return normalize_structured(response_text, RecommendationResponse)[1]
+    except StructuredOutputError as e:
+        await log(f" Invalid recommendations response: {str(e)}")
+        if model_choice == "hybrid" or not response_text:
+            return response_text
+    
+    provider, model = recommendation_provider(model_choice)
+    try:
+        _, response_text = await structured_completion(
+            provider, model, build_recommendation_messages(query), RecommendationResponse, response_text=response_text
+        )
+        await log(f" Recommendations corrected by {provider}")
+    except StructuredOutputError as e:
+        await log(f" Recommendations still invalid after retries: {str(e)}")
+    return response_text
+
+# Construct recommendation messages for the API
+def build_recommendation_messages(query: str) -> List[Dict]:
     # # Build enhanced query with user preferences
     # TODO: REMOVE THIS AS query is already enhanced with preferences
     # enhanced_query = query
     # if preferences and len(preferences) > 0:
     #     enhanced_query += f" based on user preferences: {json.dumps(preferences)}"
-    
-    # Construct messages for the API
-    messages = [
+    return [
         {
             "role": "system",
             "content": "You are a knowledgeable and engaging shopping assistant, acting as a personal researcher and advisor. Your goal is to analyze and present product recommendations in a clear, insightful, and conversational manner—like a helpful shopping guide reporting findings."
@@ -393,6 +480,45 @@ async def generate_recommendations(query: str, preferences: Dict = None, model_c
             "content": query + structure_schema
         }
     ]
+
+# Stream recommendations from a single provider
+async def stream_recommendations(query: str, model_choice: str, sink: Optional[EventSink] = None,
+                                 on_recommendation: Callable[[Dict], None] = None) -> str:
+    """Forward provider tokens and each completed recommendation object as they arrive"""
+    provider, model = recommendation_provider(model_choice)
+    
+    await log(f" Streaming recommendations from {provider}")
+    await log(f" Enhanced query: {query}")
+    
+    parser = RecommendationStreamParser()
+    async for delta in llm_gateway.stream_chat_completion(
+        provider,
+        model=model,
+        messages=build_recommendation_messages(query),
+        **recommendation_format(provider)
+    ):
+        if sink is not None:
+            await sink.emit("token", {"text": delta})
+        for recommendation in parser.feed(delta):
+            if on_recommendation is not None:
+                on_recommendation(recommendation)
+            if sink is not None:
+                await sink.emit("recommendation", {"index": parser.count - 1, "recommendation": recommendation})
+    
+    await log(f" Streamed {parser.count} recommendations from {provider}")
+    return parser.text
+
+# Send an already complete response (cache hit, hybrid merge) to the event sink
+async def emit_response_text(sink: EventSink, response_text: str):
+    await sink.emit("token", {"text": response_text})
+    parser = RecommendationStreamParser()
+    for index, recommendation in enumerate(parser.feed(response_text)):
+        await sink.emit("recommendation", {"index": index, "recommendation": recommendation})
+
+# Request recommendations from the selected model(s)
+async def request_recommendations(query: str, model_choice: str = "perplexity") -> str:
+    """Call the recommendation model(s) without consulting the cache"""
+    messages = build_recommendation_messages(query)
     
     await log(f" Enhanced query: {query}")
     
@@ -400,60 +526,44 @@ async def generate_recommendations(query: str, preferences: Dict = None, model_c
         if model_choice == "openai":
             # Use OpenAI for recommendations
             await log(f" Using OpenAI API")
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            response = client.chat.completions.create(
+            return await llm_gateway.chat_completion(
+                "openai",
                 model=openai_model_applied,
-                messages=messages
+                messages=messages,
+                **recommendation_format("openai")
             )
-            return response.choices[0].message.content
             
         elif model_choice == "hybrid":
             # Get recommendations from both models and combine them
             await log(f" Using hybrid approach with both models")
             
-            # Get Perplexity response
-            perplexity_client = OpenAI(
-                api_key=PERPLEXITY_API_KEY,
-                base_url="https://api.perplexity.ai"
-            )
-            perplexity_response = perplexity_client.chat.completions.create(
-                model="sonar-pro",
-                messages=messages
-            )
-            
-            # Get OpenAI response
-            openai_client = OpenAI(api_key=OPENAI_API_KEY)
-            openai_response = openai_client.chat.completions.create(
-                model=openai_model_applied,
-                messages=messages
+            # Query both providers concurrently, each bounded by its own deadline
+            perplexity_text, openai_text = await asyncio.gather(
+                call_provider_with_deadline("perplexity", "sonar-pro", messages,
+                                            **recommendation_format("perplexity")),
+                call_provider_with_deadline("openai", openai_model_applied, messages,
+                                            **recommendation_format("openai"))
             )
             
             # Combine recommendations
             await log(f" Combining recommendations from both models")
             
             try:
-                # Parse responses to get structured data
-                perplexity_text = perplexity_response.choices[0].message.content
-                openai_text = openai_response.choices[0].message.content
-                
                 # Extract JSON from both responses
-                perplexity_json_start = perplexity_text.find('{')
-                perplexity_json_end = perplexity_text.rfind('}') + 1
+                perplexity_json = parse_recommendations(perplexity_text)
+                openai_json = parse_recommendations(openai_text)
                 
-                openai_json_start = openai_text.find('{')
-                openai_json_end = openai_text.rfind('}') + 1
+                # Degrade to whichever provider produced usable JSON
+                if perplexity_json is None and openai_json is None:
+                    raise Exception("Neither provider returned valid recommendations in time")
                 
-                # Validate JSON markers
-                if perplexity_json_start == -1 or perplexity_json_end <= perplexity_json_start:
-                    await log(f" Invalid JSON structure in Perplexity response")
-                    return openai_response.choices[0].message.content
+                if perplexity_json is None:
+                    await log(f" Invalid or missing Perplexity response, using OpenAI only")
+                    return openai_text
                 
-                if openai_json_start == -1 or openai_json_end <= openai_json_start:
-                    await log(f" Invalid JSON structure in OpenAI response")
-                    return perplexity_response.choices[0].message.content
-                
-                perplexity_json = json.loads(perplexity_text[perplexity_json_start:perplexity_json_end])
-                openai_json = json.loads(openai_text[openai_json_start:openai_json_end])
+                if openai_json is None:
+                    await log(f" Invalid or missing OpenAI response, using Perplexity only")
+                    return perplexity_text
                 
                 # Get recommendations from each model
                 perplexity_recommendations = perplexity_json.get("recommendations", [])
@@ -466,8 +576,11 @@ async def generate_recommendations(query: str, preferences: Dict = None, model_c
                 for rec in openai_recommendations:
                     rec["source"] = "OpenAI"
                 
-                # Simply combine all recommendations
-                combined_recommendations = openai_recommendations + perplexity_recommendations
+                # Combine recommendations, merging products both models recommended
+                combined_recommendations = product_deduplicator.dedupe(openai_recommendations + perplexity_recommendations)
+                merged_count = len(openai_recommendations) + len(perplexity_recommendations) - len(combined_recommendations)
+                if merged_count:
+                    await log(f" Merged {merged_count} duplicate recommendations across models")
                 
                 # Create a combined overview
                 combined_overview = "Based on recommendations from multiple AI models: "
@@ -495,54 +608,46 @@ async def generate_recommendations(query: str, preferences: Dict = None, model_c
                 return combined_text
                 
             except Exception as e:
-                # If combination fails, fall back to Perplexity response
+                # If combination fails, fall back to whichever response we have
                 await log(f" Error combining recommendations: {str(e)}")
-                await log(f" Falling back to Perplexity response")
-                return perplexity_response.choices[0].message.content
+                if not (perplexity_text or openai_text):
+                    raise
+                await log(f" Falling back to {'Perplexity' if perplexity_text else 'OpenAI'} response")
+                return perplexity_text or openai_text
             
         else:
             # Default to Perplexity
             await log(f" Using Perplexity API")
-            client = OpenAI(
-                api_key=PERPLEXITY_API_KEY,
-                base_url="https://api.perplexity.ai"
-            )
-            response = client.chat.completions.create(
+            return await llm_gateway.chat_completion(
+                "perplexity",
                 model="sonar-pro",
-                messages=messages
+                messages=messages,
+                **recommendation_format("perplexity")
             )
-            return response.choices[0].message.content
             
     except Exception as e:
         await log(f" Error generating recommendations: {str(e)}")
         raise
 
+# Shared Serper client: pooled connections, retries, in-flight request coalescing
+# and a TTL/LRU result cache (SEARCH_CACHE_* env vars select memory or disk backend)
+search_cache = SearchCache.from_env()
+serper_client = SerperClient(client_registry, log=log, cache=search_cache, scheduler=outbound_scheduler)
+
 # Search products using Serper API
 async def search_with_serper(query: str, search_type: str) -> Dict:
-    url = "https://google.serper.dev/search"
-    headers = {
-        'X-API-KEY': SERPER_API_KEY,
-        'Content-Type': 'application/json'
-    }
+    path, payload = SerperClient.build_request(query, search_type)
     
     # Handle shopping and review searches differently
     if search_type == 'buy':
-        url = "https://google.serper.dev/shopping"
-        payload = {'q': f"{query}"}
-        await log(f"[Serper Shopping API] Making request to {url}")
-        await log(f"[Serper Shopping API] Query: {query}")
+        await log(f"[Serper Shopping API] Making request to {path}")
+        await log(f"[Serper Shopping API] Query: {payload['q']}")
     else:
-        payload = {
-            'q': f"{query} expert review",
-            'num': 3
-        }
-        await log(f"[Serper Search] Making request to {url}")
-        await log(f"[Serper Search] Query: {query} expert review")
+        await log(f"[Serper Search] Making request to {path}")
+        await log(f"[Serper Search] Query: {payload['q']}")
     
     try:
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        result = response.json()
+        result = await serper_client.search(query, search_type)
         if search_type == 'buy':
             await log(f"[Serper Shopping API] Found {len(result.get('shopping', []))} shopping results")
         else:
@@ -606,45 +711,35 @@ async def handle_initial_query(session_id: str, query: Query) -> Response:
         conversation_store[session_id]['is_clarified'] = True
         
         # Get recommendations
-        response_text = await generate_recommendations(
-            query.message, 
-            query.preferences, 
-            query.model_choice
+        response_text, feed = await generate_recommendations_with_details(
+            session_id,
+            query.message,
+            query.preferences,
+            query.model_choice,
+            query_message=query.message,
+            is_followup=False
         )
         
         # Process recommendations
         try:
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
+            recommendations = parse_recommendations(response_text)
             
-            if json_start == -1 or json_end <= json_start:
+            if recommendations is None:
                 await log(f"Invalid JSON structure in recommendations response: {response_text}")
+                conversation_store[session_id]['state'] = STATES["ERROR"]
                 return Response(
                     response=response_text,
                     product_details=[],
                     session_id=session_id
                 )
             
-            json_str = response_text[json_start:json_end]
-            recommendations = json.loads(json_str)
-            
             # Store recommendations and update state
             if 'recommendations' in recommendations:
                 conversation_store[session_id]['previous_recommendations'] = recommendations['recommendations']
                 conversation_store[session_id]['state'] = STATES["RECOMMENDING"]
             
-            # Start background details fetching
-            background_task = asyncio.create_task(
-                fetch_product_details_improved(
-                    session_id, 
-                    query.message, 
-                    recommendations.get('recommendations', []),
-                    is_followup=False
-                )
-            )
-            
-            # Store background task
-            conversation_store[session_id]['background_task'] = background_task
+            # Hand the complete list to detailing (products already streamed are skipped)
+            feed.finish(recommendations.get('recommendations', []))
             
             # Update state to "searching"
             conversation_store[session_id]['state'] = STATES["SEARCHING"]
@@ -655,20 +750,27 @@ async def handle_initial_query(session_id: str, query: Query) -> Response:
                 session_id=session_id
             )
                 
-        except json.JSONDecodeError as json_error:
-            await log("JSON Parsing Error: " + str(json_error))
-            conversation_store[session_id]['state'] = STATES["ERROR"]
-            return Response(response=response_text, product_details=[], session_id=session_id)
+        finally:
+            # Stop detailing if no recommendations were handed over
+            if not feed.closed:
+                stop_product_details(session_id, feed)
     
     # Need to analyze query - enter analyzing state
     conversation_store[session_id]['state'] = STATES["ANALYZING_QUERY"]
     
+    # Optionally start generating recommendations while the analysis runs
+    speculation = start_speculative_recommendations(query)
+    
     # Analyze query specificity
-    analysis_result = await analyze_query_specificity(
-        query.message, 
-        query.preferences, 
-        query.model_choice
-    )
+    try:
+        analysis_result = await analyze_query_specificity(
+            query.message, 
+            query.preferences, 
+            query.model_choice
+        )
+    except BaseException:
+        cancel_speculative_recommendations(speculation)
+        raise
     
     # Update session and decide next step
     conversation_store[session_id]['state'] = analysis_result["next_state"]
@@ -677,6 +779,9 @@ async def handle_initial_query(session_id: str, query: Query) -> Response:
     
     # If clarification needed
     if analysis_result["next_state"] == STATES["CLARIFYING"]:
+        # Finished in the background, the speculation serves the clarified query from the cache
+        park_speculative_recommendations(speculation)
+        
         # Generate dynamic questions
         questions = await generate_dynamic_questions(
             query.message,
@@ -705,45 +810,36 @@ async def handle_initial_query(session_id: str, query: Query) -> Response:
     conversation_store[session_id]['is_clarified'] = True
     
     # Get recommendations
-    response_text = await generate_recommendations(
-        query.message, 
-        query.preferences, 
-        query.model_choice
+    response_text, feed = await generate_recommendations_with_details(
+        session_id,
+        query.message,
+        query.preferences,
+        query.model_choice,
+        query_message=query.message,
+        is_followup=False,
+        speculation=speculation
     )
     
     # Process recommendations
     try:
-        json_start = response_text.find('{')
-        json_end = response_text.rfind('}') + 1
+        recommendations = parse_recommendations(response_text)
         
-        if json_start == -1 or json_end <= json_start:
+        if recommendations is None:
             await log(f"Invalid JSON structure in recommendations response: {response_text}")
+            conversation_store[session_id]['state'] = STATES["ERROR"]
             return Response(
                 response=response_text,
                 product_details=[],
                 session_id=session_id
             )
         
-        json_str = response_text[json_start:json_end]
-        recommendations = json.loads(json_str)
-        
         # Store recommendations and update state
         if 'recommendations' in recommendations:
             conversation_store[session_id]['previous_recommendations'] = recommendations['recommendations']
             conversation_store[session_id]['state'] = STATES["RECOMMENDING"]
         
-        # Start background details fetching
-        background_task = asyncio.create_task(
-            fetch_product_details_improved(
-                session_id, 
-                query.message, 
-                recommendations.get('recommendations', []),
-                is_followup=False
-            )
-        )
-        
-        # Store background task
-        conversation_store[session_id]['background_task'] = background_task
+        # Hand the complete list to detailing (products already streamed are skipped)
+        feed.finish(recommendations.get('recommendations', []))
         
         # Update state to "searching"
         conversation_store[session_id]['state'] = STATES["SEARCHING"]
@@ -754,21 +850,27 @@ async def handle_initial_query(session_id: str, query: Query) -> Response:
             session_id=session_id
         )
             
-    except json.JSONDecodeError as json_error:
-        await log("JSON Parsing Error: " + str(json_error))
-        conversation_store[session_id]['state'] = STATES["ERROR"]
-        return Response(response=response_text, product_details=[], session_id=session_id)
+    finally:
+        # Stop detailing if no recommendations were handed over
+        if not feed.closed:
+            stop_product_details(session_id, feed)
 
 @app.post("/api/chat", response_model=Response)
 async def chat(query: Query):
+    session_id = query.session_id if query.session_id else str(uuid.uuid4())
+    # Tag this request's logs (and its background tasks') with the session
+    current_session.set(session_id)
+    
     await log(f"\nNew request received: {query.message}")
     await log(f"Is followup: {query.is_followup}")
     await log(f"Model choice: {query.model_choice}")
-    
-    session_id = query.session_id if query.session_id else str(uuid.uuid4())
     await log(f"Using session ID: {session_id}")
 
+    # Not swept while this request awaits the LLM and writes to the session
+    conversation_store.pin(session_id)
     try:
+        # Read through: the session may have been created by another worker
+        await conversation_store.load(session_id)
         if session_id in conversation_store:
             # For existing sessions, check if the message might be a clarification response first
             session_data = conversation_store[session_id]
@@ -795,13 +897,295 @@ async def chat(query: Query):
         if session_id in conversation_store:
             conversation_store[session_id]['state'] = STATES["ERROR"]
         raise HTTPException(status_code=500, detail=f"General Error: {str(e)}")
+    finally:
+        # Write through so any worker can serve the next request for this session
+        await conversation_store.save(session_id)
+        conversation_store.unpin(session_id)
+
+# Per-session push channel for product details
+product_events = SessionEventBus()
+
+# Strong references to running /api/chat/stream tasks
+streaming_tasks = set()
+
+@app.post("/api/chat/stream")
+async def chat_stream(query: Query):
+    """
+    Streaming variant of /api/chat (Server-Sent Events)
+    Events: session, token, recommendation, done, error
+    """
+    # Fix the session id up front so the client can subscribe to it immediately
+    if not query.session_id:
+        query.session_id = str(uuid.uuid4())
+    sink = EventSink()
+    
+    async def run_chat():
+        current_sink.set(sink)
+        try:
+            await sink.emit("session", {"session_id": query.session_id})
+            response = await chat(query)
+            await sink.emit("done", response.dict())
+        except HTTPException as e:
+            await sink.emit("error", {"detail": e.detail})
+        except Exception as e:
+            await sink.emit("error", {"detail": str(e)})
+        finally:
+            sink.close()
+    
+    # The chat runs in its own task so the session completes even if the client disconnects
+    task = asyncio.create_task(run_chat())
+    streaming_tasks.add(task)
+    task.add_done_callback(streaming_tasks.discard)
+    
+    async def event_source():
+        async for event, data in sink:
+            yield format_sse(event, data)
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Generate recommendations and detail each product as soon as it is generated
+async def generate_recommendations_with_details(session_id: str, query_text: str, preferences: Dict, model_choice: str,
+                                                query_message: str, is_followup: bool = False,
+                                                followup_text: str = "",
+                                                speculation: Optional[Tuple[asyncio.Task, RecommendationFeed]] = None,
+                                                base_query: Optional[str] = None
+                                                ) -> Tuple[str, RecommendationFeed]:
+    """
+    Start the detailing task on a RecommendationFeed, then generate recommendations into it
+    With a speculation (see start_speculative_recommendations), its generation is awaited instead.
+    The caller must finish() the returned feed with the parsed recommendations,
+    or stop_product_details() if the response cannot be used
+    """
+    feed = speculation[1] if speculation else RecommendationFeed()
+    start_product_details(session_id, query_message, feed, is_followup, followup_text)
+    
+    # A final list that differs from the streamed products (e.g. corrected by
+    # validate_recommendations) replaces the in-flight detailing
+    def restart_product_details(recommendations: List[Dict]):
+        stop_product_details(session_id, feed)
+        start_product_details(session_id, query_message, recommendations, is_followup, followup_text)
+    feed.on_restart = restart_product_details
+    
+    try:
+        if speculation:
+            speculation_counters['used'] += 1
+            response_text = await speculation[0]
+        else:
+            response_text = await generate_recommendations(
+                query_text,
+                preferences,
+                model_choice,
+                on_recommendation=put_valid_recommendation(feed),
+                base_query=base_query
+            )
+    except BaseException:
+        if speculation:
+            speculation[0].cancel()
+        stop_product_details(session_id, feed)
+        raise
+    return response_text, feed
+
+# Feed sink for streamed recommendations that drops objects not matching the schema
+def put_valid_recommendation(feed: RecommendationFeed) -> Callable[[Dict], None]:
+    """
+    Streamed objects are handed to detailing before the response is validated,
+    so each one is checked against ProductRecommendation first; one without a
+    usable name would fail product detailing. The final list still reaches the
+    feed through finish().
+    """
+    def put(recommendation: Dict):
+        try:
+            if ProductRecommendation.model_validate(recommendation).name.strip():
+                feed.put(recommendation)
+        except ValidationError:
+            pass
+    return put
+
+# Start detailing a list or a RecommendationFeed, inline or as a queued job
+def start_product_details(session_id: str, query_message: str, recommendations: Union[list, RecommendationFeed],
+                          is_followup: bool = False, followup_text: str = ""):
+    if detailing_queue is not None:
+        # Detailing runs in the worker pool once the recommendations are final
+        detailing = submit_detailing_job(session_id, query_message, recommendations, is_followup, followup_text)
+    else:
+        detailing = fetch_product_details_improved(
+            session_id,
+            query_message,
+            recommendations,
+            is_followup=is_followup,
+            followup_text=followup_text
+        )
+    conversation_store[session_id]['background_task'] = asyncio.create_task(detailing)
+
+# Speculative mode: initial queries generate recommendations while their specificity is analyzed
+SPECULATIVE_RECOMMENDATIONS = os.getenv("SPECULATIVE_RECOMMENDATIONS", "0").lower() in ("1", "true", "yes")
+speculation_counters = {'started': 0, 'used': 0, 'parked': 0, 'cancelled': 0}
+# Parked speculations still generating; referenced here so they are not garbage collected
+parked_speculations = set()
+
+def start_speculative_recommendations(query: Query) -> Optional[Tuple[asyncio.Task, RecommendationFeed]]:
+    """
+    Start generating recommendations for an initial query before knowing if it is specific enough
+    Recommendations are buffered in a feed until detailing starts. Not used for
+    streaming requests, whose tokens would reach the client before the analysis.
+    """
+    if not SPECULATIVE_RECOMMENDATIONS or current_sink.get() is not None:
+        return None
+    feed = RecommendationFeed()
+    task = asyncio.create_task(generate_recommendations(
+        query.message,
+        query.preferences,
+        query.model_choice,
+        on_recommendation=put_valid_recommendation(feed)
+    ))
+    speculation_counters['started'] += 1
+    return task, feed
+
+def cancel_speculative_recommendations(speculation: Optional[Tuple[asyncio.Task, RecommendationFeed]]):
+    """Drop a speculation that will not be used (a finished one is already in recommendation_cache)"""
+    if not speculation:
+        return
+    task, feed = speculation
+    feed.close()
+    if not task.done():
+        task.cancel()
+        speculation_counters['cancelled'] += 1
+    elif not task.cancelled():
+        # Retrieve the outcome so a failed speculation is not reported as never retrieved
+        task.exception()
+
+def park_speculative_recommendations(speculation: Optional[Tuple[asyncio.Task, RecommendationFeed]]):
+    """
+    Let a speculation that is not used now finish in the background
+    generate_recommendations stores it in recommendation_cache under the base query,
+    where the query refined by the clarification answers can find it.
+    """
+    if not speculation:
+        return
+    task, feed = speculation
+    feed.close()
+    if task.done():
+        cancel_speculative_recommendations(speculation)
+        return
+    speculation_counters['parked'] += 1
+    parked_speculations.add(task)
+    task.add_done_callback(parked_speculations.discard)
+    # Retrieve the outcome so a failed speculation is not reported as never retrieved
+    task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+# Cancel a detailing task whose recommendations will never arrive
+def stop_product_details(session_id: str, feed: RecommendationFeed):
+    feed.close()
+    session_data = conversation_store.get(session_id)
+    background_task = session_data.pop('background_task', None) if session_data else None
+    if background_task and not background_task.done():
+        background_task.cancel()
+
+# Detailing job queue: "inline" runs detailing as a task of the request that started it,
+# "memory" uses an in-process worker pool, "redis" hands jobs to worker.py processes
+DETAILING_QUEUE = os.getenv("DETAILING_QUEUE", "inline")
+detailing_queue = None if DETAILING_QUEUE == "inline" else create_job_queue(DETAILING_QUEUE, os.getenv("REDIS_URL"))
+
+async def submit_detailing_job(session_id: str, query_message: str, recommendations: Union[list, RecommendationFeed],
+                               is_followup: bool = False, followup_text: str = ""):
+    """Wait for the final recommendations, then queue a detailing job for them"""
+    if not isinstance(recommendations, list):
+        recommendations = [recommendation async for recommendation in recommendations]
+    session_data = conversation_store.get(session_id)
+    if not recommendations or session_data is None:
+        return
+    
+    job = new_job(
+        "detailing",
+        {
+            'session_id': session_id,
+            'query_message': query_message,
+            'recommendations': recommendations,
+            'is_followup': is_followup,
+            'followup_text': followup_text
+        },
+        max_attempts=int(os.getenv("DETAILING_JOB_ATTEMPTS", 3)),
+        timeout=float(os.getenv("DETAILING_JOB_TIMEOUT", 180))
+    )
+    # A newer job for the same session supersedes this one
+    session_data['detailing_job'] = {'id': job['id'], 'status': 'queued', 'attempt': 0, 'error': None}
+    session_data['last_update'] = datetime.datetime.now().isoformat()
+    # From here on progress is tracked through detailing_job, not a local task
+    if session_data.get('background_task') is asyncio.current_task():
+        session_data.pop('background_task')
+    await conversation_store.save(session_id, ['detailing_job', 'last_update'])
+    await detailing_queue.submit(job)
+    await log(f"Queued detailing job {job['id']} for session {session_id} ({len(recommendations)} products)")
+
+async def run_detailing_job(job: Dict):
+    """Worker pool handler for "detailing" jobs"""
+    payload = job['payload']
+    session_id = payload['session_id']
+    current_session.set(session_id)
+    
+    session_data = await conversation_store.load(session_id)
+    if session_data is None:
+        await log(f"Session {session_id} expired before detailing job {job['id']} ran")
+        return
+    if session_data.get('detailing_job', {}).get('id') != job['id']:
+        await log(f"Detailing job {job['id']} superseded by a newer request")
+        return
+    
+    conversation_store.pin(session_id)
+    try:
+        await fetch_product_details_improved(
+            session_id,
+            payload['query_message'],
+            payload['recommendations'],
+            is_followup=payload['is_followup'],
+            followup_text=payload['followup_text'],
+            # Published by record_detailing_job_status once the last attempt has failed
+            publish_failure=False
+        )
+    finally:
+        conversation_store.unpin(session_id)
+    if conversation_store.get(session_id, {}).get('state') == STATES["ERROR"]:
+        raise RuntimeError("Product detailing failed")
+
+async def record_detailing_job_status(job: Dict, status: str, error: Optional[str] = None):
+    """Write job progress back to the session so any worker can report it"""
+    session_id = job['payload']['session_id']
+    # On a worker the session is usually not cached yet when the first "running" arrives
+    session_data = await conversation_store.load(session_id)
+    if session_data is None or session_data.get('detailing_job', {}).get('id') != job['id']:
+        return
+    
+    session_data['detailing_job'] = {'id': job['id'], 'status': status, 'attempt': job['attempt'], 'error': error}
+    session_data['last_update'] = datetime.datetime.now().isoformat()
+    if status == "failed":
+        session_data['state'] = STATES["ERROR"]
+        publish_details_ready(session_id, [])
+    if error:
+        await log(f"Detailing job {job['id']} {status} (attempt {job['attempt']}): {error}")
+    await conversation_store.save(session_id, ['detailing_job', 'state', 'last_update'])
+
+detailing_pool = WorkerPool(
+    detailing_queue,
+    {"detailing": run_detailing_job},
+    concurrency=int(os.getenv("DETAILING_WORKERS", 4)),
+    on_status=record_detailing_job_status
+) if detailing_queue is not None else None
 
 # Improved background task with concurrent API calls
-async def fetch_product_details_improved(session_id: str, query_message: str, recommendations: list, is_followup: bool = False, followup_text: str = ""):
+async def fetch_product_details_improved(session_id: str, query_message: str, recommendations: Union[list, AsyncIterable[Dict]], is_followup: bool = False, followup_text: str = "",
+                                         publish_failure: bool = True):
     """
     Improved background task to fetch product details and update state
     Uses concurrent API calls for better performance
+    recommendations may be a list or an async stream (RecommendationFeed); searches
+    for each product start as soon as it arrives, while generation is still running
+    publish_failure=False leaves the failure "ready" event to the caller (job retries)
     """
+    product_tasks = []
     try:
         await log(f"\nStarting background task to fetch product details for session: {session_id}")
         
@@ -810,10 +1194,6 @@ async def fetch_product_details_improved(session_id: str, query_message: str, re
             await log(f"Session {session_id} not found. Cannot update details.")
             return []
         
-        # Update state to "fetching details"
-        conversation_store[session_id]['state'] = STATES["DETAILING"]
-        conversation_store[session_id]['last_update'] = datetime.datetime.now().isoformat()
-        
         # Get context
         original_query = query_message
         followup_keywords = ""
@@ -916,7 +1296,7 @@ async def fetch_product_details_improved(session_id: str, query_message: str, re
                     if review_url:
                         # Just store the metadata and create a task to fetch the content
                         review_items.append(item)
-                        review_task = get_review_content(review_url)
+                        review_task = get_review_content(review_url, product_name)
                         review_tasks.append(review_task)
                 
                 # Execute all review content fetching tasks concurrently
@@ -969,77 +1349,54 @@ async def fetch_product_details_improved(session_id: str, query_message: str, re
                 await log(f"Error creating consolidated review: {str(e)}")
                 return None
         
-        # Process all products concurrently
-        product_tasks = [fetch_product_data(product) for product in recommendations]
-        product_data_results = await asyncio.gather(*product_tasks)
-        
-        # Process the reviews for each product and create consolidated reviews
-        consolidated_review_tasks = []
-        for product_index, product_data in enumerate(product_data_results):
-            review_data = product_data['reviews']
-            if review_data and 'items' in review_data and 'contents' in review_data:
-                task = create_consolidated_review(
-                    review_data['items'],
-                    review_data['contents'],
-                    review_data['pros'],
-                    review_data['cons']
-                )
-                consolidated_review_tasks.append((product_index, task))
-        
-        # Get all consolidated reviews
-        consolidated_reviews = {}
-        for product_index, task in consolidated_review_tasks:
-            review = await task
-            if review:
-                consolidated_reviews[product_index] = review
+        # Limit concurrent summaries per session to avoid rate limits
+        summary_semaphore = asyncio.Semaphore(5)
         
-        # Collect all summary tasks for consolidated reviews
-        all_summary_tasks = []
-        for product_index, review in consolidated_reviews.items():
-            # Schedule the summary generation
-            task = (product_index, summarize_product_info(
-                review['summary_params']['review_content'],
-                review['summary_params']['pros'],
-                review['summary_params']['cons']
-            ))
-            all_summary_tasks.append(task)
+        # Products finished so far, by index, replayed to late push subscribers
+        partial_details = {}
+        conversation_store[session_id]['partial_product_details'] = partial_details
         
-        # Process all summaries in parallel in batches to avoid rate limits
-        batch_size = 5
-        all_summaries = {}
+        # Batch mode: summary inputs by product index, summarized together at the end
+        pending_summaries = {}
         
-        for i in range(0, len(all_summary_tasks), batch_size):
-            batch = all_summary_tasks[i:i+batch_size]
-            batch_locations = [loc for loc, _ in batch]
-            batch_coros = [coro for _, coro in batch]
-            
-            # Run this batch in parallel
-            batch_results = await asyncio.gather(*batch_coros, return_exceptions=True)
-            
-            # Store results by their location
-            for j, (location, _) in enumerate(batch):
-                result = batch_results[j]
-                if not isinstance(result, Exception):
-                    all_summaries[location] = result
-                else:
-                    await log(f"Error generating summary: {str(result)}")
-                    all_summaries[location] = "Unable to generate summary."
+        # Per-product mode: summarize as soon as the product's reviews are in
+        async def summarize_review(review):
+            async with summary_semaphore:
+                try:
+                    review['summary'] = await summarize_product_info(
+                        review['summary_params']['review_content'],
+                        review['summary_params']['pros'],
+                        review['summary_params']['cons']
+                    )
+                except Exception as e:
+                    await log(f"Error generating summary: {str(e)}")
+                    review['summary'] = "Unable to generate summary."
         
-        # Now populate all the summaries back into our product details structure
-        product_details = []
-        for product_index, product_data in enumerate(product_data_results):
+        # Full pipeline for one product: searches, consolidated review and summary
+        async def detail_product(product_index, product):
+            product_data = await fetch_product_data(product)
             product_detail = {
                 'name': product_data['name'],
                 'buy_links': product_data['buy_links'],
                 'reviews': []
             }
             
-            # Add the consolidated review with summary
-            if product_index in consolidated_reviews:
-                review = consolidated_reviews[product_index]
-                # Add the summary
-                if product_index in all_summaries:
-                    review['summary'] = all_summaries[product_index]
+            # Process the reviews and create a consolidated review
+            review = None
+            review_data = product_data['reviews']
+            if review_data and 'items' in review_data and 'contents' in review_data:
+                review = await create_consolidated_review(
+                    review_data['items'],
+                    review_data['contents'],
+                    review_data['pros'],
+                    review_data['cons']
+                )
+            
+            if review:
+                if SUMMARY_MODE == "batch":
+                    pending_summaries[product_index] = {'name': product_data['name'], **review['summary_params']}
+                else:
+                    await summarize_review(review)
                 
                 # Create a single review with the consolidated information
                 product_detail['reviews'].append({
@@ -1051,64 +1408,156 @@ async def fetch_product_details_improved(session_id: str, query_message: str, re
                     'individual_reviews': review.get('individual_reviews', [])
                 })
             
-            product_details.append(product_detail)
+            # Push this product to subscribers as soon as it is ready
+            partial_details[product_index] = product_detail
+            product_events.publish(session_id, "product", {"index": product_index, "product_detail": product_detail})
+            if session_id in conversation_store:
+                conversation_store[session_id]['last_update'] = datetime.datetime.now().isoformat()
+                await conversation_store.save(session_id, ['partial_product_details', 'last_update'])
+            return product_detail
+        
+        # Process all products concurrently, starting each one as soon as it is available
+        if isinstance(recommendations, list):
+            product_tasks = [
+                asyncio.create_task(detail_product(index, product))
+                for index, product in enumerate(recommendations)
+            ]
+        else:
+            async for product in recommendations:
+                await log(f"Starting details for streamed product: {product.get('name', '')}")
+                product_tasks.append(asyncio.create_task(detail_product(len(product_tasks), product)))
+        
+        # Update state to "fetching details"
+        if session_id in conversation_store:
+            conversation_store[session_id]['state'] = STATES["DETAILING"]
+            conversation_store[session_id]['last_update'] = datetime.datetime.now().isoformat()
+            await conversation_store.save(session_id, ['state', 'last_update'])
+        
+        product_details = list(await asyncio.gather(*product_tasks))
+        
+        # One summarization request for the whole session; products are pushed again with their summary
+        if pending_summaries:
+            summaries = await summarize_products(pending_summaries)
+            for product_index, summary in summaries.items():
+                product_details[product_index]['reviews'][0]['summary'] = summary
+                product_events.publish(session_id, "product", {"index": product_index, "product_detail": product_details[product_index]})
         
         # Store product details in conversation store
         if session_id in conversation_store:
             conversation_store[session_id]['product_details'] = product_details
             conversation_store[session_id]['state'] = STATES["READY"]
             conversation_store[session_id]['last_update'] = datetime.datetime.now().isoformat()
-            
+            await conversation_store.save(session_id, ['product_details', 'partial_product_details', 'state', 'last_update'])
+        
         await log(f"Completed background task for session: {session_id}, fetched details for {len(product_details)} products")
+        publish_details_ready(session_id, product_details)
         return product_details
+    except asyncio.CancelledError:
+        for task in product_tasks:
+            task.cancel()
+        raise
     except Exception as e:
         await log(f"Error in background task: {str(e)}")
         # Update state to error
         if session_id in conversation_store:
             conversation_store[session_id]['state'] = STATES["ERROR"]
             conversation_store[session_id]['last_update'] = datetime.datetime.now().isoformat()
+            await conversation_store.save(session_id, ['state', 'last_update'])
+        if publish_failure:
+            publish_details_ready(session_id, [])
         return []
 
+# Final push event for a session's detailing round (same shape as GET /api/product-details)
+def publish_details_ready(session_id: str, product_details: list):
+    session_data = conversation_store.get(session_id, {})
+    product_events.publish(session_id, "ready", {
+        "status": "completed",
+        "state": session_data.get('state', STATES["ERROR"]),
+        "message": "Product details successfully retrieved",
+        "product_details": product_details
+    })
+
+# Persistent store of extracted review text, keyed by normalized URL
+review_store = ReviewStore.from_env()
+
+# HTML-to-text extraction in a process pool (fastest installed parser backend)
+review_parser = ReviewParser.from_env()
+
+# Streamed review page downloads over the pooled "web" client
+page_fetcher = PageFetcher.from_env(client_registry, scheduler=outbound_scheduler)
+
+# Characters of review text kept per source (about 4 characters per token)
+REVIEW_CHAR_BUDGET = int(os.getenv("REVIEW_CHAR_BUDGET", 6000))
+
 # Additional optimization for review content fetching
-async def get_review_content(url: str) -> str:
+async def get_review_content(url: str, product_name: str = "") -> str:
     """
     Optimized function to fetch and extract review content with timeout handling
+    Serves fresh copies from the review store and revalidates stale ones
+    The page's main article is trimmed to REVIEW_CHAR_BUDGET characters,
+    keeping paragraphs that mention product_name first
     """
+    text = await fetch_review_text(url)
+    return select_relevant_text(text, product_name, REVIEW_CHAR_BUDGET) if text else ""
+
+async def fetch_review_text(url: str) -> str:
+    """
+    Full main-article text of a review page (stored or fetched)
+    A stale stored copy is served when revalidating it fails
+    """
+    stored = await review_store.alookup(url)
+    if stored and stored['fresh']:
+        await log(f"[Review Scraper] Using stored content for: {url}")
+        return stored['text']
+    
+    async def stale_copy() -> str:
+        # Stale-while-revalidate: an outdated review beats no review
+        if stored:
+            await log(f"[Review Scraper] Revalidation failed, serving stale copy: {url}")
+            return stored['text']
+        return ""
+    
     await log(f"[Review Scraper] Attempting to fetch content from: {url}")
     try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        # Use aiohttp instead of requests for proper async operation
-        # Since the existing code uses requests, we'll create a wrapper that's compatible
-        # with the existing synchronous code by using asyncio.to_thread
+        headers = ReviewStore.conditional_headers(stored)
         
         async def fetch_with_timeout():
             try:
-                # Using asyncio.to_thread to make the synchronous requests call non-blocking
-                response = await asyncio.to_thread(
-                    requests.get, url, headers=headers, timeout=10
-                )
+                # Streamed and size-limited; non-HTML responses are rejected before the body is read
+                response = await page_fetcher.fetch(url, headers=headers)
                 
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    for script in soup(['script', 'style']):
-                        script.decompose()
-                    text = soup.get_text(separator=' ', strip=True)
-                    return text
+                if response['status'] == 304 and stored:
+                    await log(f"[Review Scraper] Content not modified, reusing stored copy: {url}")
+                    await review_store.amark_revalidated(url)
+                    return stored['text']
+                elif response['status'] == 200:
+                    if response['truncated']:
+                        await log(f"[Review Scraper] Page exceeds {page_fetcher.max_bytes} bytes, using the first part: {url}")
+                    # Decode, reduce and parse in the worker pool so large pages do not block the event loop
+                    text = await review_parser.parse_page(response['body'], response['charset'])
+                    if text:
+                        await review_store.aput(
+                            url,
+                            text,
+                            etag=response['etag'],
+                            last_modified=response['last_modified']
+                        )
+                    return text or await stale_copy()
                 else:
-                    await log(f"[Review Scraper] Failed to fetch content. Status code: {response.status_code}")
-                    return ""
+                    await log(f"[Review Scraper] Failed to fetch content. Status code: {response['status']}")
+                    return await stale_copy()
             except Exception as e:
                 await log(f"[Review Scraper] Error in fetch_with_timeout: {str(e)}")
-                return ""
+                return await stale_copy()
         
         # Set a timeout for the whole operation
         return await asyncio.wait_for(fetch_with_timeout(), timeout=15)
     except asyncio.TimeoutError:
         await log(f"[Review Scraper] Timeout fetching content from: {url}")
-        return ""
+        return await stale_copy()
     except Exception as e:
         await log(f"[Review Scraper Error] {str(e)} for URL: {url}")
-        return ""
+        return await stale_copy()
 
 # # Updated review content fetching using Serper Scrape API
 # async def get_review_content(url: str) -> str:
@@ -1179,19 +1628,39 @@ async def get_review_content(url: str) -> str:
 #         await log(f"[Review Scraper Error] {str(e)} for URL: {url}")
 #         return ""
 
+# Seconds without progress after which another worker's detailing is considered lost
+DETAILING_STALE_AFTER = float(os.getenv("DETAILING_STALE_AFTER", 300))
+
+def detailing_in_progress(session_data: Dict) -> bool:
+    """Whether product details for this session are still being fetched (here or on another worker)"""
+    background_task = session_data.get('background_task')
+    if background_task is not None:
+        return not background_task.done()
+    detailing_job = session_data.get('detailing_job')
+    if detailing_job:
+        if detailing_job.get('status') not in ['queued', 'running', 'retrying']:
+            return False
+    elif not conversation_store.shared or session_data.get('state') not in [STATES["SEARCHING"], STATES["DETAILING"]]:
+        return False
+    try:
+        last_update = datetime.datetime.fromisoformat(session_data.get('last_update', ''))
+    except (TypeError, ValueError):
+        return False
+    return (datetime.datetime.now() - last_update).total_seconds() < DETAILING_STALE_AFTER
+
 # Product details endpoint - state-aware
 @app.get("/api/product-details/{session_id}")
 async def get_product_details(session_id: str):
     """Get product details with current state feedback"""
-    if session_id not in conversation_store:
+    # Read through so sessions detailed by another worker are visible here
+    session_data = await conversation_store.load(session_id)
+    if session_data is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    session_data = conversation_store[session_id]
     current_state = session_data.get('state', STATES["ERROR"])
     
     # Check if background task exists and is still running
-    background_task = session_data.get('background_task')
-    if background_task and not background_task.done():
+    if detailing_in_progress(session_data):
         # Task is still running
         return {
             "status": "processing",
@@ -1206,6 +1675,7 @@ async def get_product_details(session_id: str):
         conversation_store[session_id]['state'] = STATES["READY"]
         conversation_store[session_id]['last_update'] = datetime.datetime.now().isoformat()
         current_state = STATES["READY"]
+        await conversation_store.save(session_id, ['state', 'last_update'])
     
     # Return product details
     product_details = session_data.get('product_details', [])
@@ -1216,14 +1686,176 @@ async def get_product_details(session_id: str):
         "product_details": product_details
     }
 
+# Push channel for product details (Server-Sent Events); polling above stays as fallback
+@app.get("/api/product-details/{session_id}/events")
+async def product_details_events(session_id: str):
+    """Send each product's details as soon as it is ready, followed by a final "ready" event"""
+    session_data = await conversation_store.load(session_id)
+    if session_data is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    # Subscribe before replaying so nothing published in between is lost
+    sink = product_events.subscribe(session_id)
+    
+    async def event_source():
+        try:
+            # Keys are ints locally and strings when read back from a shared backend
+            sent = set()
+            for index, product_detail in sorted(session_data.get('partial_product_details', {}).items(), key=lambda item: int(item[0])):
+                sent.add(int(index))
+                yield format_sse("product", {"index": int(index), "product_detail": product_detail})
+            
+            # Nothing left to wait for: report the final state right away
+            # (a failed attempt whose job is being retried is still in progress)
+            if not detailing_in_progress(session_data) or session_data.get('state') == STATES["READY"]:
+                yield format_sse("ready", await get_product_details(session_id))
+                return
+            
+            # Detailing runs on another worker or process: follow it through the shared store
+            if session_data.get('background_task') is None or (detailing_queue is not None and detailing_queue.external):
+                while True:
+                    await asyncio.sleep(1)
+                    remote = await conversation_store.load(session_id) or {}
+                    for index, product_detail in sorted(remote.get('partial_product_details', {}).items(), key=lambda item: int(item[0])):
+                        if int(index) not in sent:
+                            sent.add(int(index))
+                            yield format_sse("product", {"index": int(index), "product_detail": product_detail})
+                    if not detailing_in_progress(remote):
+                        yield format_sse("ready", await get_product_details(session_id))
+                        return
+            
+            async for event, data in sink:
+                yield format_sse(event, data)
+                if event == "ready":
+                    return
+        finally:
+            product_events.unsubscribe(session_id, sink)
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Runtime metrics endpoint
+@app.get("/api/metrics")
+async def get_metrics():
+    """Expose cache and outbound client counters"""
+    return {
+        "search_cache": search_cache.stats(),
+        "serper": serper_client.stats,
+        "review_store": review_store.stats(),
+        "review_parser": review_parser.stats(),
+        "page_fetcher": page_fetcher.stats(),
+        "recommendation_cache": recommendation_cache.stats(),
+        "speculative_recommendations": {'enabled': SPECULATIVE_RECOMMENDATIONS, **speculation_counters},
+        "summary_cache": summary_cache.stats(),
+        "query_classifier": query_classifier.stats(),
+        "preference_extractor": preference_extractor.stats(),
+        "product_dedupe": product_deduplicator.stats(),
+        "product_event_subscribers": product_events.subscriber_count(),
+        "log_bus": log_bus.stats(),
+        "sessions": conversation_store.stats(),
+        "detailing_jobs": await detailing_pool.stats() if detailing_pool is not None else None,
+        "outbound": outbound_scheduler.stats(),
+        "llm_latency": llm_gateway.latency_tracker.summary()
+    }
+
+# Summaries keyed on a hash of their inputs, shared by every session
+summary_cache = SummaryCache.from_env()
+
+# "batch": one summarization request per session, "per_product": one per product
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "batch")
+# Larger batches (total review characters) fall back to per-product requests
+SUMMARY_BATCH_MAX_CHARS = int(os.getenv("SUMMARY_BATCH_MAX_CHARS", 40000))
+
+async def summarize_products(items: Dict[int, Dict]) -> Dict[int, str]:
+    """
+    Summaries for several products ({index: {name, review_content, pros, cons}})
+    Uses one batched request when the inputs fit, per-product requests for the rest
+    """
+    summaries = {}
+    for index, item in items.items():
+        cached = summary_cache.get(item['review_content'], item['pros'], item['cons'], openai_model_applied)
+        if cached is not None:
+            summaries[index] = cached
+    if summaries:
+        await log(f"[Review Summarization] Using {len(summaries)} cached summaries")
+    
+    uncached = {index: item for index, item in items.items() if index not in summaries}
+    total_chars = sum(len(item['review_content']) for item in uncached.values())
+    batched = {}
+    if len(uncached) > 1 and total_chars <= SUMMARY_BATCH_MAX_CHARS:
+        batched = await summarize_products_batch(uncached)
+        for index, summary in batched.items():
+            item = uncached[index]
+            summary_cache.set(item['review_content'], item['pros'], item['cons'], openai_model_applied, summary)
+        summaries.update(batched)
+    
+    missing = [index for index in items if not summaries.get(index)]
+    if missing and batched:
+        await log(f"[Review Summarization] Batch response missed {len(missing)} products, summarizing them separately")
+    
+    semaphore = asyncio.Semaphore(5)
+    async def summarize_one(index):
+        async with semaphore:
+            item = items[index]
+            summaries[index] = await summarize_product_info(item['review_content'], item['pros'], item['cons'], check_cache=False)
+    await asyncio.gather(*(summarize_one(index) for index in missing))
+    return summaries
+
+async def summarize_products_batch(items: Dict[int, Dict]) -> Dict[int, str]:
+    """Summarize several products in a single JSON-mode request; returns {} on failure"""
+    await log(f"[Review Summarization] Summarizing {len(items)} products in one request")
+    products_text = "\n\n".join(
+        f"""Product {index}: {item['name']}
+Review Content: {item['review_content']}
+Pros: {', '.join(item['pros'])}
+Cons: {', '.join(item['cons'])}"""
+        for index, item in items.items()
+    )
+    messages = [
+        {
+            "role": "system",
+            "content": "You are a product review summarizer. Create a concise, balanced summary that combines the review content with the pros and cons."
+        },
+        {
+            "role": "user",
+            "content": f"""
+Summarize each of the following products into a single paragraph (max 100 words each), Don't include any citation number annotations.
+Focus on the most important points and maintain a balanced perspective.
+
+{products_text}
+
+Return JSON only, with one entry per product:
+{{"summaries": [{{"id": <product number>, "summary": "<paragraph>"}}]}}"""
+        }
+    ]
+    try:
+        batch, _ = await structured_completion(
+            "openai",
+            openai_model_applied,
+            messages,
+            BatchSummaries,
+            temperature=0.1
+        )
+        return {entry.id: entry.summary.strip() for entry in batch.summaries if entry.id in items}
+    except Exception as e:
+        await log(f"Error in batched summarization: {str(e)}")
+        return {}
+
 # Summarize product information
-async def summarize_product_info(review_content: str, pros: list, cons: list) -> str:
-    """Summarize review content and pros/cons into a concise paragraph"""
+async def summarize_product_info(review_content: str, pros: list, cons: list, check_cache: bool = True) -> str:
+    """
+    Summarize review content and pros/cons into a concise paragraph
+    check_cache=False skips the lookup when the caller already missed the cache
+    """
+    cached = summary_cache.get(review_content, pros, cons, openai_model_applied) if check_cache else None
+    if cached is not None:
+        await log("[Review Summarization] Using cached summary")
+        return cached
+    
     await log("[Review Summarization] Start to summarize review content and pros/cons")
-    client = OpenAI(
-        api_key=PERPLEXITY_API_KEY,
-        base_url="https://api.perplexity.ai"
-    )
     try:
         messages = [
             {
@@ -1244,14 +1876,17 @@ Focus on the most important points and maintain a balanced perspective."""
             }
         ]
 
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
+        response_text = await llm_gateway.chat_completion(
+            "openai",
             model=openai_model_applied,
             messages=messages,
             temperature=0.1
         )
         
-        return response.choices[0].message.content.strip()
+        summary = response_text.strip()
+        if summary:
+            summary_cache.set(review_content, pros, cons, openai_model_applied, summary)
+        return summary
         # return ""
     except Exception as e:
         await log(f"Error summarizing product info: {str(e)}")
@@ -1261,7 +1896,7 @@ Focus on the most important points and maintain a balanced perspective."""
 @app.post("/api/switch-model/{session_id}")
 async def switch_model(session_id: str, data: Dict):
     """Switch AI model for an existing conversation"""
-    if session_id not in conversation_store:
+    if await conversation_store.load(session_id) is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
     new_model = data.get("model_choice")
@@ -1271,6 +1906,7 @@ async def switch_model(session_id: str, data: Dict):
     # Update model choice in the conversation store
     conversation_store[session_id]['model_choice'] = new_model
     conversation_store[session_id]['last_update'] = datetime.datetime.now().isoformat()
+    await conversation_store.save(session_id, ['model_choice', 'last_update'])
     
     await log(f"Model switched to {new_model} for session {session_id}")
     
@@ -1280,6 +1916,9 @@ async def switch_model(session_id: str, data: Dict):
         "session_id": session_id
     }
 
+# Local fast path that decides obvious queries without the specificity LLM call
+query_classifier = QueryClassifier.from_env()
+
 async def analyze_query_specificity(query: str, preferences: Dict = None, model_choice: str = "perplexity") -> Dict:
     """
     Use GPT-3.5-turbo to analyze if a query is specific enough for product recommendations
@@ -1300,6 +1939,18 @@ async def analyze_query_specificity(query: str, preferences: Dict = None, model_
     
     await log(f"Analyzing query specificity: '{enhanced_query}'")
     
+    verdict = query_classifier.classify(query, preferences)
+    if verdict is not None:
+        result = {
+            "is_specific": verdict.is_specific,
+            "missing_info": verdict.missing_info,
+            "confidence": verdict.confidence,
+            "next_state": STATES["QUERYING"] if verdict.is_specific else STATES["CLARIFYING"],
+            "reasoning": verdict.reasoning
+        }
+        await log(f"Query analysis decided locally: {json.dumps(result)}")
+        return result
+    
     # Prepare the prompt
     messages = [
         {"role": "system", "content": "You are an AI that determines if shopping queries need clarification."},
@@ -1323,31 +1974,17 @@ Format response as JSON:
     
     # Use GPT-3.5-turbo for analysis for consistent results
     try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
-            model=openai_model_applied,
-            messages=messages,
-            temperature=0.1
-        )
-        
-        response_text = response.choices[0].message.content
-        
-        # Extract JSON portion
+        # Parse and validate the JSON portion (retried once if it does not match)
         try:
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                result = json.loads(response_text[json_start:json_end])
-            else:
-                await log(f"Invalid JSON structure in response: {response_text}")
-                result = {
-                    "is_specific": False,
-                    "missing_info": ["details"],
-                    "confidence": 0.5,
-                    "reasoning": "Could not extract specific information needs"
-                }
-        except json.JSONDecodeError as e:
+            analysis, _ = await structured_completion(
+                "openai",
+                openai_model_applied,
+                messages,
+                SpecificityAnalysis,
+                temperature=0.1
+            )
+            result = dump_structured(analysis)
+        except StructuredOutputError as e:
             await log(f"JSON parsing error: {str(e)}")
             result = {
                 "is_specific": False,
@@ -1397,33 +2034,23 @@ async def extract_preferences_from_answer(message: str, missing_info: List[str],
     }}
     """
     
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    
     try:
-        response = client.chat.completions.create(
-            model=openai_model_applied,
-            messages=[
-                {"role": "system", "content": "You extract product preferences from user messages"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1
-        )
-        
-        response_text = response.choices[0].message.content
-        
         # Extract JSON
         try:
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                extracted_prefs = json.loads(response_text[json_start:json_end])
-                await log(f"Extracted preferences from answer: {extracted_prefs}")
-                return extracted_prefs
-            else:
-                await log("No valid JSON found in extraction response")
-                return {}
-        except json.JSONDecodeError as e:
+            extracted, _ = await structured_completion(
+                "openai",
+                openai_model_applied,
+                [
+                    {"role": "system", "content": "You extract product preferences from user messages"},
+                    {"role": "user", "content": prompt}
+                ],
+                ExtractedPreferences,
+                temperature=0.1
+            )
+            extracted_prefs = extracted.root
+            await log(f"Extracted preferences from answer: {extracted_prefs}")
+            return extracted_prefs
+        except StructuredOutputError as e:
             await log(f"JSON parsing error in preference extraction: {str(e)}")
             return {}
             
@@ -1441,6 +2068,11 @@ async def is_query_specific_enough(query: str, preferences: Dict = None) -> bool
     if preferences and len(preferences) > 0:
         enhanced_query += f" with preferences: {json.dumps(preferences)}"
     
+    verdict = query_classifier.classify(query, preferences)
+    if verdict is not None:
+        await log(f"Query specificity check (local): '{enhanced_query}' -> {verdict.is_specific} ({verdict.reasoning})")
+        return verdict.is_specific
+    
     prompt = f"""
     Is this shopping query specific enough to provide good product recommendations?
     Query: "{enhanced_query}"
@@ -1448,10 +2080,9 @@ async def is_query_specific_enough(query: str, preferences: Dict = None) -> bool
     Answer only with YES or NO.
     """
     
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    
     try:
-        response = client.chat.completions.create(
+        response_text = await llm_gateway.chat_completion(
+            "openai",
             model=openai_model_applied,
             messages=[
                 {"role": "system", "content": "You determine if shopping queries are specific enough"},
@@ -1461,7 +2092,7 @@ async def is_query_specific_enough(query: str, preferences: Dict = None) -> bool
             max_tokens=5
         )
         
-        result = response.choices[0].message.content.strip().lower()
+        result = response_text.strip().lower()
         is_specific = "yes" in result
         
         await log(f"Query specificity check: '{enhanced_query}' -> {is_specific}")
@@ -1479,12 +2110,14 @@ async def handle_followup_query(session_id: str, query: Query) -> Response:
     
     # Check if in clarification state
     if context.get("state") == STATES["CLARIFYING"]:
-        # Try to extract preferences from the message
-        extracted_prefs = await extract_preferences_from_answer(
-            query.message, 
-            context.get("missing_info", []),
-            query.model_choice
-        )
+        # Try to extract preferences from the message, locally first
+        extracted_prefs = await is_clarification_answer(query.message, context.get("missing_info", []))
+        if not extracted_prefs:
+            extracted_prefs = await extract_preferences_from_answer(
+                query.message, 
+                context.get("missing_info", []),
+                query.model_choice
+            )
         
         if extracted_prefs:
             await log(f"Identified clarification response with preferences: {extracted_prefs}")
@@ -1561,41 +2194,35 @@ async def handle_followup_query(session_id: str, query: Query) -> Response:
     conversation_store[session_id]['state'] = STATES["RECOMMENDING"]
     
     # Get recommendations using the specified model
-    response_text = await generate_recommendations(enhanced_query, previous_preferences, model_choice)
+    response_text, feed = await generate_recommendations_with_details(
+        session_id,
+        enhanced_query,
+        previous_preferences,
+        model_choice,
+        query_message=query.message,
+        is_followup=True,
+        followup_text=query.message
+    )
     
     # Process recommendations and return response
     try:
-        json_start = response_text.find('{')
-        json_end = response_text.rfind('}') + 1
+        recommendations = parse_recommendations(response_text)
         
-        if json_start == -1 or json_end <= json_start:
-            await log(f"Invalid JSON structure in recommendations response")
+        if recommendations is None:
+            await log(f"Invalid JSON structure in recommendations response: {response_text}")
+            conversation_store[session_id]['state'] = STATES["ERROR"]
             return Response(
                 response=response_text,
                 product_details=[],
                 session_id=session_id
             )
         
-        json_str = response_text[json_start:json_end]
-        recommendations = json.loads(json_str)
-        
         # Store recommendations
         if 'recommendations' in recommendations:
             conversation_store[session_id]['previous_recommendations'] = recommendations['recommendations']
         
-        # Start background details fetching
-        background_task = asyncio.create_task(
-            fetch_product_details_improved(
-                session_id, 
-                query.message, 
-                recommendations.get('recommendations', []), 
-                is_followup=True,
-                followup_text=query.message
-            )
-        )
-        
-        # Store background task
-        conversation_store[session_id]['background_task'] = background_task
+        # Hand the complete list to detailing (products already streamed are skipped)
+        feed.finish(recommendations.get('recommendations', []))
         
         # Update state to "searching"
         conversation_store[session_id]['state'] = STATES["SEARCHING"]
@@ -1606,10 +2233,10 @@ async def handle_followup_query(session_id: str, query: Query) -> Response:
             session_id=session_id
         )
             
-    except json.JSONDecodeError as json_error:
-        await log(f"JSON Parsing Error: {str(json_error)}")
-        conversation_store[session_id]['state'] = STATES["ERROR"]
-        return Response(response=response_text, product_details=[], session_id=session_id)
+    finally:
+        # Stop detailing if no recommendations were handed over
+        if not feed.closed:
+            stop_product_details(session_id, feed)
 
 async def process_clarification_response(session_id: str, extracted_preferences: Dict, query: Query) -> Response:
     """Process user response to clarification questions"""
@@ -1657,42 +2284,37 @@ async def process_clarification_response(session_id: str, extracted_preferences:
         
         # Generate recommendations
         conversation_store[session_id]["state"] = STATES["RECOMMENDING"]
-        response_text = await generate_recommendations(
+        response_text, feed = await generate_recommendations_with_details(
+            session_id,
             enhanced_query,
             updated_preferences,
-            model_choice
+            model_choice,
+            query_message=original_query,
+            is_followup=False,
+            base_query=original_query
         )
         
         # Process recommendations
         try:
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
+            recommendations = parse_recommendations(response_text)
             
-            if json_start != -1 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
-                recommendations = json.loads(json_str)
+            if recommendations is not None:
                 
                 # Store recommendations
                 if 'recommendations' in recommendations:
                     conversation_store[session_id]['previous_recommendations'] = recommendations['recommendations']
                 
-                # Start background details fetching
-                background_task = asyncio.create_task(
-                    fetch_product_details_improved(
-                        session_id, 
-                        original_query, 
-                        recommendations.get('recommendations', []), 
-                        is_followup=False
-                    )
-                )
-                
-                # Store background task
-                conversation_store[session_id]['background_task'] = background_task
+                # Hand the complete list to detailing (products already streamed are skipped)
+                feed.finish(recommendations.get('recommendations', []))
                 
                 # Update state to "searching"
                 conversation_store[session_id]['state'] = STATES["SEARCHING"]
         except Exception as e:
             await log(f"Error processing recommendations after clarification: {str(e)}")
+        finally:
+            # Stop detailing if no recommendations were handed over
+            if not feed.closed:
+                stop_product_details(session_id, feed)
         
         return Response(
             response=response_text,
@@ -1742,42 +2364,37 @@ async def process_clarification_response(session_id: str, extracted_preferences:
             
             # Generate recommendations
             conversation_store[session_id]["state"] = STATES["RECOMMENDING"]
-            response_text = await generate_recommendations(
+            response_text, feed = await generate_recommendations_with_details(
+                session_id,
                 enhanced_query,
                 updated_preferences,
-                model_choice
+                model_choice,
+                query_message=original_query,
+                is_followup=False,
+                base_query=original_query
             )
             
             # Process recommendations (same as above)
             try:
-                json_start = response_text.find('{')
-                json_end = response_text.rfind('}') + 1
+                recommendations = parse_recommendations(response_text)
                 
-                if json_start != -1 and json_end > json_start:
-                    json_str = response_text[json_start:json_end]
-                    recommendations = json.loads(json_str)
+                if recommendations is not None:
                     
                     # Store recommendations
                     if 'recommendations' in recommendations:
                         conversation_store[session_id]['previous_recommendations'] = recommendations['recommendations']
                     
-                    # Start background details fetching
-                    background_task = asyncio.create_task(
-                        fetch_product_details_improved(
-                            session_id, 
-                            original_query, 
-                            recommendations.get('recommendations', []), 
-                            is_followup=False
-                        )
-                    )
-                    
-                    # Store background task
-                    conversation_store[session_id]['background_task'] = background_task
+                    # Hand the complete list to detailing (products already streamed are skipped)
+                    feed.finish(recommendations.get('recommendations', []))
                     
                     # Update state to "searching"
                     conversation_store[session_id]['state'] = STATES["SEARCHING"]
             except Exception as e:
                 await log(f"Error processing recommendations after clarification: {str(e)}")
+            finally:
+                # Stop detailing if no recommendations were handed over
+                if not feed.closed:
+                    stop_product_details(session_id, feed)
             
             return Response(
                 response=response_text,
@@ -0,0 +1,197 @@
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+import asyncio
+import time
+import os
+
+# Per-provider defaults ('web' = review pages):
+# (max concurrent requests, requests per second, burst); rate 0 = unlimited
+DEFAULT_LIMITS = {
+    'openai': (16, 0, 0),
+    'perplexity': (8, 0, 0),
+    'serper': (10, 5, 10),
+    'web': (32, 0, 0)
+}
+
+
+class TokenBucket:
+    """Request rate limit: `rate` tokens per second, up to `burst` saved up"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Waiters are served in arrival order by the lock
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class QueueStats:
+    """Admission counters and queue-time samples for one limiter"""
+
+    def __init__(self, window: int = 1000):
+        self.admitted = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self._waits = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.admitted += 1
+        self._waits.append(seconds)
+
+    def summary(self) -> Dict:
+        ordered = sorted(self._waits)
+        def percentile(pct):
+            return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))] * 1000, 1) if ordered else 0.0
+        return {
+            'admitted': self.admitted,
+            'waiting': self.waiting,
+            'in_flight': self.in_flight,
+            'queue_p50_ms': percentile(50),
+            'queue_p95_ms': percentile(95),
+            'queue_max_ms': round(ordered[-1] * 1000, 1) if ordered else 0.0
+        }
+
+
+class HostLimiter:
+    """Concurrency and rate limit of one review site"""
+
+    def __init__(self, concurrency: int, rate: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, rate) if rate > 0 else None
+        # Requests holding or waiting for the semaphore; a host in use is never evicted
+        self.users = 0
+
+
+class OutboundScheduler:
+    """
+    Admission control for every outbound request
+
+    A request waits for, in order: its provider's semaphore, the per-host
+    semaphore and token bucket (review pages only), the provider's token
+    bucket, then a global semaphore. The fixed order keeps it deadlock free,
+    and the scarce global slot is only taken once everything else allows the
+    request to go. Time spent waiting is recorded per provider.
+
+    Host limiters are kept in LRU order, at most max_hosts of them; only
+    hosts with no request in flight or waiting are evicted.
+    """
+
+    def __init__(self, max_concurrency: int = 64, limits: Optional[Dict[str, Tuple[int, float, float]]] = None,
+                 host_concurrency: int = 2, host_rate: float = 2.0, max_hosts: int = 1024):
+        self.max_concurrency = max_concurrency
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.host_concurrency = host_concurrency
+        self.host_rate = host_rate
+        self.max_hosts = max_hosts
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._semaphores = {provider: asyncio.Semaphore(limit[0]) for provider, limit in self.limits.items()}
+        self._buckets = {
+            provider: TokenBucket(limit[1], limit[2])
+            for provider, limit in self.limits.items() if limit[1] > 0
+        }
+        self._hosts: "OrderedDict[str, HostLimiter]" = OrderedDict()
+        self._stats: Dict[str, QueueStats] = {provider: QueueStats() for provider in self.limits}
+
+    def _host_limiter(self, host: str) -> HostLimiter:
+        limiter = self._hosts.get(host)
+        if limiter is not None:
+            self._hosts.move_to_end(host)
+            return limiter
+        limiter = self._hosts[host] = HostLimiter(self.host_concurrency, self.host_rate)
+        if len(self._hosts) > self.max_hosts:
+            idle = [name for name, other in self._hosts.items() if not other.users and other is not limiter]
+            for name in idle[:len(self._hosts) - self.max_hosts]:
+                del self._hosts[name]
+        return limiter
+
+    @asynccontextmanager
+    async def slot(self, provider: str, host: Optional[str] = None) -> AsyncIterator[None]:
+        """Hold an admission slot for one request to a provider (and host)"""
+        if provider not in self._semaphores:
+            raise ValueError(f"Unknown outbound provider: {provider}")
+        stats = self._stats[provider]
+        host_limiter = self._host_limiter(host) if host else None
+        if host_limiter is not None:
+            host_limiter.users += 1
+
+        started = time.perf_counter()
+        stats.waiting += 1
+        acquired = []
+        try:
+            await self._semaphores[provider].acquire()
+            acquired.append(self._semaphores[provider])
+            if host_limiter is not None:
+                await host_limiter.semaphore.acquire()
+                acquired.append(host_limiter.semaphore)
+                if host_limiter.bucket is not None:
+                    await host_limiter.bucket.acquire()
+            if provider in self._buckets:
+                await self._buckets[provider].acquire()
+            await self._global.acquire()
+            acquired.append(self._global)
+        except BaseException:
+            for semaphore in reversed(acquired):
+                semaphore.release()
+            if host_limiter is not None:
+                host_limiter.users -= 1
+            raise
+        finally:
+            stats.waiting -= 1
+
+        stats.record(time.perf_counter() - started)
+        stats.in_flight += 1
+        try:
+            yield
+        finally:
+            stats.in_flight -= 1
+            for semaphore in reversed(acquired):
+                semaphore.release()
+            if host_limiter is not None:
+                host_limiter.users -= 1
+
+    def stats(self) -> Dict:
+        return {
+            'max_concurrency': self.max_concurrency,
+            'hosts_tracked': len(self._hosts),
+            'providers': {provider: stats.summary() for provider, stats in self._stats.items()}
+        }
+
+    @classmethod
+    def from_env(cls) -> "OutboundScheduler":
+        """
+        Configure from OUTBOUND_* environment variables, e.g.
+        OUTBOUND_SERPER_CONCURRENCY=10, OUTBOUND_SERPER_RATE=5, OUTBOUND_SERPER_BURST=10
+        """
+        limits = {}
+        for provider, (concurrency, rate, burst) in DEFAULT_LIMITS.items():
+            prefix = f"OUTBOUND_{provider.upper()}_"
+            rate = float(os.getenv(prefix + "RATE", rate))
+            limits[provider] = (
+                int(os.getenv(prefix + "CONCURRENCY", concurrency)),
+                rate,
+                float(os.getenv(prefix + "BURST", burst or rate))
+            )
+        return cls(
+            max_concurrency=int(os.getenv("OUTBOUND_MAX_CONCURRENCY", 64)),
+            limits=limits,
+            host_concurrency=int(os.getenv("OUTBOUND_HOST_CONCURRENCY", 2)),
+            host_rate=float(os.getenv("OUTBOUND_HOST_RATE", 2)),
+            max_hosts=int(os.getenv("OUTBOUND_MAX_HOSTS", 1024))
+        )
+
+
+# Shared by every outbound call in the process
+scheduler = OutboundScheduler.from_env()
@@ -0,0 +1,323 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import time
+import re
+import os
+
+VOCAB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "vocab")
+
+# Vocabulary file -> preference category
+VOCAB_CATEGORIES = {
+    'brands': 'Brand',
+    'colors': 'Color',
+    'sizes': 'Size',
+    'materials': 'Material'
+}
+
+# Preference category of an amount with a unit ("15 inch" -> Size: 15 in)
+UNIT_CATEGORIES = {
+    'in': 'Size', 'cm': 'Size', 'mm': 'Size',
+    'GB': 'Storage', 'TB': 'Storage',
+    'qt': 'Capacity', 'L': 'Capacity', 'oz': 'Capacity',
+    'lb': 'Weight', 'kg': 'Weight',
+    'W': 'Power', 'mAh': 'Battery', 'Hz': 'Refresh Rate'
+}
+
+# Budget levels given without an amount
+BUDGET_LEVELS = {'Low': 'Budget-friendly', 'High': 'Premium'}
+
+# Unit spellings that are also words: only a unit when written against the number ("15in", not "990 in grey")
+ATTACHED_ONLY_UNITS = {"in", "l", "w"}
+
+# Largest bare number read as a clothing or shoe size when the size was asked for
+MAX_BARE_SIZE = 60
+
+# Letter sizes only recognized right after "size" ("size m")
+LETTER_SIZES = {'xxs': 'XXS', 'xs': 'XS', 's': 'Small', 'm': 'Medium', 'l': 'Large', 'xl': 'XL', 'xxl': 'XXL', 'xxxl': 'XXXL'}
+
+NUMBER_PATTERN = re.compile(r"(\$\s?)?(\d+(?:,\d{3})*(?:\.\d+)?)(\s?k\b)?")
+SIZE_PATTERN = re.compile(r"\bsize\s+(?:(\d+(?:\.\d+)?)|(" + "|".join(LETTER_SIZES) + r"))\b")
+RANGE_JOINER = re.compile(r"^\s*(-|–|to|and)\s*$")
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:['&.-][a-z0-9]+)*")
+
+# Words an answer can contain without carrying a preference
+FILLER_WORDS = {
+    "i", "i'm", "im", "id", "i'd", "me", "my", "a", "an", "the", "and", "or", "but", "with", "in", "of", "for", "to",
+    "is", "it", "its", "be", "would", "like", "prefer", "preferably", "want", "need", "looking", "something", "some",
+    "maybe", "probably", "please", "ideally", "really", "just", "color", "colour", "size", "brand", "material",
+    "budget", "price", "spend", "around", "any", "fine", "ok", "okay", "good", "great", "thanks",
+    "thank", "you", "yes", "too", "very", "also", "either", "one", "ones", "that", "this", "are", "can",
+    "could", "do", "have", "has", "if", "possible", "range", "under", "over", "usd", "dollars",
+    "wear", "usually", "normally", "go", "get", "will", "works"
+}
+
+# Words that turn a preference around ("not black", "no leather", "anything but Apple")
+NEGATION_WORDS = {
+    "no", "not", "nor", "never", "none", "nothing", "neither", "without", "except", "excluding", "avoid", "hate",
+    "anything", "don't", "dont", "doesn't", "doesnt", "isn't", "isnt", "won't", "can't", "cannot", "dislike"
+}
+
+# Words of missing_info that ask for each category; unit categories are also asked by "features"/"specs"
+ASKED_CATEGORIES = {
+    'Brand': ("brand",),
+    'Color': ("color", "colour"),
+    'Size': ("size", "fit", "dimension"),
+    'Material': ("material", "fabric"),
+    'Budget': ("budget", "price", "cost")
+}
+
+
+def load_vocabulary(name: str, directory: str = VOCAB_DIR) -> List[Tuple[str, List[str], bool]]:
+    """
+    Entries of data/vocab/<name>.txt as (canonical, aliases, capitalized_only)
+    Lines are "Canonical: alias, alias"; a leading "!" means the canonical name
+    is also a common word and only counts when written with a capital.
+    """
+    entries = []
+    with open(os.path.join(directory, f"{name}.txt"), encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            canonical, _, aliases = line.partition(":")
+            capitalized_only = canonical.startswith("!")
+            canonical = canonical.lstrip("!").strip()
+            entries.append((canonical, [alias.strip() for alias in aliases.split(",") if alias.strip()], capitalized_only))
+    return entries
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: every occurrence of every pattern in one pass over the text"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per node: (pattern length, payload) of every pattern ending there
+        self._output: List[List[Tuple[int, Any]]] = [[]]
+        self.patterns = 0
+
+    def add(self, pattern: str, payload: Any):
+        node = 0
+        for char in pattern:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][char] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = child
+        self._output[node].append((len(pattern), payload))
+        self.patterns += 1
+
+    def build(self):
+        """Compute failure links breadth-first; call once after the last add()"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """(start, end, payload) of every match"""
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length, payload in self._output[node]:
+                yield index + 1 - length, index + 1, payload
+
+
+def _asked(category: str, asked: str) -> bool:
+    """Whether missing_info (joined, lower-cased) asks for a preference category"""
+    if category in ASKED_CATEGORIES:
+        return any(word in asked for word in ASKED_CATEGORIES[category])
+    return category.lower() in asked or "feature" in asked or "spec" in asked
+
+
+@dataclass
+class Extraction:
+    """Preferences found in a message and how much of the message they explain"""
+    preferences: Dict[str, str]
+    coverage: float
+    spans: List[Tuple[int, int, str]] = field(default_factory=list)
+
+
+def _format_amount(amount: float) -> str:
+    return f"${amount:,.0f}" if amount == int(amount) else f"${amount:,.2f}"
+
+
+class PreferenceExtractor:
+    """
+    Local extraction of clarification answers ("black, size 10, under $120")
+
+    Brands, colors, sizes, materials, price qualifiers and units are loaded
+    from data/vocab into one Aho-Corasick automaton and matched in a single
+    pass; amounts are then attached to adjacent units or price qualifiers and
+    normalized ("15-inch" -> "15 in", "100 to 200 bucks" -> "$100-$200").
+
+    With missing_info, only the categories it asks for are extracted; other
+    matches ("coffee" when only the budget was asked) are left uncovered. A
+    negation outside a recognized phrase ("not black") sets the coverage to
+    0, so the answer goes to the LLM.
+    """
+
+    def __init__(self, directory: str = VOCAB_DIR):
+        started = time.perf_counter()
+        self._matcher = AhoCorasick()
+        for name, category in VOCAB_CATEGORIES.items():
+            for canonical, aliases, capitalized_only in load_vocabulary(name, directory):
+                self._matcher.add(canonical.lower(), (category, canonical, capitalized_only))
+                for alias in aliases:
+                    self._matcher.add(alias.lower(), (category, canonical, False))
+        for kind, phrases, _ in load_vocabulary("price", directory):
+            for phrase in phrases:
+                self._matcher.add(phrase.lower(), ('price', kind, False))
+        for unit, aliases, _ in load_vocabulary("units", directory):
+            for alias in [unit] + aliases:
+                self._matcher.add(alias.lower(), ('unit', unit, False))
+        self._matcher.build()
+        self.build_seconds = time.perf_counter() - started
+        self.counters = {'local': 0, 'fallback': 0, 'seconds': 0.0}
+
+    def _vocabulary_matches(self, text: str, lowered: str) -> List[Tuple[int, int, str, str]]:
+        """Leftmost-longest whole-word matches as (start, end, category, value)"""
+        candidates = []
+        for start, end, (category, value, capitalized_only) in self._matcher.iter(lowered):
+            # Word boundaries, except that units may follow a number directly ("15in", "1tb")
+            if lowered[start].isalnum() and start > 0 and lowered[start - 1].isalnum():
+                if not (category == 'unit' and lowered[start - 1].isdigit()):
+                    continue
+            if lowered[end - 1].isalnum() and end < len(lowered) and lowered[end].isalnum():
+                continue
+            if capitalized_only and text[start:end] == lowered[start:end]:
+                continue
+            candidates.append((start, end, category, value))
+
+        candidates.sort(key=lambda match: (match[0], match[0] - match[1]))
+        matches, covered_until = [], 0
+        for match in candidates:
+            if match[0] >= covered_until:
+                matches.append(match)
+                covered_until = match[1]
+        return matches
+
+    def extract(self, message: str, missing_info: Optional[List[str]] = None) -> Extraction:
+        started = time.perf_counter()
+        lowered = message.lower()
+        # Case checks need the original text aligned with the lower-cased one
+        text = message if len(message) == len(lowered) else lowered
+        asked = " ".join(missing_info or []).lower()
+        expects_budget = "budget" in asked or "price" in asked
+        expects_size = "size" in asked
+
+        def allowed(category: str) -> bool:
+            return not asked or _asked(category, asked)
+
+        matches = [
+            match for match in self._vocabulary_matches(text, lowered)
+            if match[2] == 'unit' or allowed('Budget' if match[2] == 'price' else match[2])
+        ]
+        spans = [(start, end, category) for start, end, category, _ in matches]
+        values: Dict[str, List[str]] = {}
+
+        def add(category: str, value: str):
+            values.setdefault(category, [])
+            if value not in values[category]:
+                values[category].append(value)
+
+        for start, end, category, value in matches:
+            if category in VOCAB_CATEGORIES.values():
+                add(category, value)
+
+        def adjacent(position: int, before: bool) -> Optional[Tuple[int, int, str, str]]:
+            """Vocabulary match separated from position by whitespace only"""
+            for match in matches:
+                gap = lowered[match[1]:position] if before else lowered[position:match[0]]
+                if (match[1] <= position if before else match[0] >= position) and not gap.strip():
+                    return match
+            return None
+
+        # "size 10", "size m"
+        for size in SIZE_PATTERN.finditer(lowered if allowed('Size') else ""):
+            add('Size', size.group(1) or LETTER_SIZES[size.group(2)])
+            spans.append((size.start(), size.end(), 'Size'))
+
+        amounts = []
+        for number in NUMBER_PATTERN.finditer(lowered):
+            start, end = number.span()
+            # Digits inside a name or an already parsed size ("insta360", "2xl", "size 10")
+            if any(s <= start < e for s, e, category in spans if category != 'price'):
+                continue
+            amount = float(number.group(2).replace(",", "")) * (1000 if number.group(3) else 1)
+            unit = adjacent(end, before=False)
+            if unit is not None and unit[2] == 'unit' and (unit[0] == end or lowered[unit[0]:unit[1]] not in ATTACHED_ONLY_UNITS):
+                if allowed(UNIT_CATEGORIES[unit[3]]):
+                    add(UNIT_CATEGORIES[unit[3]], f"{number.group(2)} {unit[3]}")
+                    spans.append((start, unit[1], 'unit'))
+                continue
+            before, after = adjacent(start, before=True), adjacent(end, before=False)
+            is_money = bool(number.group(1)) or (after is not None and after[3] == 'Currency') \
+                or (before is not None and before[2] == 'price')
+            if not is_money and expects_size and amount <= MAX_BARE_SIZE:
+                add('Size', number.group(2))
+                spans.append((start, end, 'Size'))
+            elif (is_money or expects_budget) and allowed('Budget'):
+                amounts.append((start, end, amount, before, after))
+                spans.append((start, end, 'price'))
+
+        # Ranges: "$100-$200", "between 100 and 200", "100 to 200 bucks"
+        budgets = []
+        index = 0
+        while index < len(amounts):
+            start, end, amount, before, after = amounts[index]
+            if index + 1 < len(amounts) and RANGE_JOINER.match(lowered[end:amounts[index + 1][0]]):
+                budgets.append(f"{_format_amount(amount)}-{_format_amount(amounts[index + 1][2])}")
+                spans.append((end, amounts[index + 1][0], 'price'))
+                index += 2
+                continue
+            # Qualifier before the amount, or after it and its currency word ("200 dollars or less")
+            if after is not None and after[3] == 'Currency':
+                after = adjacent(after[1], before=False)
+            kinds = [match[3] for match in (before, after) if match is not None and match[2] == 'price']
+            qualifier = next((kind for kind in kinds if kind in ('Under', 'Over', 'Around')), None)
+            budgets.append(f"{qualifier} {_format_amount(amount)}" if qualifier else _format_amount(amount))
+            index += 1
+        if budgets:
+            values['Budget'] = budgets[:1]
+        else:
+            for start, end, category, value in matches:
+                if category == 'price' and value in BUDGET_LEVELS:
+                    add('Budget', BUDGET_LEVELS[value])
+                    break
+
+        preferences = {category: ", ".join(items) for category, items in values.items()}
+
+        # Share of content words that fall inside a recognized span
+        words = [word for word in WORD_PATTERN.finditer(lowered) if word.group() not in FILLER_WORDS]
+        covered = [word for word in words if any(s <= word.start() < e for s, e, _ in spans)]
+        coverage = len(covered) / len(words) if words else (1.0 if preferences else 0.0)
+        # "no more than 1k" is a budget, "not black" is left to the LLM
+        if any(word.group() in NEGATION_WORDS and word not in covered for word in words):
+            coverage = 0.0
+
+        self.counters['seconds'] += time.perf_counter() - started
+        return Extraction(preferences, round(coverage, 3), sorted(spans))
+
+    def stats(self) -> Dict:
+        total = self.counters['local'] + self.counters['fallback']
+        return {
+            **self.counters,
+            'seconds': round(self.counters['seconds'], 4),
+            'patterns': self._matcher.patterns,
+            'build_ms': round(self.build_seconds * 1000, 1),
+            'local_rate': round(self.counters['local'] / total, 4) if total else 0.0
+        }
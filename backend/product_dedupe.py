@@ -0,0 +1,232 @@
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List
+from query_classifier import CATEGORY_VOCAB
+import time
+import re
+import os
+
+# Words that never distinguish two products
+FILLER_WORDS = {
+    'the', 'a', 'an', 'and', 'with', 'for', 'by', 'of', 'in', 'new', 'edition', 'model', 'version', 'series',
+    'gen', 'generation', 'wireless', 'bluetooth', 'noise', 'cancelling', 'canceling', 'smart', 'inch', 'in',
+    'mm', 'cm', 'gb', 'tb', 'oz', 'lb', 'lbs', 'qt', 'hz', 'mah', 'w', 'l', "men's", "women's", 'mens', 'womens'
+}
+
+# Variant words: "Galaxy S24" and "Galaxy S24 Ultra", "Ghost 15" and "Ghost 15 GTX" are different products
+VARIANT_WORDS = {
+    'pro', 'max', 'plus', 'ultra', 'mini', 'lite', 'se', 'slim', 'xl', 'fe', 'gtx', 'wide', 'narrow'
+}
+VARIANT_ALIASES = {'goretex': 'gtx'}
+
+# Product lines that CATEGORY_VOCAB lists as nouns ("iPhone 15" names a product, not a kind)
+LINE_NOUNS = {'iphone', 'ipad', 'macbook', 'airpod', 'gopro'}
+
+# Single-word product nouns by which two names may disagree ("... Earbuds" vs "... Headphones")
+KIND_WORDS = ({noun.rstrip('s') for nouns in CATEGORY_VOCAB.values() for noun in nouns if ' ' not in noun} - LINE_NOUNS) | {
+    'hoody', 'vest', 'parka', 'pullover', 'fleece', 'anorak', 'blazer', 'cardigan'
+}
+
+# Words naming an accessory of a product ("iPhone 15 Case", "WH-1000XM5 Ear Pads")
+ACCESSORY_WORDS = {
+    'case', 'cover', 'pad', 'earpad', 'cushion', 'tip', 'charger', 'cable', 'adapter', 'strap', 'band', 'sleeve',
+    'protector', 'skin', 'mount', 'dock', 'holder', 'bumper', 'refill', 'filter', 'battery', 'replacement'
+}
+
+# Generations written as roman numerals ("A7 IV" / "A7 III"); "i" is left out
+ROMAN_NUMERALS = {'ii': 2, 'iii': 3, 'iv': 4, 'v': 5, 'vi': 6, 'vii': 7, 'viii': 8, 'ix': 9, 'x': 10}
+
+UNIT_SUFFIX = re.compile(r"(\d)(inch|in|mm|cm|gb|tb|oz|lbs?|qt|hz|mah|w|l)\b")
+ORDINAL = re.compile(r"^(\d+)(st|nd|rd|th)$")
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+# Short letter prefix written apart from its model number ("wh 1000xm5")
+MODEL_PREFIX = re.compile(r"\b([a-z]{1,3}) (\d+[a-z][a-z0-9]*)\b")
+
+
+def _join_model_prefix(match: "re.Match") -> str:
+    prefix = match.group(1)
+    if prefix in FILLER_WORDS or prefix in VARIANT_WORDS:
+        return match.group(0)
+    return prefix + match.group(2)
+
+
+@dataclass(frozen=True)
+class ProductKey:
+    """Normalized view of a product name used for matching"""
+    tokens: FrozenSet[str]
+    # Tokens joined in order, so "Quiet Comfort" and "QuietComfort" agree
+    compact: str
+    models: FrozenSet[str] = field(default_factory=frozenset)
+    numbers: FrozenSet[str] = field(default_factory=frozenset)
+    variants: FrozenSet[str] = field(default_factory=frozenset)
+    kinds: FrozenSet[str] = field(default_factory=frozenset)
+    accessories: FrozenSet[str] = field(default_factory=frozenset)
+    generations: FrozenSet[int] = field(default_factory=frozenset)
+
+
+def product_key(name: str) -> ProductKey:
+    """Tokens, model numbers ("wh1000xm5"), plain numbers, variants, product and accessory nouns of a name"""
+    text = name.lower().replace('™', '').replace('®', '')
+    # "WH-1000XM5" / "WH 1000XM5" -> "wh1000xm5"; "65-inch" -> "65 inch"
+    text = re.sub(r"(?<=[a-z0-9])-(?=[a-z0-9])", "", text)
+    text = MODEL_PREFIX.sub(_join_model_prefix, text)
+    text = UNIT_SUFFIX.sub(r"\1 \2", text)
+
+    tokens, models, numbers, variants, kinds, accessories, generations = [], set(), set(), set(), set(), set(), set()
+    for word in WORD_PATTERN.findall(text):
+        ordinal = ORDINAL.match(word)
+        if ordinal:
+            word = ordinal.group(1)
+        word = VARIANT_ALIASES.get(word, word)
+        if word in FILLER_WORDS:
+            continue
+        if word.rstrip('s') in KIND_WORDS:
+            kinds.add(word.rstrip('s'))
+            continue
+        if word in ACCESSORY_WORDS or word.rstrip('s') in ACCESSORY_WORDS:
+            accessories.add(word.rstrip('s') if word.rstrip('s') in ACCESSORY_WORDS else word)
+        elif word in ROMAN_NUMERALS:
+            generations.add(ROMAN_NUMERALS[word])
+        elif word.isdigit():
+            numbers.add(word)
+        elif any(char.isdigit() for char in word):
+            models.add(word)
+        elif word in VARIANT_WORDS:
+            variants.add(word)
+        tokens.append(word)
+    return ProductKey(
+        tokens=frozenset(tokens),
+        compact="".join(tokens),
+        models=frozenset(models),
+        numbers=frozenset(numbers),
+        variants=frozenset(variants),
+        kinds=frozenset(kinds),
+        accessories=frozenset(accessories),
+        generations=frozenset(generations)
+    )
+
+
+def _models_match(a: FrozenSet[str], b: FrozenSet[str]) -> bool:
+    # "1000xm5" matches "wh1000xm5": the shorter one is a suffix of the longer one
+    return any(x == y or (min(len(x), len(y)) >= 4 and (x.endswith(y) or y.endswith(x))) for x in a for y in b)
+
+
+def name_similarity(a: ProductKey, b: ProductKey) -> float:
+    """Jaccard similarity of the name tokens"""
+    if not a.tokens or not b.tokens:
+        return 0.0
+    return len(a.tokens & b.tokens) / len(a.tokens | b.tokens)
+
+
+def same_product(a: ProductKey, b: ProductKey, min_similarity: float = 0.5) -> bool:
+    """
+    Decide whether two names denote the same product
+
+    Differing variants ("Ghost 15" / "Ghost 15 GTX"), accessories ("iPhone 15"
+    / "iPhone 15 Case"), generations ("A7 IV" / "A7 III") or product nouns
+    where both names have some rule a match out, as do conflicting numbers
+    ("Pegasus 40" / "41") or model numbers ("MX Master 3S" / "3"). A shared model
+    number only needs a weak name overlap (same brand or line); otherwise one
+    name's tokens must contain the other's ("Nike Pegasus 40" / "Nike Air
+    Zoom Pegasus 40", but not "Osprey Atmos AG 65" / "Osprey Aura AG 65").
+    """
+    if a.variants != b.variants or a.accessories != b.accessories or a.generations != b.generations:
+        return False
+    if a.kinds and b.kinds and a.kinds != b.kinds:
+        return False
+    if a.numbers and b.numbers and not a.numbers & b.numbers:
+        return False
+    if a.models and b.models:
+        if not _models_match(a.models, b.models):
+            return False
+        return a.compact == b.compact or name_similarity(a, b) >= min_similarity / 2
+    identifiers_a, identifiers_b = a.models | a.numbers, b.models | b.numbers
+    if identifiers_a and identifiers_b and not _models_match(identifiers_a, identifiers_b):
+        return False
+    if a.compact == b.compact:
+        return True
+    smaller, larger = sorted((a.tokens, b.tokens), key=len)
+    return smaller <= larger and name_similarity(a, b) >= min_similarity
+
+
+def _merge_lists(*lists) -> List:
+    # Union in order of appearance, case-insensitive for strings
+    merged, seen = [], set()
+    for items in lists:
+        for item in items or []:
+            marker = item.strip().lower() if isinstance(item, str) else repr(item)
+            if marker not in seen:
+                seen.add(marker)
+                merged.append(item)
+    return merged
+
+
+def merge_products(group: List[Dict]) -> Dict:
+    """
+    Merge recommendations of one product; the first one keeps its name
+    Features, pros and cons are combined, missing fields filled in and the
+    sources joined ("OpenAI, Perplexity").
+    """
+    merged = dict(group[0])
+    for key in ('features', 'pros', 'cons'):
+        merged[key] = _merge_lists(*(rec.get(key) for rec in group))
+    for rec in group[1:]:
+        for key, value in rec.items():
+            if merged.get(key) in (None, "", []) and value not in (None, "", []):
+                merged[key] = value
+    sources = _merge_lists(*([rec['source']] for rec in group if rec.get('source')))
+    if sources:
+        merged['source'] = ", ".join(sources)
+    return merged
+
+
+class ProductDeduplicator:
+    """
+    Entity resolution over recommendations from several models
+
+    dedupe() merges recommendations that name the same product, so product
+    detailing (search, scraping, summarization) runs once per distinct product.
+    """
+
+    def __init__(self, enabled: bool = True, min_similarity: float = 0.5):
+        self.enabled = enabled
+        self.min_similarity = min_similarity
+        self.counters = {'input': 0, 'output': 0, 'merged': 0, 'seconds': 0.0}
+
+    def dedupe(self, recommendations: List[Dict]) -> List[Dict]:
+        if not self.enabled or len(recommendations) < 2:
+            return recommendations
+        started = time.perf_counter()
+        keys = [product_key(str(rec.get('name', ''))) for rec in recommendations]
+
+        # Group each recommendation with the first earlier group whose every member it matches
+        groups: List[List[int]] = []
+        for index, key in enumerate(keys):
+            for group in groups:
+                if all(same_product(keys[member], key, self.min_similarity) for member in group):
+                    group.append(index)
+                    break
+            else:
+                groups.append([index])
+
+        result = [merge_products([recommendations[i] for i in group]) for group in groups]
+        self.counters['input'] += len(recommendations)
+        self.counters['output'] += len(result)
+        self.counters['merged'] += len(recommendations) - len(result)
+        self.counters['seconds'] += time.perf_counter() - started
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            **self.counters,
+            'seconds': round(self.counters['seconds'], 4),
+            'enabled': self.enabled,
+            'merge_rate': round(self.counters['merged'] / self.counters['input'], 4) if self.counters['input'] else 0.0
+        }
+
+    @classmethod
+    def from_env(cls) -> "ProductDeduplicator":
+        """Configure from PRODUCT_DEDUPE_* environment variables"""
+        return cls(
+            enabled=os.getenv("PRODUCT_DEDUPE_ENABLED", "1").lower() in ("1", "true", "yes"),
+            min_similarity=float(os.getenv("PRODUCT_DEDUPE_MIN_SIMILARITY", 0.5))
+        )
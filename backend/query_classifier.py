@@ -0,0 +1,315 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from preference_extractor import load_vocabulary
+import time
+import re
+import os
+
+# Product categories and the nouns (singular and plural) that name them
+CATEGORY_VOCAB = {
+    'headphones': ["headphone", "headphones", "earbud", "earbuds", "headset", "headsets", "earphone", "earphones", "airpods"],
+    'speakers': ["speaker", "speakers", "soundbar", "soundbars"],
+    'shoes': ["shoe", "shoes", "sneaker", "sneakers", "boot", "boots", "sandal", "sandals", "heels", "loafers", "trainers"],
+    'clothing': ["jacket", "jackets", "coat", "coats", "shirt", "shirts", "t-shirt", "t-shirts", "dress", "dresses",
+                 "jeans", "pants", "hoodie", "hoodies", "sweater", "sweaters", "leggings", "shorts", "socks", "raincoat"],
+    'bags': ["backpack", "backpacks", "bag", "bags", "suitcase", "suitcases", "luggage", "purse", "wallet", "tote"],
+    'laptops': ["laptop", "laptops", "notebook", "notebooks", "chromebook", "chromebooks", "macbook"],
+    'computers': ["desktop", "pc", "computer", "computers", "tablet", "tablets", "ipad", "monitor", "monitors"],
+    'peripherals': ["keyboard", "keyboards", "mouse", "mice", "webcam", "webcams", "router", "routers", "printer", "printers"],
+    'phones': ["phone", "phones", "smartphone", "smartphones", "iphone", "cellphone"],
+    'wearables': ["watch", "watches", "smartwatch", "smartwatches", "tracker", "trackers"],
+    'cameras': ["camera", "cameras", "lens", "lenses", "drone", "drones", "gopro"],
+    'tv': ["tv", "tvs", "television", "televisions", "projector", "projectors"],
+    'gaming': ["console", "consoles", "controller", "controllers", "gpu", "graphics card"],
+    'kitchen': ["blender", "blenders", "coffee maker", "espresso machine", "air fryer", "toaster", "kettle",
+                "microwave", "cookware", "knife", "knives", "pan", "pans", "mixer"],
+    'home': ["vacuum", "vacuums", "mattress", "mattresses", "pillow", "pillows", "chair", "chairs", "desk", "desks",
+             "sofa", "couch", "lamp", "lamps", "air purifier", "humidifier", "fan", "heater"],
+    'outdoor': ["tent", "tents", "sleeping bag", "bike", "bikes", "bicycle", "helmet", "kayak", "grill"],
+    'beauty': ["shampoo", "moisturizer", "sunscreen", "serum", "perfume", "razor", "hair dryer", "toothbrush"],
+    'baby': ["stroller", "strollers", "car seat", "crib", "diapers"],
+}
+
+# Categories where fit and look matter, so size and color are worth asking about
+APPAREL_CATEGORIES = {'shoes', 'clothing'}
+
+# Brand names and aliases from data/vocab (names that are also common words are left out)
+BRANDS = {
+    term.lower()
+    for canonical, aliases, capitalized_only in load_vocabulary("brands")
+    for term in ([] if capitalized_only else [canonical]) + aliases
+}
+
+# Product lines often written without a brand ("iphone 15", "galaxy s24")
+PRODUCT_LINES = {
+    "iphone", "ipad", "macbook", "airpods", "galaxy", "pixel", "surface", "thinkpad", "xps", "zenbook", "kindle",
+    "playstation", "ps5", "switch", "quietcomfort", "qc", "wh", "wf", "pegasus", "ultraboost", "clifton", "ghost",
+    "rtx", "gtx", "rx", "forerunner", "fenix", "era", "eos", "alpha", "mx"
+}
+
+# Line suffixes a generation number may follow ("airpods pro 2", "galaxy z fold 5")
+LINE_SUFFIXES = {"pro", "max", "ultra", "mini", "plus", "air", "lite", "fold", "flip", "z"}
+
+# Words that make a neighbouring number a size, age, price or count rather than a model
+# ("size 10", "for 2 kids", "under 300", "2 pack")
+NUMBER_LEADS = {"size", "sizes", "for", "under", "over", "below", "above", "around", "about", "max", "than"}
+NUMBER_TAILS = {"pack", "packs", "pc", "pcs", "pieces", "count", "ct", "year", "years", "yr", "yrs", "month",
+                "months", "kids", "people", "persons", "person", "players", "seater", "set", "sets"}
+
+YEAR_PATTERN = re.compile(r"^(19|20)\d\d$")
+
+# Words that ask for "something" without naming a product
+GENERIC_TERMS = {
+    "gift", "gifts", "present", "presents", "stuff", "something", "things", "ideas", "toys", "products", "items"
+}
+
+# Words that carry no product information ("I need a new ...", "help me find ...")
+FILLER_WORDS = {
+    "i", "im", "i'm", "me", "my", "a", "an", "the", "some", "new", "good", "best", "great", "nice", "need", "want",
+    "looking", "find", "help", "recommend", "buy", "get", "should", "what", "which", "to", "please", "pair", "of"
+}
+
+# Tokens that carry digits but describe a spec, not a model ("32gb", "65inch", "4k")
+UNIT_TOKEN = re.compile(
+    r"^\d+(\.\d+)?(gb|tb|mb|mm|cm|m|in|inch|inches|k|p|hz|w|mah|oz|lb|lbs|ft|ml|l|v|mp|x|qt|quart|st|nd|rd|th)$"
+)
+
+# Letters and digits mixed in one token ("wh-1000xm5", "qc45", "s24", "m2")
+MODEL_TOKEN = re.compile(r"^(?=[a-z0-9-]*[a-z])(?=[a-z0-9-]*\d)[a-z0-9]+(-[a-z0-9]+)*$")
+
+# Mixed tokens that are ages, paper sizes, formats or standards, never models ("5yo", "a4", "mp3", "usb-c")
+NON_MODEL_TOKEN = re.compile(
+    r"^(\d+(yo|y/o|yr|yrs|mo|mos|months?|years?)(old)?|[ab]\d{1,2}|mp[34]|m4a|[hx]26[45]|usb-?[abc]|"
+    r"wi-?fi-?\d[a-z]?|[2345]g|lte|[23]d|covid-?19|k?n95|ffp[123])$"
+)
+
+PRICE_PATTERN = re.compile(
+    r"\$\s?\d|\b\d+\s*(dollars|usd|bucks|euros|eur|gbp|pounds)\b|"
+    r"\b(under|below|less than|at most|max|budget|around|about|up to|cheaper than|between)\s+\$?\d|"
+    r"\b(cheap|cheapest|affordable|budget|premium|high-end|luxury|inexpensive)\b"
+)
+
+USE_CASE_PATTERN = re.compile(
+    r"\bfor\s+(?!me\b|it\b|a\b|an\b|the\b|sale\b)[a-z]+|"
+    r"\b(running|hiking|gaming|travel|traveling|commuting|office|work|gym|yoga|cycling|swimming|camping|"
+    r"school|college|students?|kids|beginners?|professionals?|outdoor|indoor|home|studio|streaming|"
+    r"photography|video editing|programming|coding|walking|trail|workout|training|sleeping|babies)\b"
+)
+
+FEATURE_PATTERN = re.compile(
+    r"\b(wireless|wired|bluetooth|noise[- ]cancell?ing|anc|waterproof|water[- ]resistant|lightweight|portable|"
+    r"foldable|mechanical|ergonomic|oled|qled|4k|8k|hdr|touchscreen|2-in-1|quiet|durable|compact|"
+    r"rechargeable|cordless|organic|vegan|leather|cotton|wool|waterproof|breathable|insulated|"
+    r"stainless steel|non-stick|long battery|fast charging|usb-c|wide|narrow|slim|large|small|"
+    r"black|white|red|blue|green|grey|gray|pink|brown|beige|navy|silver|gold)\b"
+)
+
+SIZE_PATTERN = re.compile(r"\bsize\s+\w+|\b(xxs|xs|xl|xxl|xxxl|petite|plus size|twin|queen|king)\b")
+
+COMPARISON_PATTERN = re.compile(r"\b(vs\.?|versus|compared? to|or|better than)\b")
+
+WORD_PATTERN = re.compile(r"[a-z0-9$]+(?:['.-][a-z0-9]+)*")
+
+# Slot names as asked for in clarification questions
+SLOT_NAMES = ["budget", "use case", "brand", "key features"]
+
+
+@dataclass
+class QueryVerdict:
+    """Local specificity decision; is_specific is None when the LLM should decide"""
+    is_specific: Optional[bool]
+    confidence: float
+    missing_info: List[str] = field(default_factory=list)
+    reasoning: str = ""
+    signals: Dict = field(default_factory=dict)
+
+
+def _vocabulary_pattern(terms) -> "re.Pattern":
+    """One regex matching any term of a vocabulary as a whole word (or phrase)"""
+    alternatives = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    return re.compile(r"(?<![a-z0-9])(" + alternatives + r")(?![a-z0-9])")
+
+
+CATEGORY_PATTERNS = {category: _vocabulary_pattern(nouns) for category, nouns in CATEGORY_VOCAB.items()}
+BRAND_PATTERN = _vocabulary_pattern(BRANDS)
+BRAND_END_PATTERN = re.compile(BRAND_PATTERN.pattern + r"$")
+CATEGORY_NOUNS = {noun for nouns in CATEGORY_VOCAB.values() for noun in nouns}
+
+
+def _after_brand_or_line(words: List[str], position: int) -> bool:
+    """A brand or product line within the three words before words[position]"""
+    previous = words[max(0, position - 3):position]
+    return any(word in PRODUCT_LINES for word in previous) or BRAND_PATTERN.search(" ".join(previous)) is not None
+
+
+def _model_number(words: List[str], position: int) -> bool:
+    """
+    words[position] is a bare number naming a model: right after a brand or
+    product line ("rtx 4090", "new balance 990", "airpods pro 2"), and not a
+    year, size, age, price or count ("nike 2024", "samsung 2 pack")
+    """
+    word = words[position]
+    following = words[position + 1] if position + 1 < len(words) else ""
+    if YEAR_PATTERN.match(word) or following in NUMBER_TAILS or UNIT_TOKEN.match(word + following):
+        return False
+    before = position
+    while before > 0 and position - before < 2 and words[before - 1] in LINE_SUFFIXES:
+        before -= 1
+    if before == 0 or words[before - 1] in NUMBER_LEADS:
+        return False
+    return words[before - 1] in PRODUCT_LINES or BRAND_END_PATTERN.search(" ".join(words[max(0, before - 3):before])) is not None
+
+
+def _names_product(side: str) -> bool:
+    """
+    One side of a comparison names a product: a product line, or a brand with
+    a word that is not a category, feature or filler ("Kobo Clara", not "Nike shoes")
+    """
+    words = WORD_PATTERN.findall(side)
+    if any(word in PRODUCT_LINES for word in words):
+        return True
+    if BRAND_PATTERN.search(side) is None:
+        return False
+    rest = WORD_PATTERN.findall(BRAND_PATTERN.sub(" ", side))
+    return any(
+        word not in FILLER_WORDS and word not in GENERIC_TERMS and word.rstrip("s") not in CATEGORY_NOUNS
+        and word not in CATEGORY_NOUNS and not FEATURE_PATTERN.fullmatch(word) and not PRICE_PATTERN.fullmatch(word)
+        for word in rest
+    )
+
+
+def extract_signals(query: str, preferences: Optional[Dict] = None) -> Dict:
+    """Category, brand, model-number and slot signals of a query (and its known preferences)"""
+    text = query.lower()
+    words = WORD_PATTERN.findall(text)
+
+    categories = sorted(category for category, pattern in CATEGORY_PATTERNS.items() if pattern.search(text))
+    brands = BRAND_PATTERN.findall(text)
+    lines = [word for word in words if word in PRODUCT_LINES]
+
+    models = []
+    for position, word in enumerate(words):
+        if UNIT_TOKEN.match(word) or word.startswith("$") or FEATURE_PATTERN.fullmatch(word):
+            continue
+        if MODEL_TOKEN.match(word):
+            # Only next to a brand or product line ("galaxy s24"), or led by a line ("qc45", "rtx4090")
+            if NON_MODEL_TOKEN.match(word):
+                continue
+            prefix = re.match(r"[a-z]+", word)
+            if word in PRODUCT_LINES or (prefix and prefix.group() in PRODUCT_LINES) or _after_brand_or_line(words, position):
+                models.append(word)
+        elif word.isdigit() and _model_number(words, position):
+            models.append(" ".join(words[max(0, position - 3):position] + [word]))
+
+    # Specs are often written with a space ("6 quart", "65 inch")
+    specs = [word for word in words if UNIT_TOKEN.match(word)]
+    specs += [first + second for first, second in zip(words, words[1:]) if first.isdigit() and UNIT_TOKEN.match(first + second)]
+
+    slots = {
+        'budget': PRICE_PATTERN.search(text) is not None,
+        'use case': USE_CASE_PATTERN.search(text) is not None,
+        'brand': bool(brands or lines),
+        'key features': bool(FEATURE_PATTERN.search(text) or SIZE_PATTERN.search(text) or specs)
+    }
+    # Known preferences fill slots too ({"Budget": "$100", "Color": "Black"})
+    for key in (preferences or {}):
+        name = str(key).strip().lower()
+        if name in ("budget", "price", "price range"):
+            slots['budget'] = True
+        elif name in ("use case", "usage", "purpose", "activity"):
+            slots['use case'] = True
+        elif name == "brand":
+            slots['brand'] = True
+        else:
+            slots['key features'] = True
+
+    return {
+        'words': len(words),
+        'content_words': len([word for word in words if word not in FILLER_WORDS]),
+        'generic': any(word in GENERIC_TERMS for word in words),
+        'categories': categories,
+        'brands': brands,
+        'product_lines': lines,
+        'models': models,
+        'comparison': COMPARISON_PATTERN.search(text) is not None,
+        # Sides of "X or Y" / "X vs Y" that name a product rather than only a brand
+        'compared_products': sum(_names_product(side) for side in COMPARISON_PATTERN.split(text)[::2]),
+        'slots': slots
+    }
+
+
+def classify_query(query: str, preferences: Optional[Dict] = None) -> QueryVerdict:
+    """
+    Decide obvious cases locally:
+    - a model number next to its brand or line, or a comparison between named
+      products, is specific; a comparison of brands only ("apple or samsung") is not
+    - a bare category ("shoes", "a laptop") or a generic ask ("gift ideas") is vague
+    - a category with two or more of budget / use case / brand / features is specific
+    Anything else is left to the LLM.
+    """
+    signals = extract_signals(query, preferences)
+    filled = [name for name, present in signals['slots'].items() if present]
+    missing = [name for name in SLOT_NAMES if name not in filled]
+    if APPAREL_CATEGORIES.intersection(signals['categories']):
+        missing += ["size", "color"]
+
+    if signals['models']:
+        return QueryVerdict(True, 0.95, [], f"Names a specific model ({', '.join(signals['models'])})", signals)
+
+    if signals['compared_products'] >= 2:
+        return QueryVerdict(True, 0.9, [], "Compares named products", signals)
+
+    if signals['categories']:
+        if not filled and signals['content_words'] <= 3:
+            confidence = 0.95 if signals['content_words'] <= 1 else 0.85
+            return QueryVerdict(False, confidence, missing, "Only names a product category", signals)
+        if len(filled) >= 2:
+            return QueryVerdict(True, 0.85, [], f"Category with {', '.join(filled)}", signals)
+    elif signals['generic'] and not (signals['slots']['budget'] or signals['slots']['brand']):
+        return QueryVerdict(False, 0.85, ["product type"] + missing, "Does not name a product", signals)
+
+    return QueryVerdict(None, 0.0, missing, "Ambiguous", signals)
+
+
+class QueryClassifier:
+    """
+    Local fast path in front of the specificity LLM calls
+
+    classify() returns a verdict when the rules above are confident enough,
+    None when the LLM should decide. Counters show how often the call is skipped.
+    """
+
+    def __init__(self, enabled: bool = True, min_confidence: float = 0.8):
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+        self.counters = {'specific': 0, 'vague': 0, 'fallback': 0, 'seconds': 0.0}
+
+    def classify(self, query: str, preferences: Optional[Dict] = None) -> Optional[QueryVerdict]:
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        verdict = classify_query(query, preferences)
+        self.counters['seconds'] += time.perf_counter() - started
+        if verdict.is_specific is None or verdict.confidence < self.min_confidence:
+            self.counters['fallback'] += 1
+            return None
+        self.counters['specific' if verdict.is_specific else 'vague'] += 1
+        return verdict
+
+    def stats(self) -> Dict:
+        decided = self.counters['specific'] + self.counters['vague']
+        total = decided + self.counters['fallback']
+        return {
+            **self.counters,
+            'seconds': round(self.counters['seconds'], 4),
+            'enabled': self.enabled,
+            'skip_rate': round(decided / total, 4) if total else 0.0
+        }
+
+    @classmethod
+    def from_env(cls) -> "QueryClassifier":
+        """Configure from QUERY_CLASSIFIER_* environment variables"""
+        return cls(
+            enabled=os.getenv("QUERY_CLASSIFIER_ENABLED", "1").lower() in ("1", "true", "yes"),
+            min_confidence=float(os.getenv("QUERY_CLASSIFIER_MIN_CONFIDENCE", 0.8))
+        )
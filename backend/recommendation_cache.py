@@ -0,0 +1,205 @@
+from collections import OrderedDict
+from operator import mul
+from typing import Awaitable, Callable, Dict, List, Optional
+from search_cache import CacheBackend, create_cache_backend
+import hashlib
+import json
+import math
+import re
+import os
+
+Embedder = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+def canonical_query(query: str) -> str:
+    """Lower-case, drop punctuation that does not change meaning and collapse whitespace"""
+    text = query.lower()
+    text = re.sub(r"[^\w\s$.,/-]", " ", text)
+    text = re.sub(r"(?<!\d)[.,]|[.,](?!\d)", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def canonical_preferences(preferences: Optional[Dict]) -> Dict:
+    """Preferences with lower-cased keys and values, sorted by key"""
+    if not preferences:
+        return {}
+    return {
+        str(k).strip().lower(): canonical_query(str(v))
+        for k, v in sorted(preferences.items(), key=lambda item: str(item[0]).lower())
+    }
+
+
+# Answers that leave the request as it was
+NO_PREFERENCE_ANSWERS = {
+    "any", "anything", "none", "no preference", "no preferences", "doesn t matter", "does not matter",
+    "don t care", "dont care", "not sure", "whatever", "either", "flexible", "open", "n/a", "na"
+}
+
+
+def preference_drift(query: str, preferences: Optional[Dict]) -> float:
+    """
+    Share of preferences that change the request (0.0 - 1.0)
+
+    A preference changes it unless it is a no-preference answer ("any",
+    "not sure") or every word of it is already in the query ("Sony" for
+    "sony headphones").
+    """
+    canonical = canonical_preferences(preferences)
+    if not canonical:
+        return 0.0
+    query_words = set(canonical_query(query).split())
+    changed = 0
+    for value in canonical.values():
+        if value in NO_PREFERENCE_ANSWERS:
+            continue
+        if not set(value.split()) <= query_words:
+            changed += 1
+    return changed / len(canonical)
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class RecommendationCache:
+    """
+    Cache for generate_recommendations responses
+
+    Entries are keyed on the canonical query, canonical preferences and the
+    model choice. Exact matches are served from a CacheBackend (TTL + LRU).
+    When an embedder is configured, a miss falls back to a cosine-similarity
+    search over recently cached queries for the same model and preferences;
+    the best match above the threshold is returned.
+
+    A query refined by clarification answers ("X with preferences: {...}")
+    may also be served the entry of its base_query without preferences, e.g.
+    one stored by a speculative generation, as long as preference_drift()
+    of the answers is at most max_preference_drift.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 6 * 60 * 60,
+                 embedder: Optional[Embedder] = None, threshold: float = 0.95,
+                 max_semantic_entries: int = 512, max_preference_drift: float = 0.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_semantic_entries = max_semantic_entries
+        self.max_preference_drift = max_preference_drift
+        # key -> (scope, normalized vector), least recently used first
+        self._vectors: "OrderedDict[str, tuple]" = OrderedDict()
+        # Vectors computed during a missed lookup, reused by the following set()
+        self._pending: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.counters = {'exact_hits': 0, 'semantic_hits': 0, 'preference_hits': 0, 'misses': 0, 'embedding_errors': 0}
+
+    @staticmethod
+    def _scope(preferences: Optional[Dict], model_choice: str) -> str:
+        return json.dumps({'prefs': canonical_preferences(preferences), 'model': model_choice}, sort_keys=True)
+
+    def key(self, query: str, preferences: Optional[Dict], model_choice: str) -> str:
+        payload = json.dumps({'q': canonical_query(query), 'scope': self._scope(preferences, model_choice)}, sort_keys=True)
+        return "rec:" + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    async def get(self, query: str, preferences: Optional[Dict], model_choice: str,
+                  base_query: Optional[str] = None) -> Optional[str]:
+        key = self.key(query, preferences, model_choice)
+        cached = await self.backend.aget(key)
+        if cached is not None:
+            self.counters['exact_hits'] += 1
+            if key in self._vectors:
+                self._vectors.move_to_end(key)
+            return cached
+
+        if self.embedder is not None and self._vectors:
+            cached = await self._semantic_lookup(key, query, preferences, model_choice)
+            if cached is not None:
+                self.counters['semantic_hits'] += 1
+                return cached
+
+        if base_query and preferences and preference_drift(base_query, preferences) <= self.max_preference_drift:
+            cached = await self.backend.aget(self.key(base_query, None, model_choice))
+            if cached is not None:
+                self.counters['preference_hits'] += 1
+                return cached
+
+        self.counters['misses'] += 1
+        return None
+
+    async def _semantic_lookup(self, key: str, query: str, preferences: Optional[Dict], model_choice: str) -> Optional[str]:
+        scope = self._scope(preferences, model_choice)
+        candidates = [(k, v) for k, (s, v) in self._vectors.items() if s == scope]
+        if not candidates:
+            return None
+
+        try:
+            vector = _normalize((await self.embedder([canonical_query(query)]))[0])
+        except Exception:
+            self.counters['embedding_errors'] += 1
+            return None
+        self._pending[key] = vector
+        while len(self._pending) > 64:
+            self._pending.popitem(last=False)
+
+        best_key, best_score = None, self.threshold
+        for candidate_key, candidate_vector in candidates:
+            score = sum(map(mul, vector, candidate_vector))
+            if score >= best_score:
+                best_key, best_score = candidate_key, score
+        if best_key is None:
+            return None
+
+        cached = await self.backend.aget(best_key)
+        if cached is None:
+            # Exact entry expired or was evicted: drop its vector too
+            self._vectors.pop(best_key, None)
+            return None
+        self._vectors.move_to_end(best_key)
+        return cached
+
+    async def set(self, query: str, preferences: Optional[Dict], model_choice: str, response_text: str):
+        key = self.key(query, preferences, model_choice)
+        await self.backend.aset(key, response_text, self.ttl)
+
+        if self.embedder is None:
+            return
+        vector = self._pending.pop(key, None)
+        if vector is None:
+            try:
+                vector = _normalize((await self.embedder([canonical_query(query)]))[0])
+            except Exception:
+                self.counters['embedding_errors'] += 1
+                return
+        self._vectors[key] = (self._scope(preferences, model_choice), vector)
+        self._vectors.move_to_end(key)
+        while len(self._vectors) > self.max_semantic_entries:
+            self._vectors.popitem(last=False)
+
+    def stats(self) -> Dict:
+        hits = self.counters['exact_hits'] + self.counters['semantic_hits'] + self.counters['preference_hits']
+        lookups = hits + self.counters['misses']
+        return {
+            **self.counters,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'semantic_entries': len(self._vectors),
+            'backend': self.backend.stats()
+        }
+
+    @classmethod
+    def from_env(cls, embedder: Optional[Embedder] = None) -> "RecommendationCache":
+        """Configure from RECOMMENDATION_CACHE_* environment variables"""
+        max_bytes = os.getenv("RECOMMENDATION_CACHE_MAX_BYTES")
+        backend = create_cache_backend(
+            os.getenv("RECOMMENDATION_CACHE_BACKEND", "memory"),
+            os.getenv("RECOMMENDATION_CACHE_PATH", "recommendation_cache.sqlite3"),
+            int(max_bytes) if max_bytes else 32 * 1024 * 1024
+        )
+        semantic = os.getenv("RECOMMENDATION_CACHE_SEMANTIC", "0").lower() in ("1", "true", "yes")
+        return cls(
+            backend,
+            ttl=float(os.getenv("RECOMMENDATION_CACHE_TTL", 6 * 60 * 60)),
+            embedder=embedder if semantic else None,
+            threshold=float(os.getenv("RECOMMENDATION_CACHE_THRESHOLD", 0.95)),
+            max_semantic_entries=int(os.getenv("RECOMMENDATION_CACHE_SEMANTIC_MAX_ENTRIES", 512)),
+            max_preference_drift=float(os.getenv("RECOMMENDATION_CACHE_MAX_PREFERENCE_DRIFT", 0.0))
+        )
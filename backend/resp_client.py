@@ -0,0 +1,116 @@
+from typing import Any, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+import asyncio
+
+
+class RespError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+
+class RespClient:
+    """
+    Minimal asyncio client for Redis-protocol (RESP2) servers
+
+    Enough for the session store and job queue: commands are sent as arrays
+    of bulk strings and replies are decoded to str/int/list/None. Connections
+    are pooled; each command holds one connection for its round trip, so
+    blocking commands (BRPOP) do not stall other callers.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", max_idle: int = 10, timeout: float = 10.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.password = unquote(parts.password) if parts.password else None
+        self.db = int(parts.path.lstrip("/") or 0)
+        self.ssl = parts.scheme == "rediss"
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl or None), self.timeout
+        )
+        if self.password:
+            await self._roundtrip(reader, writer, ("AUTH", self.password))
+        if self.db:
+            await self._roundtrip(reader, writer, ("SELECT", self.db))
+        return reader, writer
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(out)
+
+    async def _read_reply(self, reader: asyncio.StreamReader) -> Any:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode("utf-8")
+        if kind == b"-":
+            raise RespError(body.decode("utf-8"))
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = await reader.readexactly(length + 2)
+            return data[:-2].decode("utf-8")
+        if kind == b"*":
+            length = int(body)
+            if length < 0:
+                return None
+            return [await self._read_reply(reader) for _ in range(length)]
+        raise RespError(f"Unexpected reply: {line!r}")
+
+    async def _roundtrip(self, reader, writer, args) -> Any:
+        writer.write(self._encode(args))
+        await writer.drain()
+        return await self._read_reply(reader)
+
+    async def execute(self, *args, timeout: Optional[float] = None) -> Any:
+        """
+        Run one command and return its decoded reply
+
+        A pooled connection the server has closed meanwhile (restart, idle
+        timeout) is replaced by a fresh one and the command sent once more.
+        """
+        pooled = bool(self._idle)
+        connection = self._idle.pop() if pooled else await self._connect()
+        reader, writer = connection
+        try:
+            reply = await asyncio.wait_for(self._roundtrip(reader, writer, args), timeout or self.timeout)
+        except RespError:
+            self._release(connection)
+            raise
+        except ConnectionError:
+            writer.close()
+            if not pooled:
+                raise
+            # The other idle connections went down with this one
+            await self.aclose()
+            return await self.execute(*args, timeout=timeout)
+        except BaseException:
+            # The reply may still be in flight: never reuse this connection
+            writer.close()
+            raise
+        self._release(connection)
+        return reply
+
+    def _release(self, connection):
+        if len(self._idle) < self.max_idle:
+            self._idle.append(connection)
+        else:
+            connection[1].close()
+
+    async def aclose(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
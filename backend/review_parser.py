@@ -0,0 +1,324 @@
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from importlib.util import find_spec
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import codecs
+import multiprocessing
+import re
+import time
+import os
+
+# Parser backends in order of preference; the faster ones are optional installs
+PARSER_BACKENDS = ["selectolax", "lxml", "html.parser"]
+
+# Elements whose text is never review content
+SKIPPED_TAGS = ["script", "style", "noscript", "template"]
+
+# Page chrome removed before looking for the article
+BOILERPLATE_TAGS = ["nav", "header", "footer", "aside", "form", "iframe", "svg", "button", "select"]
+
+# class/id fragments of cookie banners, related-article lists, share bars, ...
+BOILERPLATE_PATTERN = re.compile(
+    r"cookie|consent|banner|related|recommend|comment|share|social|promo|newsletter|subscribe"
+    r"|sidebar|footer|masthead|menu|breadcrumb|advert|sponsor|popup|modal|signup|nav\b",
+    re.IGNORECASE
+)
+
+# Block elements treated as paragraphs of the article
+PARAGRAPH_TAGS = ["p", "li", "h2", "h3", "h4", "pre"]
+
+# Paragraphs shorter than this do not count towards a container's score
+MIN_PARAGRAPH_CHARS = 25
+
+def available_backends() -> List[str]:
+    """Backends that can be used in this environment"""
+    found = []
+    if find_spec("selectolax") is not None:
+        found.append("selectolax")
+    if find_spec("lxml") is not None:
+        found.append("lxml")
+    found.append("html.parser")
+    return found
+
+
+def choose_backend(name: str = "auto") -> str:
+    """Resolve 'auto' (or an unavailable backend) to the fastest installed one"""
+    available = available_backends()
+    if name in available:
+        return name
+    return available[0]
+
+
+def _is_boilerplate(attributes: Dict) -> bool:
+    marker = " ".join(str(attributes.get(name) or "") for name in ("class", "id", "role"))
+    return bool(marker.strip()) and BOILERPLATE_PATTERN.search(marker) is not None
+
+
+def _blocks_selectolax(html: str) -> Tuple[List[Tuple], str]:
+    from selectolax.parser import HTMLParser
+    tree = HTMLParser(html)
+    tree.strip_tags(SKIPPED_TAGS + BOILERPLATE_TAGS)
+    for node in tree.css("[class], [id], [role]"):
+        if node.tag not in ("html", "body") and _is_boilerplate(node.attributes):
+            node.decompose()
+    root = tree.body or tree.root
+    if root is None:
+        return [], ""
+
+    blocks = []
+    for node in root.css(",".join(PARAGRAPH_TAGS)):
+        text = " ".join(node.text(separator=" ").split())
+        if not text:
+            continue
+        links = sum(len(link.text(separator=" ").strip()) for link in node.css("a"))
+        parent = node.parent
+        grandparent = parent.parent if parent is not None else None
+        blocks.append((
+            text, links, node.tag,
+            parent.mem_id if parent is not None else None,
+            grandparent.mem_id if grandparent is not None else None
+        ))
+    return blocks, " ".join(root.text(separator=" ", strip=True).split())
+
+
+def _blocks_soup(html: str, features: str) -> Tuple[List[Tuple], str]:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, features)
+    for element in soup(SKIPPED_TAGS + BOILERPLATE_TAGS):
+        element.decompose()
+    for element in soup.find_all(attrs={"class": True}) + soup.find_all(attrs={"id": True}) + soup.find_all(attrs={"role": True}):
+        if element.decomposed or element.name in ("html", "body"):
+            continue
+        attributes = {name: " ".join(value) if isinstance(value, list) else value for name, value in element.attrs.items()}
+        if _is_boilerplate(attributes):
+            element.decompose()
+
+    blocks = []
+    for element in soup.find_all(PARAGRAPH_TAGS):
+        # Nested paragraph tags (p inside li, ...) are counted once, at the outer level
+        if element.find_parent(PARAGRAPH_TAGS) is not None:
+            continue
+        text = " ".join(element.get_text(separator=" ").split())
+        if not text:
+            continue
+        links = sum(len(link.get_text(strip=True)) for link in element.find_all("a"))
+        parent = element.parent
+        grandparent = parent.parent if parent is not None else None
+        blocks.append((text, links, element.name, id(parent), id(grandparent)))
+    return blocks, soup.get_text(separator=' ', strip=True)
+
+
+def _main_content(blocks: List[Tuple]) -> List[str]:
+    """
+    Readability-style selection: score containers by the paragraphs they hold
+    (length and commas, discounted by link density) and keep the paragraphs
+    of the best one
+    """
+    scores: Dict = {}
+    for text, links, tag, parent, grandparent in blocks:
+        if len(text) < MIN_PARAGRAPH_CHARS or tag not in ("p", "pre", "li"):
+            continue
+        score = (1 + text.count(",") + min(len(text) / 100, 3)) * (1 - min(links / len(text), 1))
+        scores[parent] = scores.get(parent, 0) + score
+        scores[grandparent] = scores.get(grandparent, 0) + score / 2
+    scores.pop(None, None)
+    if not scores:
+        return []
+
+    best = max(scores, key=scores.get)
+    return [
+        text for text, links, tag, parent, grandparent in blocks
+        if best in (parent, grandparent) and links < len(text) * 0.5
+    ]
+
+
+def extract_review_text(html: str, backend: str = "html.parser") -> str:
+    """
+    Main article text of a page, one paragraph per line block
+    Falls back to all visible text when no article body is found.
+    Runs in worker processes, so it must stay top-level.
+    """
+    if backend == "selectolax":
+        blocks, full_text = _blocks_selectolax(html)
+    else:
+        blocks, full_text = _blocks_soup(html, backend)
+    paragraphs = _main_content(blocks)
+    if not paragraphs:
+        return full_text
+    return "\n\n".join(paragraphs)
+
+
+class HtmlReducer(HTMLParser):
+    """
+    HTML sink that keeps only what text extraction needs
+
+    Drops scripts, styles, comments and every attribute except class/id/role,
+    so the tree built by the extraction backend is a fraction of the page.
+    """
+
+    DROPPED_TAGS = {"script", "style", "noscript", "template", "svg"}
+    KEPT_ATTRIBUTES = {"class", "id", "role"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts: List[str] = []
+        self._dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.DROPPED_TAGS:
+            self._dropping += 1
+            return
+        if self._dropping:
+            return
+        kept = "".join(
+            f' {name}="{value}"' for name, value in attrs
+            if name in self.KEPT_ATTRIBUTES and value and '"' not in value
+        )
+        self._parts.append(f"<{tag}{kept}>")
+
+    def handle_startendtag(self, tag, attrs):
+        if not self._dropping and tag not in self.DROPPED_TAGS:
+            self._parts.append(f"<{tag}>")
+
+    def handle_endtag(self, tag):
+        if tag in self.DROPPED_TAGS:
+            self._dropping = max(0, self._dropping - 1)
+        elif not self._dropping:
+            self._parts.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        if not self._dropping:
+            self._parts.append(data.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;"))
+
+    def getvalue(self) -> str:
+        return "".join(self._parts)
+
+
+def reduce_html(body: bytes, charset: str = "utf-8") -> str:
+    """Decode a raw page and strip it down with HtmlReducer"""
+    try:
+        codecs.lookup(charset)
+    except LookupError:
+        charset = "utf-8"
+    reducer = HtmlReducer()
+    reducer.feed(body.decode(charset, errors="replace"))
+    reducer.close()
+    return reducer.getvalue()
+
+
+def extract_page_text(body: bytes, charset: str = "utf-8", backend: str = "html.parser") -> str:
+    """extract_review_text() of a raw page; top-level for the worker processes"""
+    return extract_review_text(reduce_html(body, charset), backend)
+
+
+def _name_tokens(product_name: str) -> List[str]:
+    return [token for token in re.findall(r"[a-z0-9]+", product_name.lower()) if len(token) > 1]
+
+
+def select_relevant_text(text: str, product_name: str = "", char_budget: int = 6000) -> str:
+    """
+    Fit extracted review text into char_budget characters (~4 per token)
+
+    Paragraphs that mention the product are kept first, then the rest in
+    page order; the result stays in page order.
+    """
+    if not char_budget or len(text) <= char_budget:
+        return text
+
+    paragraphs = [p for p in text.split("\n\n") if p.strip()]
+    tokens = _name_tokens(product_name)
+
+    def relevance(paragraph: str) -> float:
+        if not tokens:
+            return 0.0
+        lowered = paragraph.lower()
+        if product_name.lower() in lowered:
+            return 1.0
+        words = set(re.findall(r"[a-z0-9]+", lowered))
+        return sum(token in words for token in tokens) / len(tokens)
+
+    ranked = sorted(range(len(paragraphs)), key=lambda i: (-(relevance(paragraphs[i]) >= 0.5), i))
+    chosen, used = [], 0
+    for index in ranked:
+        paragraph = paragraphs[index]
+        room = char_budget - used
+        if room <= 0:
+            break
+        if len(paragraph) > room:
+            # Only cut a paragraph when nothing has been kept yet (one huge block)
+            if chosen:
+                continue
+            paragraph = paragraph[:room].rsplit(" ", 1)[0]
+        chosen.append((index, paragraph))
+        used += len(paragraph) + 2
+    return "\n\n".join(paragraph for _, paragraph in sorted(chosen))
+
+
+class ReviewParser:
+    """
+    Extracts the main review text of pages off the event loop
+
+    Parsing runs in a ProcessPoolExecutor so large pages neither block the
+    loop nor hold the GIL of the web process. With workers=0 it runs in a
+    thread instead (no extra processes, e.g. on small dynos).
+    """
+
+    def __init__(self, workers: int = 2, backend: str = "auto"):
+        self.workers = workers
+        self.backend = choose_backend(backend)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.counters = {'parsed': 0, 'errors': 0, 'bytes': 0, 'seconds': 0.0}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: never fork a process that is running an event loop and threads
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def _run(self, func, page, *args) -> str:
+        started = time.perf_counter()
+        try:
+            if self.workers > 0:
+                loop = asyncio.get_running_loop()
+                text = await loop.run_in_executor(self._get_pool(), func, page, *args)
+            else:
+                text = await asyncio.to_thread(func, page, *args)
+        except Exception:
+            self.counters['errors'] += 1
+            raise
+        self.counters['parsed'] += 1
+        self.counters['bytes'] += len(page)
+        self.counters['seconds'] += time.perf_counter() - started
+        return text
+
+    async def parse(self, html: str) -> str:
+        return await self._run(extract_review_text, html, self.backend)
+
+    async def parse_page(self, body: bytes, charset: str = "utf-8") -> str:
+        """Decode, reduce and extract a raw page in one trip to the pool"""
+        return await self._run(extract_page_text, body, charset, self.backend)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict:
+        parsed = self.counters['parsed']
+        return {
+            **self.counters,
+            'seconds': round(self.counters['seconds'], 3),
+            'avg_ms': round(self.counters['seconds'] / parsed * 1000, 1) if parsed else 0.0,
+            'backend': self.backend,
+            'workers': self.workers
+        }
+
+    @classmethod
+    def from_env(cls) -> "ReviewParser":
+        """Configure from REVIEW_PARSER_* environment variables"""
+        workers = os.getenv("REVIEW_PARSER_WORKERS")
+        return cls(
+            workers=int(workers) if workers else min(4, os.cpu_count() or 1),
+            backend=os.getenv("REVIEW_PARSER_BACKEND", "auto")
+        )
@@ -0,0 +1,187 @@
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import threading
+import asyncio
+import hashlib
+import sqlite3
+import time
+import zlib
+import os
+
+# Query parameters that never change page content
+TRACKING_PARAMS = {'gclid', 'fbclid', 'mc_cid', 'mc_eid', 'srsltid'}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a review URL used as the store key"""
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not (k.lower().startswith('utm_') or k.lower() in TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ''))
+
+
+class ReviewStore:
+    """
+    Content-addressed store for extracted review text
+
+    Texts are zlib-compressed and stored once per SHA-256 digest; URLs point
+    at a digest together with the ETag/Last-Modified validators of the page
+    they came from. Entries younger than max_age are served without any
+    network access, older ones are revalidated with a conditional GET.
+    The compressed size is bounded with LRU eviction on URL access time.
+    Async callers use alookup()/aput()/amark_revalidated(), which run the
+    queries in a worker thread; the connection is shared behind a lock.
+    """
+
+    def __init__(self, path: str = ":memory:", max_bytes: int = 128 * 1024 * 1024,
+                 max_age: float = 24 * 60 * 60):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.counters = {'hits': 0, 'misses': 0, 'stale': 0, 'revalidated': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS review_blobs (
+                digest TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS review_urls (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_review_urls_access ON review_urls(last_access);
+            CREATE INDEX IF NOT EXISTS idx_review_urls_digest ON review_urls(digest);
+        """)
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """
+        Return {'text', 'etag', 'last_modified', 'fresh'} for a stored URL, or None
+        """
+        with self._lock:
+            key = normalize_url(url)
+            row = self._conn.execute("""
+                SELECT b.data, u.etag, u.last_modified, u.fetched_at
+                FROM review_urls u JOIN review_blobs b ON b.digest = u.digest
+                WHERE u.url = ?
+            """, (key,)).fetchone()
+            if row is None:
+                self.counters['misses'] += 1
+                return None
+
+            data, etag, last_modified, fetched_at = row
+            now = time.time()
+            self._conn.execute("UPDATE review_urls SET last_access = ? WHERE url = ?", (now, key))
+            fresh = now - fetched_at < self.max_age
+            self.counters['hits' if fresh else 'stale'] += 1
+            return {
+                'text': zlib.decompress(data).decode('utf-8'),
+                'etag': etag,
+                'last_modified': last_modified,
+                'fresh': fresh
+            }
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict:
+        """Revalidation headers for a stale entry"""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Store extracted text for a URL"""
+        with self._lock:
+            key = normalize_url(url)
+            raw = text.encode('utf-8')
+            digest = hashlib.sha256(raw).hexdigest()
+            data = zlib.compress(raw, 6)
+            now = time.time()
+
+            previous = self._conn.execute("SELECT digest FROM review_urls WHERE url = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR IGNORE INTO review_blobs (digest, data, size) VALUES (?, ?, ?)",
+                (digest, data, len(data))
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO review_urls (url, digest, etag, last_modified, fetched_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, digest, etag, last_modified, now, now)
+            )
+            if previous and previous[0] != digest:
+                self._drop_orphan_blob(previous[0])
+            self.counters['stores'] += 1
+            self._evict()
+
+    def mark_revalidated(self, url: str):
+        """Record a 304 Not Modified: the stored text is fresh again"""
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "UPDATE review_urls SET fetched_at = ?, last_access = ? WHERE url = ?",
+                (now, now, normalize_url(url))
+            )
+            self.counters['revalidated'] += 1
+
+    def _drop_orphan_blob(self, digest: str):
+        self._conn.execute("""
+            DELETE FROM review_blobs WHERE digest = ?
+            AND NOT EXISTS (SELECT 1 FROM review_urls WHERE digest = ?)
+        """, (digest, digest))
+
+    def _evict(self):
+        excess = self.size_bytes() - self.max_bytes
+        if excess <= 0:
+            return
+        rows = self._conn.execute("""
+            SELECT u.url, u.digest, b.size
+            FROM review_urls u JOIN review_blobs b ON b.digest = u.digest
+            ORDER BY u.last_access ASC
+        """).fetchall()
+        for url, digest, _ in rows:
+            if excess <= 0:
+                break
+            self._conn.execute("DELETE FROM review_urls WHERE url = ?", (url,))
+            self._drop_orphan_blob(digest)
+            excess = self.size_bytes() - self.max_bytes
+            self.counters['evictions'] += 1
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM review_blobs").fetchone()[0]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            urls = self._conn.execute("SELECT COUNT(*) FROM review_urls").fetchone()[0]
+            blobs = self._conn.execute("SELECT COUNT(*) FROM review_blobs").fetchone()[0]
+            return {**self.counters, 'urls': urls, 'blobs': blobs, 'bytes': self.size_bytes(), 'max_bytes': self.max_bytes}
+
+    async def alookup(self, url: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.lookup, url)
+
+    async def aput(self, url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        await asyncio.to_thread(self.put, url, text, etag, last_modified)
+
+    async def amark_revalidated(self, url: str):
+        await asyncio.to_thread(self.mark_revalidated, url)
+
+    @classmethod
+    def from_env(cls) -> "ReviewStore":
+        """Configure from REVIEW_STORE_* environment variables"""
+        return cls(
+            path=os.getenv("REVIEW_STORE_PATH", "review_store.sqlite3"),
+            max_bytes=int(os.getenv("REVIEW_STORE_MAX_BYTES", 128 * 1024 * 1024)),
+            max_age=float(os.getenv("REVIEW_STORE_MAX_AGE", 24 * 60 * 60))
+        )
@@ -0,0 +1,265 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import threading
+import asyncio
+import sqlite3
+import json
+import time
+import re
+import os
+
+
+class CacheBackend:
+    """
+    Key/value cache with per-entry TTL, LRU eviction under a byte budget
+    and hit/miss counters. Values must be JSON-serializable.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.counters = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0, 'expired': 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """get() for async callers; backends doing blocking I/O run it off the event loop"""
+        return self.get(key)
+
+    async def aset(self, key: str, value: Any, ttl: float):
+        """set() for async callers"""
+        self.set(key, value, ttl)
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def size_bytes(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        lookups = self.counters['hits'] + self.counters['misses']
+        return {
+            **self.counters,
+            'entries': len(self),
+            'bytes': self.size_bytes(),
+            'max_bytes': self.max_bytes,
+            'hit_rate': round(self.counters['hits'] / lookups, 4) if lookups else 0.0
+        }
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache backed by an OrderedDict"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        super().__init__(max_bytes)
+        # key -> (expires_at, size, value), least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.counters['misses'] += 1
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.time():
+            self.delete(key)
+            self.counters['expired'] += 1
+            self.counters['misses'] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.counters['hits'] += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        size = len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+        self.delete(key)
+        self._entries[key] = (time.time() + ttl, size, value)
+        self._bytes += size
+        self.counters['sets'] += 1
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.counters['evictions'] += 1
+
+    def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def size_bytes(self) -> int:
+        return self._bytes
+
+
+class DiskCache(CacheBackend):
+    """
+    SQLite-backed LRU cache that survives restarts
+
+    aget()/aset() run the queries in a worker thread; the connection is
+    shared between threads behind a lock.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        super().__init__(max_bytes)
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache_entries(last_access)")
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.counters['misses'] += 1
+                return None
+            value, expires_at = row
+            now = time.time()
+            if expires_at <= now:
+                self.delete(key)
+                self.counters['expired'] += 1
+                self.counters['misses'] += 1
+                return None
+            self._conn.execute("UPDATE cache_entries SET last_access = ? WHERE key = ?", (now, key))
+            self.counters['hits'] += 1
+            return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            data = json.dumps(value)
+            size = len(data)
+            if size > self.max_bytes:
+                return
+            now = time.time()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, data, size, now + ttl, now)
+            )
+            self.counters['sets'] += 1
+            self._evict()
+
+    def _evict(self):
+        # Drop expired rows first, then least recently used rows until under budget
+        self._conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+        excess = self.size_bytes() - self.max_bytes
+        if excess <= 0:
+            return
+        rows = self._conn.execute("SELECT key, size FROM cache_entries ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if excess <= 0:
+                break
+            self.delete(key)
+            excess -= size
+            self.counters['evictions'] += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any, ttl: float):
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_cache_backend(kind: str = "memory", path: Optional[str] = None, max_bytes: Optional[int] = None) -> CacheBackend:
+    """Build a cache backend by name ('memory' or 'disk')"""
+    if kind == "memory":
+        return MemoryCache(max_bytes) if max_bytes else MemoryCache()
+    if kind == "disk":
+        if not path:
+            raise ValueError("A path is required for the disk cache backend")
+        return DiskCache(path, max_bytes) if max_bytes else DiskCache(path)
+    raise ValueError(f"Unknown cache backend: {kind}")
+
+
+# Default TTLs: shopping prices change quickly, expert reviews are stable for days
+DEFAULT_TTLS = {
+    'buy': 15 * 60,
+    'review': 3 * 24 * 60 * 60
+}
+
+
+class SearchCache:
+    """Serper result cache keyed on (normalized query, search_type)"""
+
+    def __init__(self, backend: CacheBackend, ttls: Optional[Dict[str, float]] = None):
+        self.backend = backend
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return re.sub(r"\s+", " ", query.strip().lower())
+
+    def key(self, query: str, search_type: str) -> str:
+        return f"serper:{search_type}:{self.normalize_query(query)}"
+
+    async def get(self, query: str, search_type: str) -> Optional[Dict]:
+        return await self.backend.aget(self.key(query, search_type))
+
+    async def set(self, query: str, search_type: str, result: Dict):
+        ttl = self.ttls.get(search_type, self.ttls['review'])
+        await self.backend.aset(self.key(query, search_type), result, ttl)
+
+    def stats(self) -> Dict:
+        return self.backend.stats()
+
+    @classmethod
+    def from_env(cls) -> "SearchCache":
+        """Configure from SEARCH_CACHE_* environment variables"""
+        max_bytes = os.getenv("SEARCH_CACHE_MAX_BYTES")
+        backend = create_cache_backend(
+            os.getenv("SEARCH_CACHE_BACKEND", "memory"),
+            os.getenv("SEARCH_CACHE_PATH", "search_cache.sqlite3"),
+            int(max_bytes) if max_bytes else None
+        )
+        return cls(backend, ttls={
+            'buy': float(os.getenv("SEARCH_CACHE_TTL_BUY", DEFAULT_TTLS['buy'])),
+            'review': float(os.getenv("SEARCH_CACHE_TTL_REVIEW", DEFAULT_TTLS['review']))
+        })
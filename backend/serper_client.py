@@ -0,0 +1,114 @@
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import random
+import re
+import httpx
+import os
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class SerperError(Exception):
+    """Raised when a Serper request fails after all retries"""
+
+
+class SerperClient:
+    """
+    Async Serper client on top of the pooled registry client
+
+    - Retries 429/5xx and transport errors with full-jitter exponential backoff
+    - Coalesces identical in-flight (query, search_type) requests so concurrent
+      sessions asking for the same product share one HTTP request
+    - Serves repeated searches from an optional SearchCache
+    """
+
+    def __init__(self, registry, max_retries: Optional[int] = None,
+                 backoff_base: Optional[float] = None, backoff_max: Optional[float] = None,
+                 log: Optional[Callable[[str], Awaitable[None]]] = None,
+                 cache=None, scheduler=None):
+        self.registry = registry
+        self.cache = cache
+        self.scheduler = scheduler
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("SERPER_MAX_RETRIES", 3))
+        self.backoff_base = backoff_base or float(os.getenv("SERPER_BACKOFF_BASE", 0.5))
+        self.backoff_max = backoff_max or float(os.getenv("SERPER_BACKOFF_MAX", 8.0))
+        self.log = log
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.stats = {'requests': 0, 'coalesced': 0, 'retries': 0, 'errors': 0}
+
+    @staticmethod
+    def build_request(query: str, search_type: str) -> Tuple[str, Dict]:
+        """Return (path, payload) for a shopping ('buy') or review search"""
+        if search_type == 'buy':
+            return "/shopping", {'q': f"{query}"}
+        return "/search", {'q': f"{query} expert review", 'num': 3}
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _request(self, query: str, search_type: str) -> Dict:
+        path, payload = self.build_request(query, search_type)
+        client = self.registry.get("serper")
+
+        for attempt in range(self.max_retries + 1):
+            self.stats['requests'] += 1
+            retry_after = None
+            try:
+                if self.scheduler is not None:
+                    async with self.scheduler.slot("serper"):
+                        response = await client.post(path, json=payload)
+                else:
+                    response = await client.post(path, json=payload)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    result = response.json()
+                    if self.cache is not None:
+                        await self.cache.set(query, search_type, result)
+                    return result
+                retry_after = response.headers.get('Retry-After')
+                error = SerperError(f"Serper returned {response.status_code} for {path}")
+            except httpx.TransportError as e:
+                error = e
+
+            if attempt == self.max_retries:
+                break
+            delay = self._backoff(attempt, retry_after)
+            self.stats['retries'] += 1
+            if self.log:
+                await self.log(f"[Serper] Retry {attempt + 1}/{self.max_retries} in {delay:.2f}s: {error}")
+            await asyncio.sleep(delay)
+
+        self.stats['errors'] += 1
+        raise SerperError(f"Serper request failed after {self.max_retries + 1} attempts: {error}")
+
+    def _forget(self, key: Tuple[str, str], task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def search(self, query: str, search_type: str) -> Dict:
+        """Run a Serper search, sharing the request with identical in-flight calls"""
+        if self.cache is not None:
+            cached = await self.cache.get(query, search_type)
+            if cached is not None:
+                return cached
+
+        key = (re.sub(r"\s+", " ", query.strip().lower()), search_type)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._request(query, search_type))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.stats['coalesced'] += 1
+
+        # Shield so a cancelled caller does not cancel the request for the others
+        return await asyncio.shield(task)
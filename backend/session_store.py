@@ -0,0 +1,331 @@
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+from resp_client import RespClient
+import asyncio
+import datetime
+import json
+import time
+import os
+
+# Session fields that only make sense inside the process that created them
+LOCAL_ONLY_FIELDS = {'background_task'}
+
+
+def estimate_size(value: Any, seen: Optional[Set[int]] = None) -> int:
+    """Approximate bytes held by a session (strings dominate; tasks are ignored)"""
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, (int, float, bool)) or value is None:
+        return 8
+    seen.add(id(value))
+    if isinstance(value, dict):
+        return 64 + sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return 56 + sum(estimate_size(item, seen) for item in value)
+    return 0
+
+
+class SessionBackend:
+    """Shared copy of sessions behind the per-process SessionStore"""
+
+    # True when other processes can see what is saved here
+    shared = False
+
+    def __init__(self):
+        self.counters = {'loads': 0, 'saves': 0, 'errors': 0}
+
+    async def load(self, session_id: str) -> Optional[Dict]:
+        return None
+
+    async def save(self, session_id: str, fields: Dict):
+        pass
+
+    async def delete(self, session_id: str):
+        pass
+
+    async def aclose(self):
+        pass
+
+    def stats(self) -> Dict:
+        return {'kind': 'memory'}
+
+
+class MemorySessionBackend(SessionBackend):
+    """Single-process mode: the local SessionStore is the only copy"""
+
+
+class RedisSessionBackend(SessionBackend):
+    """
+    Sessions as Redis hashes (one JSON-encoded value per field)
+
+    Saving only the fields that changed lets the detailing task and request
+    handlers on different workers update one session without overwriting
+    each other's fields.
+    """
+
+    shared = True
+
+    def __init__(self, client: RespClient, ttl: float = 2 * 60 * 60, prefix: str = "session:"):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def load(self, session_id: str) -> Optional[Dict]:
+        self.counters['loads'] += 1
+        reply = await self.client.execute("HGETALL", self.prefix + session_id)
+        if not reply:
+            return None
+        return {reply[i]: json.loads(reply[i + 1]) for i in range(0, len(reply), 2)}
+
+    async def save(self, session_id: str, fields: Dict):
+        if not fields:
+            return
+        self.counters['saves'] += 1
+        key = self.prefix + session_id
+        args = []
+        for name, value in fields.items():
+            args.extend((name, json.dumps(value, default=str)))
+        await self.client.execute("HSET", key, *args)
+        if self.ttl:
+            await self.client.execute("EXPIRE", key, int(self.ttl))
+
+    async def delete(self, session_id: str):
+        await self.client.execute("DEL", self.prefix + session_id)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def stats(self) -> Dict:
+        return {'kind': 'redis', **self.counters}
+
+
+def create_session_backend(kind: str = "memory", url: Optional[str] = None, ttl: float = 2 * 60 * 60) -> SessionBackend:
+    """Build a session backend by name ('memory' or 'redis')"""
+    if kind == "memory":
+        return MemorySessionBackend()
+    if kind == "redis":
+        return RedisSessionBackend(RespClient(url or "redis://localhost:6379/0"), ttl=ttl)
+    raise ValueError(f"Unknown session backend: {kind}")
+
+
+class SessionStore(MutableMapping):
+    """
+    Bounded replacement for the conversation_store dict
+
+    Sessions are kept in LRU order (reads and writes count as use). sweep()
+    drops sessions idle for longer than ttl (by their last_update, or last use
+    if more recent), then evicts least recently used sessions until the store
+    is within max_sessions and max_bytes. It runs when a new session is
+    inserted (which is never evicted itself) and on run_sweeper()'s timer,
+    never on updates of an existing session. Sessions pinned by an in-flight
+    request (pin()/unpin()) are never swept, and sessions with a running
+    background_task are only expired, never evicted for space; an expired
+    session's background_task is cancelled.
+
+    With a shared backend the local entries act as a cache: load() reads a
+    session through from the backend and save() writes fields through, so a
+    session created on one worker can be served by any other.
+    """
+
+    def __init__(self, max_sessions: int = 1000, max_bytes: int = 256 * 1024 * 1024,
+                 ttl: float = 2 * 60 * 60, backend: Optional[SessionBackend] = None):
+        self.backend = backend or MemorySessionBackend()
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._used: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._dirty: Set[str] = set()
+        self._pins: Dict[str, int] = {}
+        self.counters = {'expired': 0, 'evicted': 0, 'cancelled_tasks': 0}
+
+    def __getitem__(self, session_id: str) -> Dict:
+        session = self._sessions[session_id]
+        self._touch(session_id)
+        return session
+
+    def __setitem__(self, session_id: str, session: Dict):
+        is_new = session_id not in self._sessions
+        self._sessions[session_id] = session
+        self._touch(session_id)
+        # Only a new session can push the store over budget; updates wait for the timer
+        if is_new:
+            self.sweep(keep=session_id)
+
+    def __delitem__(self, session_id: str):
+        del self._sessions[session_id]
+        self._used.pop(session_id, None)
+        self._sizes.pop(session_id, None)
+        self._dirty.discard(session_id)
+
+    def __contains__(self, session_id: object) -> bool:
+        return session_id in self._sessions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._sessions))
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _touch(self, session_id: str):
+        self._sessions.move_to_end(session_id)
+        self._used[session_id] = time.time()
+        # Sessions are mutated in place, so re-measure on the next sweep
+        self._dirty.add(session_id)
+
+    def pin(self, session_id: str):
+        """Keep a session from being swept until the matching unpin()"""
+        self._pins[session_id] = self._pins.get(session_id, 0) + 1
+
+    def unpin(self, session_id: str):
+        count = self._pins.get(session_id, 0) - 1
+        if count > 0:
+            self._pins[session_id] = count
+        else:
+            self._pins.pop(session_id, None)
+
+    def _busy(self, session_id: str) -> bool:
+        # A request or a detailing task will still write to this session
+        if session_id in self._pins:
+            return True
+        task = self._sessions[session_id].get('background_task')
+        return task is not None and not task.done()
+
+    def _idle_since(self, session_id: str) -> float:
+        used = self._used.get(session_id, 0.0)
+        last_update = self._sessions[session_id].get('last_update')
+        if last_update:
+            try:
+                used = max(used, datetime.datetime.fromisoformat(last_update).timestamp())
+            except (TypeError, ValueError):
+                pass
+        return used
+
+    def _evict(self, session_id: str, reason: str):
+        # Nobody can poll an expired session, so stop its detailing work
+        task = self._sessions[session_id].get('background_task')
+        if task is not None and not task.done():
+            task.cancel()
+            self.counters['cancelled_tasks'] += 1
+        del self[session_id]
+        self.counters[reason] += 1
+
+    def size_bytes(self) -> int:
+        for session_id in self._dirty:
+            if session_id in self._sessions:
+                self._sizes[session_id] = estimate_size(self._sessions[session_id])
+        self._dirty.clear()
+        return sum(self._sizes.values())
+
+    def sweep(self, keep: Optional[str] = None):
+        """Expire idle sessions, then evict LRU sessions until within budget (never `keep` or busy ones)"""
+        if self.ttl:
+            cutoff = time.time() - self.ttl
+            for session_id in [s for s in self._sessions
+                               if s != keep and s not in self._pins and self._idle_since(s) < cutoff]:
+                self._evict(session_id, 'expired')
+
+        if keep is None and self._sessions:
+            # The most recently used session is the one most likely in use
+            keep = next(reversed(self._sessions))
+        candidates = iter([s for s in self._sessions if s != keep and not self._busy(s)])
+        while len(self._sessions) > self.max_sessions:
+            session_id = next(candidates, None)
+            if session_id is None:
+                break
+            self._evict(session_id, 'evicted')
+
+        total = self.size_bytes()
+        while total > self.max_bytes:
+            session_id = next(candidates, None)
+            if session_id is None:
+                break
+            total -= self._sizes.get(session_id, 0)
+            self._evict(session_id, 'evicted')
+
+    @property
+    def shared(self) -> bool:
+        return self.backend.shared
+
+    async def load(self, session_id: str) -> Optional[Dict]:
+        """
+        Read-through: refresh the local copy from a shared backend
+
+        A local copy with a running background_task is owned by this process
+        and is not overwritten. Returns the session or None if it is unknown.
+        """
+        local = self._sessions.get(session_id)
+        if not self.backend.shared:
+            return local
+        task = local.get('background_task') if local is not None else None
+        if task is not None and not task.done():
+            return local
+
+        try:
+            remote = await self.backend.load(session_id)
+        except Exception:
+            self.backend.counters['errors'] += 1
+            return local
+        if remote is None:
+            return local
+        if local is None:
+            self[session_id] = remote
+            return remote
+        local.update(remote)
+        self._touch(session_id)
+        return local
+
+    async def save(self, session_id: str, fields: Optional[Iterable[str]] = None):
+        """Write-through: copy a session (or only the named fields) to the backend"""
+        if not self.backend.shared:
+            return
+        session = self._sessions.get(session_id)
+        if session is None:
+            return
+        names = fields if fields is not None else list(session.keys())
+        values = {name: session[name] for name in names if name in session and name not in LOCAL_ONLY_FIELDS}
+        try:
+            await self.backend.save(session_id, values)
+        except Exception:
+            self.backend.counters['errors'] += 1
+
+    async def run_sweeper(self, interval: float = 60.0):
+        """Periodically sweep; run as a background task for the app's lifetime"""
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+
+    def stats(self) -> Dict:
+        active_tasks = sum(
+            1 for session in self._sessions.values()
+            if session.get('background_task') is not None and not session['background_task'].done()
+        )
+        return {
+            **self.counters,
+            'sessions': len(self._sessions),
+            'active_tasks': active_tasks,
+            'bytes': self.size_bytes(),
+            'max_sessions': self.max_sessions,
+            'max_bytes': self.max_bytes,
+            'backend': self.backend.stats()
+        }
+
+    @classmethod
+    def from_env(cls) -> "SessionStore":
+        """Configure from SESSION_STORE_* / SESSION_BACKEND / REDIS_URL environment variables"""
+        ttl = float(os.getenv("SESSION_STORE_TTL", 2 * 60 * 60))
+        return cls(
+            max_sessions=int(os.getenv("SESSION_STORE_MAX_SESSIONS", 1000)),
+            max_bytes=int(os.getenv("SESSION_STORE_MAX_BYTES", 256 * 1024 * 1024)),
+            ttl=ttl,
+            backend=create_session_backend(os.getenv("SESSION_BACKEND", "memory"), os.getenv("REDIS_URL"), ttl)
+        )
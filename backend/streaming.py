@@ -0,0 +1,211 @@
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Set
+import asyncio
+import json
+
+
+class RecommendationStreamParser:
+    """
+    Incremental parser for streamed recommendation responses
+
+    Feed it text chunks as they arrive from the model; it returns every
+    object of the top-level "recommendations" array as soon as that object's
+    closing brace has been seen. Any prose before the JSON is ignored.
+    """
+
+    def __init__(self, array_key: str = "recommendations"):
+        self.array_key = array_key
+        self._length = 0
+        self._stack: List[str] = []       # open containers: '{' or '['
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_string = None          # last completed string in the current object
+        self._array_depth = None          # stack depth of the recommendations array
+        self._item_start = None           # buffer offset of the current item
+        self._text = ""
+        self.count = 0
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Consume a chunk and return the recommendation objects it completed"""
+        completed = []
+        offset = self._length
+        self._text += chunk
+        self._length += len(chunk)
+
+        for i, char in enumerate(chunk, start=offset):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = self._text[self._string_start + 1:i]
+                continue
+
+            if char == '"':
+                if self._stack:
+                    self._in_string = True
+                    self._string_start = i
+            elif char == '{':
+                if self._array_depth is not None and len(self._stack) == self._array_depth:
+                    self._item_start = i
+                self._stack.append('{')
+                self._last_string = None
+            elif char == '[':
+                if (self._array_depth is None and len(self._stack) == 1
+                        and self._last_string == self.array_key):
+                    self._array_depth = len(self._stack) + 1
+                self._stack.append('[')
+            elif char in '}]':
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if (char == '}' and self._item_start is not None
+                        and len(self._stack) == self._array_depth):
+                    item = self._parse_item(self._text[self._item_start:i + 1])
+                    self._item_start = None
+                    if item is not None:
+                        self.count += 1
+                        completed.append(item)
+                elif char == ']' and self._array_depth is not None and len(self._stack) == self._array_depth - 1:
+                    self._array_depth = -1   # array closed; ignore any later arrays
+        return completed
+
+    @staticmethod
+    def _parse_item(text: str) -> Optional[Dict]:
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        return item if isinstance(item, dict) else None
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+
+class EventSink:
+    """Queue of (event, data) pairs consumed by a streaming response"""
+
+    def __init__(self, maxsize: int = 0):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.closed = False
+
+    async def emit(self, event: str, data: Any):
+        if not self.closed:
+            await self._queue.put((event, data))
+
+    def emit_nowait(self, event: str, data: Any):
+        if not self.closed:
+            self._queue.put_nowait((event, data))
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._queue.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await self._queue.get()
+        if item is None:
+            raise StopAsyncIteration
+        return item
+
+
+# Sink of the streaming request being served, if any (None for /api/chat)
+current_sink: ContextVar[Optional[EventSink]] = ContextVar("current_sink", default=None)
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one Server-Sent Events frame"""
+    payload = json.dumps(data)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def _product_name(recommendation: Dict) -> str:
+    return str(recommendation.get('name', '')).strip().lower()
+
+
+class RecommendationFeed:
+    """
+    Async stream of recommendation objects handed from generation to detailing
+
+    Generation put()s each recommendation as soon as it is parsed; finish()
+    reconciles the final parse with what was streamed, by product name. When
+    the streamed products are the start of the final list, the rest is added;
+    otherwise (the response was corrected or re-requested) the stream ends and
+    on_restart is called with the final list so detailing can start over.
+    """
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.count = 0
+        self.closed = False
+        self.streamed: List[str] = []
+        self.on_restart: Optional[Callable[[List[Dict]], None]] = None
+
+    def put(self, recommendation: Dict):
+        if self.closed:
+            return
+        self.count += 1
+        self.streamed.append(_product_name(recommendation))
+        self._queue.put_nowait(recommendation)
+
+    def finish(self, recommendations: List[Dict]) -> bool:
+        """Hand over the final list; returns False when detailing has to restart on it"""
+        final_names = [_product_name(recommendation) for recommendation in recommendations]
+        if final_names[:self.count] == self.streamed:
+            for recommendation in recommendations[self.count:]:
+                self.put(recommendation)
+            self.close()
+            return True
+        self.close()
+        if self.on_restart is not None:
+            self.on_restart(recommendations)
+        return False
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._queue.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await self._queue.get()
+        if item is None:
+            raise StopAsyncIteration
+        return item
+
+
+class SessionEventBus:
+    """Per-session publish/subscribe channel for pushed updates (product details)"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[EventSink]] = {}
+
+    def subscribe(self, session_id: str) -> EventSink:
+        sink = EventSink()
+        self._subscribers.setdefault(session_id, set()).add(sink)
+        return sink
+
+    def unsubscribe(self, session_id: str, sink: EventSink):
+        sink.close()
+        subscribers = self._subscribers.get(session_id)
+        if subscribers is not None:
+            subscribers.discard(sink)
+            if not subscribers:
+                del self._subscribers[session_id]
+
+    def publish(self, session_id: str, event: str, data: Any):
+        """Deliver an event to every subscriber of a session without waiting"""
+        for sink in self._subscribers.get(session_id, ()):
+            sink.emit_nowait(event, data)
+
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
@@ -0,0 +1,300 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type, TypeVar
+from pydantic import BaseModel, ConfigDict, RootModel, ValidationError, field_validator
+import llm_gateway
+import json
+import re
+import os
+
+# Providers sent a JSON schema as response_format; the others get the schema in the prompt only.
+# Perplexity prepares each new schema before answering (up to ~30s on first use),
+# most of the hybrid per-provider deadline, so it is left to prompt + repair.
+SCHEMA_PROVIDERS = {
+    provider.strip() for provider in os.getenv("STRUCTURED_OUTPUT_PROVIDERS", "openai").split(",") if provider.strip()
+}
+
+# Extra attempts after a response that does not validate
+STRUCTURED_OUTPUT_RETRIES = int(os.getenv("STRUCTURED_OUTPUT_RETRIES", 1))
+
+# Bracket positions tried before a response is given up on
+MAX_JSON_STARTS = 32
+
+Model = TypeVar("Model", bound=BaseModel)
+
+
+class StructuredOutputError(Exception):
+    """A model response that could not be parsed into the expected schema"""
+
+
+# Schemas of the JSON the prompts ask for (cf. main_2steps.ProductRecommendation)
+
+class ProductRecommendation(BaseModel):
+    # Extra keys ("source", ...) are kept
+    model_config = ConfigDict(extra="allow")
+
+    name: str
+    price: Optional[float] = None
+    features: List[str] = []
+    pros: List[str] = []
+    cons: List[str] = []
+    description: str = ""
+
+    @field_validator("price", mode="before")
+    @classmethod
+    def parse_price(cls, value: Any) -> Any:
+        # "$1,299.99", "about 300 USD"
+        if isinstance(value, str):
+            match = re.search(r"\d+(?:,\d{3})*(?:\.\d+)?", value)
+            return float(match.group().replace(",", "")) if match else None
+        return value
+
+    @field_validator("features", "pros", "cons", mode="before")
+    @classmethod
+    def parse_list(cls, value: Any) -> Any:
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [value]
+        return value
+
+
+class RecommendationResponse(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    overview: str = ""
+    recommendations: List[ProductRecommendation]
+
+
+class SpecificityAnalysis(BaseModel):
+    is_specific: bool
+    missing_info: List[str] = []
+    confidence: float = 0.5
+    reasoning: str = ""
+
+
+class ClarificationQuestion(BaseModel):
+    question: str
+    options: List[str] = []
+
+
+class ClarificationQuestions(RootModel[Dict[str, ClarificationQuestion]]):
+    pass
+
+
+class ExtractedPreferences(RootModel[Dict[str, str]]):
+    @field_validator("root", mode="before")
+    @classmethod
+    def join_values(cls, value: Any) -> Any:
+        # {"Color": ["Black", "Navy"]} -> {"Color": "Black, Navy"}; empty answers are dropped
+        if isinstance(value, dict):
+            return {
+                str(key): ", ".join(map(str, item)) if isinstance(item, list) else str(item)
+                for key, item in value.items() if item not in (None, "", [])
+            }
+        return value
+
+
+class ProductSummary(BaseModel):
+    id: int
+    summary: str
+
+
+class BatchSummaries(BaseModel):
+    summaries: List[ProductSummary]
+
+
+def _closers(stack: List[str]) -> str:
+    return "".join('}' if opener == '{' else ']' for opener in reversed(stack))
+
+
+def _json_starts(text: str, openers: str) -> Iterator[int]:
+    return (i for i, char in enumerate(text) if char in openers)
+
+
+def _repair_at(text: str, start: int) -> Tuple[Any, bool, int]:
+    # (value, repaired, end) of the JSON value opening at text[start]
+    out: List[str] = []
+    stack: List[str] = []
+    # Output lengths (and open containers) where the value so far is complete
+    checkpoints: List[Tuple[int, List[str]]] = []
+    in_string = escaped = repaired = False
+    end = len(text)
+
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char == '\n':
+                # Raw newline inside a string
+                out[-1] = '\\n'
+                repaired = True
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append(char)
+        elif char in '}]':
+            # Drop a trailing comma before the closing bracket
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ',':
+                out.pop()
+                repaired = True
+            if not stack:
+                end = index
+                break
+            closer = _closers(stack[-1:])
+            if char != closer:
+                repaired = True
+            stack.pop()
+            out.append(closer)
+            if not stack:
+                end = index + 1
+                break
+            checkpoints.append((len(out), list(stack)))
+            continue
+        elif char == ',':
+            checkpoints.append((len(out), list(stack)))
+        out.append(char)
+
+    candidates = []
+    if not stack:
+        candidates.append("".join(out))
+    else:
+        # Truncated: close the open string and containers, else cut back to a complete value
+        repaired = True
+        candidates.append("".join(out) + ('"' if in_string else '') + _closers(stack))
+        for length, open_stack in reversed(checkpoints[-8:]):
+            candidates.append("".join(out[:length]).rstrip().rstrip(',') + _closers(open_stack))
+
+    for candidate in candidates:
+        try:
+            return json.loads(candidate), repaired, end
+        except json.JSONDecodeError:
+            repaired = True
+    raise StructuredOutputError("Response JSON could not be repaired")
+
+
+def _json_values(text: str, openers: str = "{[") -> Iterator[Tuple[Any, bool, int]]:
+    # (value, repaired, start) of each top-level JSON value in a response, in order
+    parsed_until = 0
+    for attempt, start in enumerate(_json_starts(text, openers)):
+        if attempt == MAX_JSON_STARTS:
+            break
+        if start < parsed_until:
+            # Nested in a value already tried
+            continue
+        try:
+            value, repaired, parsed_until = _repair_at(text, start)
+        except StructuredOutputError:
+            continue
+        yield value, repaired, start
+
+
+def repair_json(text: str, openers: str = "{[") -> Tuple[Any, bool]:
+    """
+    Parse the first JSON value in a model response in one pass
+
+    Prose and code fences around it are skipped and trailing commas dropped.
+    A truncated response is closed at the last complete value. Pass
+    openers="{" to skip arrays such as citation markers ("[1][2]") in the
+    prose. Returns (value, repaired); raises StructuredOutputError when
+    nothing parses.
+    """
+    for value, repaired, _ in _json_values(text, openers):
+        return value, repaired
+    raise StructuredOutputError("No JSON object in response")
+
+
+@lru_cache(maxsize=None)
+def _schema_openers(schema: Type[BaseModel]) -> str:
+    # Bracket the schema's JSON starts with
+    return "[" if schema.model_json_schema().get("type") == "array" else "{"
+
+
+def normalize_structured(text: Optional[str], schema: Type[Model]) -> Tuple[Model, str]:
+    """
+    Repair and validate a response against a schema; raises StructuredOutputError
+    Returns the parsed value and the response text, rewritten as valid JSON
+    (after any prose) when it needed repairs.
+    """
+    if not text:
+        raise StructuredOutputError("Empty response")
+    openers = _schema_openers(schema)
+    error: Optional[StructuredOutputError] = None
+    # Prose may carry brackets of its own ("[1][2]" citations), so the payload
+    # is the first value that validates rather than the first that parses
+    for value, repaired, start in _json_values(text, openers):
+        try:
+            parsed = schema.model_validate(value)
+        except ValidationError as e:
+            error = error or StructuredOutputError(
+                f"Response does not match {schema.__name__}: {e.error_count()} errors")
+            continue
+        prose = text[:start]
+        if any(char in prose for char in openers):
+            # Readers take the JSON from the first bracket, so keep only the payload
+            return parsed, json.dumps(value)
+        if repaired:
+            text = prose + json.dumps(value)
+        return parsed, text
+    raise error or StructuredOutputError("No JSON object in response")
+
+
+def parse_structured(text: Optional[str], schema: Type[Model]) -> Model:
+    """Repair and validate a response against a schema; raises StructuredOutputError"""
+    return normalize_structured(text, schema)[0]
+
+
+def response_format_for(provider: str, schema: Type[BaseModel]) -> Optional[Dict]:
+    """json_schema response_format for providers that enforce it, None for the rest"""
+    if provider not in SCHEMA_PROVIDERS:
+        return None
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema(), "strict": False}
+    }
+
+
+async def structured_completion(provider: str, model: str, messages: List[Dict], schema: Type[Model],
+                                retries: Optional[int] = None, response_text: Optional[str] = None,
+                                **kwargs) -> Tuple[Model, str]:
+    """
+    Chat completion parsed into a schema, returning (value, response text)
+
+    The schema is enforced through response_format where the provider
+    supports it. A response that still does not validate is sent back with
+    the error for at most `retries` more attempts. Pass response_text to
+    validate a response that was already received (e.g. streamed) first.
+    """
+    retries = STRUCTURED_OUTPUT_RETRIES if retries is None else retries
+    response_format = response_format_for(provider, schema)
+    if response_format is not None:
+        kwargs["response_format"] = response_format
+
+    attempt_messages = list(messages)
+    for attempt in range(retries + 1):
+        if response_text is None or attempt > 0:
+            response_text = await llm_gateway.chat_completion(provider, model=model, messages=attempt_messages, **kwargs)
+        try:
+            return normalize_structured(response_text, schema)
+        except StructuredOutputError as e:
+            if attempt == retries:
+                raise
+            attempt_messages = list(messages) + [
+                {"role": "assistant", "content": response_text or ""},
+                {"role": "user", "content": f"That reply was not valid JSON for the requested format ({e}). "
+                                            f"Reply again with only the corrected JSON."}
+            ]
+
+
+def dump_structured(value: BaseModel) -> Any:
+    """Plain JSON-ready data of a parsed value"""
+    return value.model_dump()
@@ -0,0 +1,55 @@
+from typing import Dict, List, Optional
+from search_cache import CacheBackend, create_cache_backend
+import hashlib
+import json
+import re
+import os
+
+
+def _trim(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+class SummaryCache:
+    """
+    Cache for review summaries
+
+    Entries are keyed on a SHA-256 of the trimmed review content, the pros
+    and cons (trimmed and sorted, so scrape order does not matter) and the
+    summarization model. The same product scraped by two sessions gets the
+    same key, so its summary is only generated once.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 7 * 24 * 60 * 60):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def key(review_content: str, pros: List[str], cons: List[str], model: str) -> str:
+        payload = json.dumps({
+            'review': _trim(review_content),
+            'pros': sorted(filter(None, map(_trim, pros))),
+            'cons': sorted(filter(None, map(_trim, cons))),
+            'model': model
+        }, sort_keys=True)
+        return "summary:" + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, review_content: str, pros: List[str], cons: List[str], model: str) -> Optional[str]:
+        return self.backend.get(self.key(review_content, pros, cons, model))
+
+    def set(self, review_content: str, pros: List[str], cons: List[str], model: str, summary: str):
+        self.backend.set(self.key(review_content, pros, cons, model), summary, self.ttl)
+
+    def stats(self) -> Dict:
+        return self.backend.stats()
+
+    @classmethod
+    def from_env(cls) -> "SummaryCache":
+        """Configure from SUMMARY_CACHE_* environment variables"""
+        max_bytes = os.getenv("SUMMARY_CACHE_MAX_BYTES")
+        backend = create_cache_backend(
+            os.getenv("SUMMARY_CACHE_BACKEND", "memory"),
+            os.getenv("SUMMARY_CACHE_PATH", "summary_cache.sqlite3"),
+            int(max_bytes) if max_bytes else 16 * 1024 * 1024
+        )
+        return cls(backend, ttl=float(os.getenv("SUMMARY_CACHE_TTL", 7 * 24 * 60 * 60)))
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# The backend modules are imported flat, as main.py does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+class RespServer:
+    """
+    In-process stand-in for a Redis server, enough for the session backend
+    and the job queue
+
+    Speaks RESP2 over asyncio streams and keeps hashes with EXPIRE deadlines
+    on a clock that tests can advance(), and lists. stop() drops every open
+    connection, as a restarted server would.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+        self.lists = {}
+        self.deadlines = {}
+        self.offset = 0.0
+        self.port = None
+        self.commands = []
+        self._server = None
+        self._writers = set()
+
+    def now(self) -> float:
+        return time.monotonic() + self.offset
+
+    def advance(self, seconds: float):
+        self.offset += seconds
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", self.port or 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+
+    def _expire(self, key):
+        deadline = self.deadlines.get(key)
+        if deadline is not None and deadline <= self.now():
+            self.hashes.pop(key, None)
+            self.deadlines.pop(key, None)
+
+    @staticmethod
+    def _bulk(value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        data = value.encode("utf-8")
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    def _reply(self, args) -> bytes:
+        command, key = args[0].upper(), args[1] if len(args) > 1 else None
+        self.commands.append(command)
+        if key is not None:
+            self._expire(key)
+        if command == "PING":
+            return b"+PONG\r\n"
+        if command == "HSET":
+            fields = self.hashes.setdefault(key, {})
+            added = sum(1 for name in args[2::2] if name not in fields)
+            fields.update(zip(args[2::2], args[3::2]))
+            return b":%d\r\n" % added
+        if command == "HGETALL":
+            items = [item for pair in self.hashes.get(key, {}).items() for item in pair]
+            return b"*%d\r\n" % len(items) + b"".join(self._bulk(item) for item in items)
+        if command == "EXPIRE":
+            if key not in self.hashes:
+                return b":0\r\n"
+            self.deadlines[key] = self.now() + int(args[2])
+            return b":1\r\n"
+        if command == "TTL":
+            if key not in self.hashes:
+                return b":-2\r\n"
+            deadline = self.deadlines.get(key)
+            return b":%d\r\n" % (round(deadline - self.now()) if deadline is not None else -1)
+        if command == "LPUSH":
+            items = self.lists.setdefault(key, [])
+            items[:0] = reversed(args[2:])
+            return b":%d\r\n" % len(items)
+        if command in ("RPOPLPUSH", "BRPOPLPUSH"):
+            items = self.lists.get(key)
+            if not items:
+                return self._bulk(None)
+            value = items.pop()
+            self.lists.setdefault(args[2], []).insert(0, value)
+            return self._bulk(value)
+        if command == "LREM":
+            items, removed = self.lists.get(key, []), 0
+            while removed < int(args[2]) and args[3] in items:
+                items.remove(args[3])
+                removed += 1
+            return b":%d\r\n" % removed
+        if command == "LLEN":
+            return b":%d\r\n" % len(self.lists.get(key, []))
+        if command == "DEL":
+            self.deadlines.pop(key, None)
+            return b":%d\r\n" % (self.hashes.pop(key, None) is not None)
+        return b"-ERR unknown command '%s'\r\n" % command.encode("utf-8")
+
+    async def _handle(self, reader, writer):
+        self._writers.add(writer)
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                args = []
+                for _ in range(int(header[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2].decode("utf-8"))
+                if args[0].upper() == "BRPOPLPUSH":
+                    # Block until the list has an item or the timeout passes
+                    deadline = time.monotonic() + float(args[3])
+                    while not self.lists.get(args[1]) and time.monotonic() < deadline and not writer.is_closing():
+                        await asyncio.sleep(0.005)
+                writer.write(self._reply(args))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # A client gone mid-command, or the loop shutting down
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+@pytest.fixture
+def resp_server():
+    """A RespServer to start inside the test's event loop"""
+    return RespServer()
@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+import search_cache
+from search_cache import DiskCache, MemoryCache, SearchCache
+from summary_cache import SummaryCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(search_cache, "time", fake)
+    return fake
+
+
+@pytest.fixture(params=["memory", "disk"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryCache(max_bytes=100)
+    else:
+        cache = DiskCache(str(tmp_path / "cache.sqlite3"), max_bytes=100)
+        yield cache
+        cache.close()
+
+
+def test_get_set(backend):
+    assert backend.get("a") is None
+    backend.set("a", {"x": [1, 2]}, ttl=60)
+    assert backend.get("a") == {"x": [1, 2]}
+    backend.delete("a")
+    assert backend.get("a") is None
+    assert backend.stats()["hits"] == 1
+    assert backend.stats()["misses"] == 2
+
+
+def test_ttl_expiry(backend, clock):
+    backend.set("a", "value", ttl=10)
+    clock.now += 9
+    assert backend.get("a") == "value"
+    clock.now += 2
+    assert backend.get("a") is None
+    assert backend.stats()["expired"] == 1
+    assert len(backend) == 0
+
+
+def test_size_eviction_drops_least_recently_used(backend, clock):
+    # Each value is 42 bytes of JSON; the budget of 100 bytes holds two
+    for key in ("a", "b"):
+        backend.set(key, "x" * 40, ttl=60)
+        clock.now += 1
+    assert backend.get("a") is not None
+    clock.now += 1
+    backend.set("c", "x" * 40, ttl=60)
+    assert backend.get("b") is None
+    assert backend.get("a") is not None
+    assert backend.get("c") is not None
+    assert backend.size_bytes() <= backend.max_bytes
+    assert backend.stats()["evictions"] == 1
+
+
+def test_oversized_value_is_not_stored(backend):
+    backend.set("big", "x" * 200, ttl=60)
+    assert backend.get("big") is None
+
+
+def test_async_accessors(backend):
+    async def run():
+        await backend.aset("a", [1], ttl=60)
+        return await backend.aget("a")
+    assert asyncio.run(run()) == [1]
+
+
+def test_disk_cache_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = DiskCache(path)
+    first.set("a", "value", ttl=60)
+    first.close()
+    second = DiskCache(path)
+    assert second.get("a") == "value"
+    second.close()
+
+
+def test_search_cache_normalizes_queries():
+    cache = SearchCache(MemoryCache())
+
+    async def run():
+        await cache.set("  Sony   WH-1000XM5 ", "buy", {"shopping": []})
+        return await cache.get("sony wh-1000xm5", "buy"), await cache.get("sony wh-1000xm5", "review")
+    assert asyncio.run(run()) == ({"shopping": []}, None)
+
+
+REVIEW = "The Sony WH-1000XM5 has class-leading noise cancelling.\n\n  Battery lasts 30 hours."
+
+
+def test_summary_cache_key_ignores_whitespace_and_pro_order(backend):
+    cache = SummaryCache(backend)
+    cache.set(REVIEW, ["quiet", "light"], ["pricey"], "gpt-4o", "Great ANC.")
+    assert cache.get(" ".join(REVIEW.split()), ["light ", "quiet"], ["pricey"], "gpt-4o") == "Great ANC."
+
+
+@pytest.mark.parametrize("review, pros, model", [
+    (REVIEW.replace("30 hours", "20 hours"), ["quiet", "light"], "gpt-4o"),
+    (REVIEW, ["quiet"], "gpt-4o"),
+    (REVIEW, ["quiet", "light"], "gpt-4o-mini"),
+])
+def test_summary_cache_misses_when_the_input_changes(backend, review, pros, model):
+    cache = SummaryCache(backend)
+    cache.set(REVIEW, ["quiet", "light"], ["pricey"], "gpt-4o", "Great ANC.")
+    assert cache.get(review, pros, ["pricey"], model) is None
+
+
+def test_summary_cache_ttl_expiry(backend, clock):
+    cache = SummaryCache(backend, ttl=60)
+    cache.set(REVIEW, [], [], "gpt-4o", "Great ANC.")
+    clock.now += 59
+    assert cache.get(REVIEW, [], [], "gpt-4o") == "Great ANC."
+    clock.now += 2
+    assert cache.get(REVIEW, [], [], "gpt-4o") is None
+
+
+def test_summary_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "summaries.sqlite3")
+    first = SummaryCache(DiskCache(path))
+    first.set(REVIEW, ["quiet"], ["pricey"], "gpt-4o", "Great ANC.")
+    first.backend.close()
+    second = SummaryCache(DiskCache(path))
+    assert second.get(REVIEW, ["quiet"], ["pricey"], "gpt-4o") == "Great ANC."
+    second.backend.close()
@@ -0,0 +1,53 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+# Keep the review store off disk for the app module
+os.environ.setdefault("REVIEW_STORE_PATH", ":memory:")
+
+import main
+from streaming import RecommendationFeed
+
+RESPONSE = json.dumps({"overview": "o", "recommendations": [{"name": "Sony WH-1000XM5"}]})
+
+
+@pytest.fixture
+def clarifying_session(monkeypatch):
+    calls = []
+
+    async def generate(session_id, query_text, preferences, model_choice, **kwargs):
+        calls.append(kwargs)
+        return RESPONSE, RecommendationFeed()
+    monkeypatch.setattr(main, "generate_recommendations_with_details", generate)
+    main.conversation_store["clarifying"] = {"query": "headphones", "state": main.STATES["CLARIFYING"]}
+    yield calls
+    del main.conversation_store["clarifying"]
+
+
+def clarify(preferences):
+    return asyncio.run(main.process_clarification_response(
+        "clarifying", preferences, main.Query(message="sony", session_id="clarifying")))
+
+
+def test_clarification_reuses_speculation_when_specific_enough(monkeypatch, clarifying_session):
+    async def specific(query, preferences):
+        return True
+    monkeypatch.setattr(main, "is_query_specific_enough", specific)
+
+    assert clarify({"Brand": "Sony"}).response == RESPONSE
+    assert [call["base_query"] for call in clarifying_session] == ["headphones"]
+
+
+def test_clarification_reuses_speculation_after_reanalysis(monkeypatch, clarifying_session):
+    async def not_yet(query, preferences):
+        return False
+
+    async def analyze(query, preferences, model_choice):
+        return {"next_state": main.STATES["QUERYING"], "missing_info": [], "confidence": 0.9}
+    monkeypatch.setattr(main, "is_query_specific_enough", not_yet)
+    monkeypatch.setattr(main, "analyze_query_specificity", analyze)
+
+    assert clarify({"Brand": "Sony"}).response == RESPONSE
+    assert [call["base_query"] for call in clarifying_session] == ["headphones"]
@@ -0,0 +1,122 @@
+import asyncio
+
+from job_queue import RedisJobQueue, WorkerPool, new_job
+from resp_client import RespClient
+
+
+async def run_jobs(resp_server, handler, *jobs, queue=None, submit=True):
+    """Run jobs through a one-worker pool until each is done or failed; returns (statuses, queue)"""
+    queue = queue or RedisJobQueue(RespClient(resp_server.url), worker_name="w1")
+    statuses = []
+    finished = asyncio.Event()
+
+    async def on_status(job, status, error):
+        statuses.append((status, job['attempt'], error))
+        if sum(status in ("done", "failed") for status, _, _ in statuses) == len(jobs):
+            finished.set()
+
+    pool = WorkerPool(queue, {"detailing": handler}, concurrency=1, on_status=on_status,
+                      backoff_base=0.01, backoff_max=0.01)
+    if submit:
+        for job in jobs:
+            await queue.submit(job)
+    await pool.start()
+    await asyncio.wait_for(finished.wait(), 5)
+    # Let the worker ack the last job
+    await asyncio.sleep(0.05)
+    await pool.stop()
+    return statuses, queue
+
+
+def test_a_failing_job_is_retried_then_succeeds(resp_server):
+    calls = []
+
+    async def flaky(job):
+        calls.append(job['attempt'])
+        if len(calls) == 1:
+            raise RuntimeError("search timed out")
+
+    async def run():
+        await resp_server.start()
+        statuses, queue = await run_jobs(resp_server, flaky, new_job("detailing", {}))
+        processing = await queue.client.execute("LLEN", queue.processing_key)
+        await queue.aclose()
+        await resp_server.stop()
+        return statuses, queue.counters, processing
+
+    statuses, counters, processing = asyncio.run(run())
+    assert calls == [1, 2]
+    assert statuses == [("running", 1, None), ("retrying", 1, "search timed out"), ("running", 2, None), ("done", 2, None)]
+    assert counters['retried'] == 1 and counters['completed'] == 1 and counters['failed'] == 0
+    # Acked: nothing left on the worker's processing list
+    assert processing == 0
+
+
+def test_a_job_past_its_deadline_fails(resp_server):
+    async def slow(job):
+        await asyncio.sleep(10)
+
+    async def run():
+        await resp_server.start()
+        statuses, queue = await run_jobs(resp_server, slow, new_job("detailing", {}, max_attempts=1, timeout=0.05))
+        await queue.aclose()
+        await resp_server.stop()
+        return statuses, queue.counters
+
+    statuses, counters = asyncio.run(run())
+    assert statuses == [("running", 1, None), ("failed", 1, "deadline exceeded")]
+    assert counters['failed'] == 1
+
+
+def test_a_job_is_failed_after_max_attempts(resp_server):
+    async def broken(job):
+        raise RuntimeError("boom")
+
+    async def run():
+        await resp_server.start()
+        statuses, queue = await run_jobs(resp_server, broken, new_job("detailing", {}, max_attempts=3))
+        processing = await queue.client.execute("LLEN", queue.processing_key)
+        await queue.aclose()
+        await resp_server.stop()
+        return statuses, queue.counters, processing
+
+    statuses, counters, processing = asyncio.run(run())
+    assert [status for status, _, _ in statuses] == ["running", "retrying"] * 2 + ["running", "failed"]
+    assert statuses[-1] == ("failed", 3, "boom")
+    assert counters['retried'] == 2 and counters['failed'] == 1
+    assert processing == 0
+
+
+def test_a_restarted_worker_recovers_its_processing_list(resp_server):
+    handled = []
+
+    async def record(job):
+        handled.append(job['payload']['n'])
+
+    async def run():
+        await resp_server.start()
+        # A worker reserves two jobs and dies before acking them
+        crashed = RedisJobQueue(RespClient(resp_server.url), worker_name="w1")
+        jobs = [new_job("detailing", {'n': n}) for n in (1, 2)]
+        for job in jobs:
+            await crashed.submit(job)
+        await crashed.reserve(timeout=1)
+        await crashed.reserve(timeout=1)
+        await crashed.aclose()
+
+        # Only the worker with the same name picks its jobs back up
+        other = RedisJobQueue(RespClient(resp_server.url), worker_name="w2")
+        assert await other.recover() == 0
+        await other.aclose()
+
+        restarted = RedisJobQueue(RespClient(resp_server.url), worker_name="w1")
+        await run_jobs(resp_server, record, *jobs, queue=restarted, submit=False)
+        processing = await restarted.client.execute("LLEN", restarted.processing_key)
+        await restarted.aclose()
+        await resp_server.stop()
+        return restarted.counters, processing
+
+    counters, processing = asyncio.run(run())
+    assert sorted(handled) == [1, 2]
+    assert counters['recovered'] == 2 and counters['completed'] == 2
+    assert processing == 0
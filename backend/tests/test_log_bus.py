@@ -0,0 +1,59 @@
+import asyncio
+
+from log_bus import LogBus, current_session
+
+
+def messages(batch):
+    return [record['message'] for record in batch]
+
+
+def test_overflow_drops_the_oldest_lines_and_reports_them_once():
+    bus = LogBus(maxsize=3)
+    subscriber = bus.subscribe()
+    for n in range(5):
+        bus.publish(f"line {n}")
+
+    batch = asyncio.run(subscriber.next_batch())
+    assert messages(batch) == ["[Log] 2 log lines dropped (slow connection)", "line 2", "line 3", "line 4"]
+    assert bus.stats() == {'published': 5, 'subscribers': 1, 'dropped': 2}
+
+    # The drop notice is not repeated
+    bus.publish("line 5")
+    assert messages(asyncio.run(subscriber.next_batch())) == ["line 5"]
+
+
+def test_a_subscriber_only_sees_its_session():
+    bus = LogBus()
+    mine, everything = bus.subscribe("s1"), bus.subscribe()
+    bus.publish("for s1", session_id="s1")
+    bus.publish("for s2", session_id="s2")
+    # Untagged lines take the session of the request being served
+    token = current_session.set("s1")
+    try:
+        bus.publish("from the s1 request")
+    finally:
+        current_session.reset(token)
+
+    assert messages(asyncio.run(mine.next_batch())) == ["for s1", "from the s1 request"]
+    assert messages(asyncio.run(everything.next_batch())) == ["for s1", "for s2", "from the s1 request"]
+
+
+def test_unsubscribe_releases_the_queue_and_wakes_the_reader():
+    async def run():
+        bus = LogBus(maxsize=1)
+        subscriber = bus.subscribe()
+        bus.publish("a")
+        bus.publish("b")
+        await subscriber.next_batch()
+        reader = asyncio.create_task(subscriber.next_batch())
+        await asyncio.sleep(0)
+        bus.unsubscribe(subscriber)
+        last_batch = await asyncio.wait_for(reader, 1)
+        bus.publish("c")
+        return bus, subscriber, last_batch
+
+    bus, subscriber, last_batch = asyncio.run(run())
+    assert last_batch == []
+    assert subscriber.closed and len(subscriber._queue) == 0
+    # Its drops still count after it has left
+    assert bus.stats() == {'published': 3, 'subscribers': 0, 'dropped': 1}
@@ -0,0 +1,50 @@
+import asyncio
+import gc
+import time
+
+from outbound import OutboundScheduler
+
+
+def test_sequential_calls_to_one_host_are_throttled():
+    scheduler = OutboundScheduler(host_rate=4)
+
+    async def run():
+        started = time.monotonic()
+        for _ in range(6):
+            async with scheduler.slot("web", host="reviews.example.com"):
+                pass
+            # Nothing holds the host's limiter between calls
+            gc.collect()
+        return time.monotonic() - started
+
+    # A burst of 4, then one request every 0.25s
+    assert asyncio.run(run()) >= 0.45
+    assert scheduler.stats()['hosts_tracked'] == 1
+
+
+def test_idle_hosts_are_evicted_least_recently_used_first():
+    scheduler = OutboundScheduler(host_rate=0, max_hosts=2)
+
+    async def run():
+        for host in ("a.example", "b.example", "a.example", "c.example"):
+            async with scheduler.slot("web", host=host):
+                pass
+
+    asyncio.run(run())
+    assert list(scheduler._hosts) == ["a.example", "c.example"]
+
+
+def test_hosts_in_use_are_not_evicted():
+    scheduler = OutboundScheduler(host_rate=0, max_hosts=1)
+
+    async def run():
+        async with scheduler.slot("web", host="busy.example"):
+            busy = scheduler._hosts["busy.example"]
+            async with scheduler.slot("web", host="other.example"):
+                pass
+            return busy, scheduler._hosts.get("busy.example")
+
+    busy, kept = asyncio.run(run())
+    # Over budget while busy.example is in use; the next new host evicts down again
+    assert kept is busy
+    assert list(scheduler._hosts) == ["busy.example", "other.example"]
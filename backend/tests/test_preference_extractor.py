@@ -0,0 +1,38 @@
+import pytest
+
+from preference_extractor import PreferenceExtractor
+
+MIN_COVERAGE = 0.75
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    return PreferenceExtractor()
+
+
+@pytest.mark.parametrize("message, missing_info", [
+    ("not black", ["color"]),
+    ("no leather", ["material"]),
+    ("anything but Apple", ["brand"]),
+    ("Nike, not Adidas", ["brand"]),
+])
+def test_negated_answers_go_to_the_llm(extractor, message, missing_info):
+    assert extractor.extract(message, missing_info).coverage < MIN_COVERAGE
+
+
+def test_negation_inside_a_price_phrase_is_kept(extractor):
+    extraction = extractor.extract("no more than 1k", ["budget"])
+    assert extraction.preferences == {"Budget": "Under $1,000"}
+    assert extraction.coverage >= MIN_COVERAGE
+
+
+def test_only_asked_categories_are_extracted(extractor):
+    extraction = extractor.extract("I drink coffee, under 100", ["budget"])
+    assert extraction.preferences == {"Budget": "Under $100"}
+    assert extraction.coverage < MIN_COVERAGE
+    assert extractor.extract("black, size 10", ["color"]).preferences == {"Color": "Black"}
+
+
+def test_without_missing_info_every_category_is_extracted(extractor):
+    extraction = extractor.extract("Adidas, size 8, white, under $100")
+    assert extraction.preferences == {"Brand": "Adidas", "Size": "8", "Color": "White", "Budget": "Under $100"}
@@ -0,0 +1,35 @@
+import pytest
+
+from product_dedupe import ProductDeduplicator, product_key, same_product
+
+
+def same(a, b):
+    return same_product(product_key(a), product_key(b))
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Apple iPhone 15", "Apple iPhone 15 Case"),
+    ("Sony WH-1000XM5", "Sony WH-1000XM5 Ear Pads"),
+    ("Brooks Ghost 15", "Brooks Ghost 15 GTX"),
+    ("Hoka Clifton 9", "Hoka Clifton 9 Wide"),
+    ("Sony A7 IV", "Sony A7 III"),
+    ("Sony WH-1000XM5 Headphones", "Sony WH-1000XM5 Earbuds"),
+])
+def test_accessories_variants_and_generations_are_different_products(a, b):
+    assert not same(a, b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Apple iPhone 15", "iPhone 15 Smartphone"),
+    ("Brooks Ghost 15 GTX", "Brooks Ghost 15 Gore-Tex"),
+    ("Sony WH-1000XM5", "Sony WH1000XM5 Wireless Headphones"),
+])
+def test_spellings_of_one_product_match(a, b):
+    assert same(a, b)
+
+
+def test_every_member_of_a_group_must_match():
+    # Both match the bare name, but not each other
+    names = ["Sony WH-1000XM5", "Sony WH-1000XM5 Headphones", "Sony WH-1000XM5 Earbuds"]
+    merged = ProductDeduplicator().dedupe([{"name": name} for name in names])
+    assert [rec["name"] for rec in merged] == ["Sony WH-1000XM5", "Sony WH-1000XM5 Earbuds"]
@@ -0,0 +1,57 @@
+import pytest
+
+from query_classifier import classify_query, extract_signals
+
+
+@pytest.mark.parametrize("query", [
+    "mp3 player",
+    "gift for my 5yo",
+    "birthday gift for my 2yo son",
+    "a4 paper",
+    "covid19 test kit",
+    "usb-c cable",
+])
+def test_spec_and_age_tokens_are_not_model_numbers(query):
+    assert extract_signals(query)['models'] == []
+    assert classify_query(query).is_specific is not True
+
+
+@pytest.mark.parametrize("query", ["apple or samsung", "nike or adidas shoes", "sony vs bose headphones"])
+def test_brand_only_comparisons_go_to_the_llm(query):
+    assert classify_query(query).is_specific is None
+
+
+@pytest.mark.parametrize("query", [
+    "Samsung Galaxy S24 Ultra",
+    "Sony WH-1000XM5 vs Bose QC Ultra",
+    "Dell XPS 13 or MacBook Air M2",
+    "Kindle Paperwhite or Kobo Clara",
+    "Herman Miller Aeron vs Steelcase Leap",
+    "best PS5 controller under $80",
+])
+def test_named_models_and_products_are_specific(query):
+    assert classify_query(query).is_specific is True
+
+
+@pytest.mark.parametrize("query", [
+    "nike shoes 2024",
+    "nike size 10",
+    "adidas shoes size 9",
+    "best sony headphones 2025",
+    "apple gift for 2 kids",
+    "samsung 2 pack",
+    "ghost costume for 2 year old",
+])
+def test_years_sizes_and_counts_are_not_model_numbers(query):
+    assert extract_signals(query)['models'] == []
+    assert not classify_query(query).reasoning.startswith("Names a specific model")
+
+
+@pytest.mark.parametrize("query, model", [
+    ("rtx 4090", "rtx 4090"),
+    ("new balance 990", "new balance 990"),
+    ("airpods pro 2", "airpods pro 2"),
+    ("galaxy z fold 5", "galaxy z fold 5"),
+])
+def test_numbers_right_after_a_brand_or_line_are_models(query, model):
+    assert extract_signals(query)['models'] == [model]
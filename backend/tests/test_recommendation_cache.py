@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+from recommendation_cache import RecommendationCache, preference_drift
+from search_cache import MemoryCache
+
+RESPONSE = json.dumps({"recommendations": [{"name": "Sony WH-1000XM5"}]})
+
+
+def clarified(query, preferences):
+    # The query process_clarification_response generates with
+    return f"{query} with preferences: {json.dumps(preferences)}"
+
+
+def test_preference_drift_counts_answers_that_change_the_query():
+    assert preference_drift("Sony headphones", {"Brand": "Sony", "Color": "No preference"}) == 0.0
+    assert preference_drift("headphones", {"Brand": "any", "Budget": "Under $100"}) == 0.5
+    assert preference_drift("headphones", {}) == 0.0
+
+
+def test_speculative_entry_is_reused_for_a_clarified_query():
+    cache = RecommendationCache(MemoryCache())
+    preferences = {"Brand": "Sony", "Color": "Doesn't matter"}
+
+    async def run():
+        # Stored by the speculation, under the initial query and no preferences
+        await cache.set("Sony headphones", {}, "openai", RESPONSE)
+        return await cache.get(clarified("Sony headphones", preferences), preferences, "openai",
+                               base_query="Sony headphones")
+
+    assert asyncio.run(run()) == RESPONSE
+    assert cache.counters['preference_hits'] == 1
+    assert cache.stats()['hit_rate'] == 1.0
+
+
+def test_answers_that_change_the_query_are_not_served_the_base_entry():
+    cache = RecommendationCache(MemoryCache())
+    preferences = {"Budget": "Under $100"}
+
+    async def run():
+        await cache.set("headphones", {}, "openai", RESPONSE)
+        strict = await cache.get(clarified("headphones", preferences), preferences, "openai", base_query="headphones")
+        cache.max_preference_drift = 1.0
+        lenient = await cache.get(clarified("headphones", preferences), preferences, "openai", base_query="headphones")
+        return strict, lenient
+
+    strict, lenient = asyncio.run(run())
+    assert strict is None
+    assert lenient == RESPONSE
@@ -0,0 +1,80 @@
+import asyncio
+
+from resp_client import RespClient
+from session_store import RedisSessionBackend, SessionStore
+
+
+def test_round_trip_keeps_fields_and_types(resp_server):
+    async def run():
+        await resp_server.start()
+        backend = RedisSessionBackend(RespClient(resp_server.url))
+        await backend.save('s1', {'query': 'headphones', 'recommendations': [{'name': 'Sony WH-1000XM5'}], 'step': 2})
+        await backend.save('s1', {'step': 3})
+        loaded = await backend.load('s1')
+        missing = await backend.load('s2')
+        await backend.delete('s1')
+        deleted = await backend.load('s1')
+        await backend.aclose()
+        await resp_server.stop()
+        return loaded, missing, deleted
+
+    loaded, missing, deleted = asyncio.run(run())
+    assert loaded == {'query': 'headphones', 'recommendations': [{'name': 'Sony WH-1000XM5'}], 'step': 3}
+    assert missing is None
+    assert deleted is None
+
+
+def test_saved_sessions_expire_after_ttl(resp_server):
+    async def run():
+        await resp_server.start()
+        client = RespClient(resp_server.url)
+        backend = RedisSessionBackend(client, ttl=60)
+        await backend.save('s1', {'query': 'tent'})
+        ttl = await client.execute("TTL", "session:s1")
+        resp_server.advance(30)
+        # Each save refreshes the deadline
+        await backend.save('s1', {'step': 1})
+        resp_server.advance(45)
+        alive = await backend.load('s1')
+        resp_server.advance(20)
+        expired = await backend.load('s1')
+        await backend.aclose()
+        await resp_server.stop()
+        return ttl, alive, expired
+
+    ttl, alive, expired = asyncio.run(run())
+    assert ttl == 60
+    assert alive == {'query': 'tent', 'step': 1}
+    assert expired is None
+
+
+def test_client_reconnects_after_server_restart(resp_server):
+    async def run():
+        await resp_server.start()
+        backend = RedisSessionBackend(RespClient(resp_server.url))
+        await backend.save('s1', {'query': 'kettle'})
+        # The pooled connection dies with the server; data survives the restart
+        await resp_server.stop()
+        await resp_server.start()
+        loaded = await backend.load('s1')
+        await backend.aclose()
+        await resp_server.stop()
+        return loaded
+
+    assert asyncio.run(run()) == {'query': 'kettle'}
+
+
+def test_store_reads_sessions_written_by_another_worker(resp_server):
+    async def run():
+        await resp_server.start()
+        writer = SessionStore(backend=RedisSessionBackend(RespClient(resp_server.url)))
+        reader = SessionStore(backend=RedisSessionBackend(RespClient(resp_server.url)))
+        writer['s1'] = {'query': 'desk lamp'}
+        await writer.save('s1')
+        loaded = await reader.load('s1')
+        await writer.backend.aclose()
+        await reader.backend.aclose()
+        await resp_server.stop()
+        return loaded
+
+    assert asyncio.run(run())['query'] == 'desk lamp'
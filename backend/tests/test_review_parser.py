@@ -0,0 +1,50 @@
+import asyncio
+
+import httpx
+
+from fetcher import PageFetcher
+from review_parser import ReviewParser, reduce_html
+
+ARTICLE = (
+    "<html><head><script>var tracking = 1;</script><style>p { color: red }</style></head><body>"
+    "<nav class='menu'>Home, Reviews, Deals</nav>"
+    "<article class='review'>"
+    "<p>The Caf\xe9 Pro grinder is quiet, consistent and easy to clean, even after weeks of use.</p>"
+    "<p>Grind size holds steady from espresso to French press, which few grinders manage.</p>"
+    "</article></body></html>"
+)
+
+
+class StubRegistry:
+    def __init__(self, handler):
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    def get(self, name):
+        return self.client
+
+
+def test_reduce_html_decodes_and_drops_scripts():
+    reduced = reduce_html(ARTICLE.encode("latin-1"), "latin-1")
+    assert "tracking" not in reduced and "color: red" not in reduced
+    assert "Caf\xe9 Pro" in reduced
+    assert '<article class="review">' in reduced
+
+
+def test_parse_page_extracts_article_text():
+    parser = ReviewParser(workers=0, backend="html.parser")
+    text = asyncio.run(parser.parse_page(ARTICLE.encode("latin-1"), "latin-1"))
+    assert text.startswith("The Caf\xe9 Pro grinder")
+    assert "Home, Reviews" not in text
+    assert parser.stats()['parsed'] == 1
+
+
+def test_fetch_returns_raw_body_up_to_max_bytes():
+    def handler(request):
+        return httpx.Response(200, content=ARTICLE.encode("latin-1"),
+                              headers={"Content-Type": "text/html; charset=latin-1", "ETag": '"v1"'})
+
+    fetcher = PageFetcher(StubRegistry(handler), max_bytes=100)
+    result = asyncio.run(fetcher.fetch("https://example.com/review"))
+    assert result['body'] == ARTICLE.encode("latin-1")[:100]
+    assert result['charset'] == "latin-1"
+    assert result['truncated'] and result['etag'] == '"v1"'
@@ -0,0 +1,33 @@
+import asyncio
+
+import review_store
+from review_store import ReviewStore
+
+
+def test_round_trip_and_url_normalization():
+    store = ReviewStore()
+    store.put("https://Example.com/review/?utm_source=x", "Great headphones", etag='"v1"')
+    entry = store.lookup("https://example.com/review")
+    assert entry == {'text': "Great headphones", 'etag': '"v1"', 'last_modified': None, 'fresh': True}
+
+
+def test_stale_entry_is_still_returned(monkeypatch):
+    store = ReviewStore(max_age=60)
+    store.put("https://example.com/a", "old text")
+    now = review_store.time.time()
+    monkeypatch.setattr(review_store.time, "time", lambda: now + 120)
+    entry = store.lookup("https://example.com/a")
+    assert entry['text'] == "old text" and not entry['fresh']
+    store.mark_revalidated("https://example.com/a")
+    assert store.lookup("https://example.com/a")['fresh']
+
+
+def test_async_accessors_share_blobs():
+    store = ReviewStore()
+
+    async def run():
+        await store.aput("https://example.com/a", "same text")
+        await store.aput("https://example.com/b", "same text")
+        return await store.alookup("https://example.com/b")
+    assert asyncio.run(run())['text'] == "same text"
+    assert store.stats()['blobs'] == 1
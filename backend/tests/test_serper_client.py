@@ -0,0 +1,82 @@
+import asyncio
+
+import httpx
+import pytest
+
+from serper_client import SerperClient, SerperError
+
+
+class MockRegistry:
+    """Registry stand-in serving one AsyncClient on an httpx.MockTransport that counts calls"""
+
+    def __init__(self, responses, delay=0.0):
+        self.calls = []
+        self._responses = list(responses)
+        self._delay = delay
+        self._client = httpx.AsyncClient(transport=httpx.MockTransport(self._handle),
+                                         base_url="https://google.serper.dev")
+
+    async def _handle(self, request):
+        self.calls.append((request.url.path, request.content))
+        await asyncio.sleep(self._delay)
+        status, headers = self._responses.pop(0) if len(self._responses) > 1 else self._responses[0]
+        return httpx.Response(status, headers=headers, json={'shopping': [{'title': 'Sony WH-1000XM5'}]})
+
+    def get(self, name):
+        assert name == "serper"
+        return self._client
+
+
+def serper(registry, **kwargs):
+    return SerperClient(registry, max_retries=3, backoff_base=0.001, backoff_max=0.01, **kwargs)
+
+
+def test_concurrent_identical_searches_share_one_request():
+    registry = MockRegistry([(200, {})], delay=0.05)
+    client = serper(registry)
+
+    async def run():
+        return await asyncio.gather(
+            client.search("Sony WH-1000XM5", "buy"),
+            client.search("  sony   wh-1000xm5 ", "buy"),
+            client.search("Sony WH-1000XM5", "buy"),
+            client.search("Sony WH-1000XM5", "review"),
+        )
+
+    results = asyncio.run(run())
+    assert len(registry.calls) == 2
+    assert {path for path, _ in registry.calls} == {"/shopping", "/search"}
+    assert results[0] == results[1] == results[2]
+    assert client.stats['coalesced'] == 2
+    # Finished requests are not shared with later searches
+    asyncio.run(client.search("Sony WH-1000XM5", "buy"))
+    assert len(registry.calls) == 3
+
+
+def test_rate_limits_and_server_errors_are_retried():
+    registry = MockRegistry([(429, {'Retry-After': '0'}), (503, {}), (200, {})])
+    client = serper(registry)
+
+    result = asyncio.run(client.search("tent", "buy"))
+    assert result == {'shopping': [{'title': 'Sony WH-1000XM5'}]}
+    assert len(registry.calls) == 3
+    assert client.stats['retries'] == 2 and client.stats['errors'] == 0
+
+
+def test_search_fails_after_the_last_retry():
+    registry = MockRegistry([(500, {})])
+    client = serper(registry)
+
+    with pytest.raises(SerperError, match="after 4 attempts"):
+        asyncio.run(client.search("tent", "buy"))
+    assert len(registry.calls) == 4
+    assert client.stats['errors'] == 1
+
+
+def test_client_errors_are_not_retried():
+    registry = MockRegistry([(403, {})])
+    client = serper(registry)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(client.search("tent", "buy"))
+    assert len(registry.calls) == 1
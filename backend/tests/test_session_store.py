@@ -0,0 +1,92 @@
+import asyncio
+
+from session_store import SessionStore
+
+
+def test_new_session_evicts_least_recently_used():
+    store = SessionStore(max_sessions=2, ttl=0)
+    store['a'] = {'query': 'a'}
+    store['b'] = {'query': 'b'}
+    store['a']
+    store['c'] = {'query': 'c'}
+    assert list(store) == ['a', 'c']
+    assert store.counters['evicted'] == 1
+
+
+def test_updates_never_evict_the_session_being_written():
+    store = SessionStore(max_bytes=400, ttl=0)
+    store['a'] = {'query': 'a'}
+    store['b'] = {'query': 'b'}
+    # Growing an existing session past the budget does not sweep mid-request
+    store['b'] = {'query': 'b', 'product_details': 'x' * 1000}
+    assert 'a' in store and 'b' in store
+    # A new session sweeps, but never evicts itself
+    store['c'] = {'query': 'c' * 1000}
+    assert 'c' in store
+    assert 'a' not in store and 'b' not in store
+
+
+def test_timer_sweep_expires_idle_sessions():
+    store = SessionStore(ttl=60)
+    store['old'] = {}
+    store['new'] = {}
+    # Goes idle after both inserts, so only the timer can expire it
+    store['old']['last_update'] = '2000-01-01T00:00:00'
+    store._used['old'] = 0
+
+    async def run():
+        sweeper = asyncio.create_task(store.run_sweeper(interval=0.01))
+        await asyncio.sleep(0.05)
+        sweeper.cancel()
+    asyncio.run(run())
+    assert list(store) == ['new']
+    assert store.counters['expired'] == 1
+
+
+def test_sessions_with_running_detailing_are_not_evicted_for_space():
+    async def run():
+        store = SessionStore(max_sessions=1, ttl=0)
+        task = asyncio.create_task(asyncio.sleep(10))
+        store['a'] = {'background_task': task}
+        store['b'] = {}
+        await asyncio.sleep(0)
+        evicted_busy = 'a' not in store
+        task.cancel()
+        await asyncio.sleep(0)
+        store['c'] = {}
+        return evicted_busy, list(store)
+    assert asyncio.run(run()) == (False, ['c'])
+
+
+def test_expiring_a_session_cancels_its_detailing_task():
+    async def run():
+        store = SessionStore(ttl=60)
+        task = asyncio.create_task(asyncio.sleep(10))
+        store['a'] = {'background_task': task, 'last_update': '2000-01-01T00:00:00'}
+        store._used['a'] = 0
+        store['b'] = {}
+        await asyncio.sleep(0)
+        return task.cancelled(), store.counters['cancelled_tasks']
+    assert asyncio.run(run()) == (True, 1)
+
+
+def test_pinned_sessions_survive_budget_pressure():
+    store = SessionStore(max_sessions=2, max_bytes=400, ttl=60)
+    store['a'] = {'query': 'a'}
+    store.pin('a')
+    store.pin('a')
+    store['b'] = {'query': 'b'}
+    store['c'] = {'query': 'c' * 1000}
+    # The request still awaiting the LLM can write its result
+    store['a']['state'] = 'recommending'
+    store['a']['last_update'] = '2000-01-01T00:00:00'
+    store._used['a'] = 0
+    store.sweep()
+    assert 'a' in store and 'b' not in store
+    store.unpin('a')
+    store.sweep()
+    assert 'a' in store
+    store.unpin('a')
+    store.sweep()
+    assert 'a' not in store
+    assert store._pins == {}
@@ -0,0 +1,36 @@
+import asyncio
+
+from streaming import RecommendationFeed, RecommendationStreamParser
+
+
+async def drain(feed):
+    return [recommendation['name'] async for recommendation in feed]
+
+
+def test_finish_adds_products_beyond_the_streamed_ones():
+    feed = RecommendationFeed()
+    feed.put({'name': 'Sony WH-1000XM5'})
+    assert feed.finish([{'name': 'sony wh-1000xm5 '}, {'name': 'Bose QC Ultra'}])
+    assert asyncio.run(drain(feed)) == ['Sony WH-1000XM5', 'Bose QC Ultra']
+
+
+def test_finish_restarts_when_the_final_list_differs():
+    restarted = []
+    feed = RecommendationFeed()
+    feed.on_restart = restarted.append
+    feed.put({'name': 'Stale product'})
+    final = [{'name': 'Sony WH-1000XM5'}, {'name': 'Stale product'}]
+    assert not feed.finish(final)
+    assert feed.closed
+    assert restarted == [final]
+    # Nothing from the final list reaches the old consumer
+    assert asyncio.run(drain(feed)) == ['Stale product']
+
+
+def test_stream_parser_yields_each_object_once_complete():
+    parser = RecommendationStreamParser()
+    text = 'Overview: x\n{"overview": "o", "recommendations": [{"name": "A", "pros": ["}"]}, {"name": "B"}]}'
+    names = []
+    for start in range(0, len(text), 7):
+        names += [recommendation['name'] for recommendation in parser.feed(text[start:start + 7])]
+    assert names == ['A', 'B']
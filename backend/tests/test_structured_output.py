@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+import llm_gateway
+from structured_output import (RecommendationResponse, SpecificityAnalysis, StructuredOutputError,
+                               normalize_structured, repair_json, structured_completion)
+
+PAYLOAD = '{"overview": "o", "recommendations": [{"name": "A", "price": "$1,299.99"}]}'
+
+
+def test_repair_json_skips_a_prose_preamble():
+    assert repair_json('Here are my picks:\n' + PAYLOAD) == (
+        {"overview": "o", "recommendations": [{"name": "A", "price": "$1,299.99"}]}, False)
+
+
+def test_repair_json_skips_code_fences():
+    value, repaired = repair_json('```json\n{"a": [1, 2]}\n```')
+    assert value == {"a": [1, 2]}
+    assert not repaired
+
+
+def test_repair_json_drops_trailing_commas():
+    assert repair_json('{"a": [1, 2,], "b": {"c": 3,},}') == ({"a": [1, 2], "b": {"c": 3}}, True)
+
+
+def test_repair_json_closes_truncated_output():
+    value, repaired = repair_json('{"recommendations": [{"name": "A"}, {"name": "B", "pros": ["lig')
+    assert repaired
+    assert value["recommendations"][0] == {"name": "A"}
+    assert value["recommendations"][1]["name"] == "B"
+
+
+def test_repair_json_skips_citation_brackets_for_objects():
+    text = 'Overview: a few options [1][2].\n' + PAYLOAD
+    assert repair_json(text)[0] == [1]
+    assert repair_json(text, openers="{")[0]["overview"] == "o"
+
+
+def test_normalize_takes_the_first_value_that_validates():
+    text = 'Overview: options {see below} [1][2].\n{"note": 1}\n' + PAYLOAD
+    parsed, normalized = normalize_structured(text, RecommendationResponse)
+    assert parsed.recommendations[0].name == "A"
+    assert parsed.recommendations[0].price == 1299.99
+    # Readers take the JSON from the first brace
+    assert normalized[normalized.index('{'):] == normalized
+    assert normalized.startswith('{"overview"')
+
+
+def test_normalize_keeps_plain_prose_before_the_payload():
+    text = 'Overview: options [1][2].\n' + PAYLOAD
+    assert normalize_structured(text, RecommendationResponse)[1] == text
+
+
+def test_normalize_reports_a_schema_mismatch():
+    with pytest.raises(StructuredOutputError, match="does not match RecommendationResponse"):
+        normalize_structured('{"overview": "o"}', RecommendationResponse)
+
+
+def test_structured_completion_retries_once_with_the_error(monkeypatch):
+    replies = iter(['{"is_specific": "maybe"', '{"is_specific": true, "confidence": 0.9}'])
+    calls = []
+
+    async def fake_completion(provider, messages, model=None, **kwargs):
+        calls.append(messages)
+        return next(replies)
+    monkeypatch.setattr(llm_gateway, "chat_completion", fake_completion)
+
+    parsed, _ = asyncio.run(structured_completion("perplexity", "sonar-pro",
+                                                  [{"role": "user", "content": "q"}],
+                                                  SpecificityAnalysis, retries=1))
+    assert parsed.is_specific and parsed.confidence == 0.9
+    assert len(calls) == 2
+    assert calls[1][1] == {"role": "assistant", "content": '{"is_specific": "maybe"'}
+    assert "not valid JSON" in calls[1][2]["content"]
+
+
+def test_structured_completion_gives_up_after_the_retries(monkeypatch):
+    calls = []
+
+    async def fake_completion(provider, messages, model=None, **kwargs):
+        calls.append(messages)
+        return "no JSON here"
+    monkeypatch.setattr(llm_gateway, "chat_completion", fake_completion)
+
+    with pytest.raises(StructuredOutputError):
+        asyncio.run(structured_completion("perplexity", "sonar-pro", [{"role": "user", "content": "q"}],
+                                          SpecificityAnalysis, retries=1))
+    assert len(calls) == 2
@@ -0,0 +1,28 @@
+"""
+Detailing worker process
+
+Consumes product detailing jobs queued by the web process. Run with the same
+environment as the API plus DETAILING_QUEUE=redis and SESSION_BACKEND=redis
+(both pointing at REDIS_URL); scale it independently of the web dynos.
+"""
+import asyncio
+from main import client_registry, conversation_store, detailing_pool, detailing_queue, log, review_parser
+
+
+async def run_worker():
+    if detailing_queue is None or not detailing_queue.external or not conversation_store.shared:
+        raise SystemExit("worker.py needs DETAILING_QUEUE=redis and SESSION_BACKEND=redis")
+    
+    client_registry.start()
+    await log(f"Detailing worker {detailing_queue.worker_name} started with {detailing_pool.concurrency} slots")
+    try:
+        await detailing_pool.run_forever()
+    finally:
+        await detailing_queue.aclose()
+        review_parser.shutdown()
+        await conversation_store.backend.aclose()
+        await client_registry.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
@@ -85,57 +85,57 @@ const ClarifyingQuestions = ({ questions, onAnswer, selectedPreferences }) => (
   </div>
 );
 
-const OverviewMessage = ({ content }) => {
-  const [displayedText, setDisplayedText] = useState("");
-  const [isStreaming, setIsStreaming] = useState(true);
+// Overview text of a recommendation response, read up to where it has streamed so far
+const extractOverview = (text) => {
+  const match = /"overview"\s*:\s*"/.exec(text || "");
+  if (!match) return null;
+
+  let value = "";
+  for (let i = match.index + match[0].length; i < text.length; i++) {
+    const char = text[i];
+    if (char === "\\") {
+      // An escape cut off at the end of the stream is completed by the next token
+      if (i + 1 >= text.length) break;
+      value += char + text[i + 1];
+      i++;
+    } else if (char === '"') {
+      break;
+    } else {
+      value += char;
+    }
+  }
 
-  useEffect(() => {
-    try {
-      if (!content) {
-        setIsStreaming(false);
-        return;
-      }
+  try {
+    return JSON.parse(`"${value}"`);
+  } catch (err) {
+    return value;
+  }
+};
 
-      const jsonStart = content.indexOf("{");
-      const jsonEnd = content.lastIndexOf("}") + 1;
+// Overview of a recommendation response; while streaming it grows with each token
+const OverviewMessage = ({ content, streaming = false }) => {
+  let displayedText = extractOverview(content);
+
+  if (!displayedText && !streaming) {
+    try {
+      const jsonStart = (content || "").indexOf("{");
+      const jsonEnd = (content || "").lastIndexOf("}") + 1;
 
       // Check for valid JSON positions
       if (jsonStart === -1 || jsonEnd <= jsonStart) {
-        setIsStreaming(false);
-        setDisplayedText("Unable to parse overview data. Please try again.");
-        return;
+        displayedText = "Unable to parse overview data. Please try again.";
+      } else {
+        const parsedJson = JSON.parse(content.substring(jsonStart, jsonEnd));
+        displayedText =
+          parsedJson && parsedJson.overview
+            ? parsedJson.overview
+            : "No overview available for this recommendation.";
       }
-
-      const jsonStr = content.substring(jsonStart, jsonEnd);
-      const parsedJson = JSON.parse(jsonStr);
-
-      // Check if overview exists
-      if (!parsedJson || !parsedJson.overview) {
-        setIsStreaming(false);
-        setDisplayedText("No overview available for this recommendation.");
-        return;
-      }
-
-      const overview = parsedJson.overview;
-
-      let currentIndex = 0;
-      const streamInterval = setInterval(() => {
-        if (currentIndex <= overview.length) {
-          setDisplayedText(overview.slice(0, currentIndex));
-          currentIndex++;
-        } else {
-          clearInterval(streamInterval);
-          setIsStreaming(false);
-        }
-      }, 20); // Adjust speed as needed
-
-      return () => clearInterval(streamInterval);
     } catch (err) {
       console.error("Failed to parse overview:", err);
-      setIsStreaming(false);
-      setDisplayedText("An error occurred while processing the overview.");
+      displayedText = "An error occurred while processing the overview.";
     }
-  }, [content]);
+  }
 
   return (
     <div className="flex items-center gap-4 mb-6">
@@ -144,7 +144,7 @@ const OverviewMessage = ({ content }) => {
       </div>
       <div className="bg-gray-100 py-3 px-4 rounded-2xl text-gray-700">
         {displayedText}
-        {isStreaming && <span className="animate-pulse">▋</span>}
+        {streaming && <span className="animate-pulse">▋</span>}
       </div>
     </div>
   );
@@ -312,8 +312,87 @@ const App = () => {
     }
   };
 
+  // Streaming API request handler (/api/chat/stream, Server-Sent Events over a POST)
+  // onText(text) receives the response text generated so far; resolves with the
+  // same data as /api/chat, which is used instead if the stream cannot be opened
+  const streamRequest = async (
+    message,
+    preferences,
+    sessionId,
+    isFollowup,
+    modelChoice,
+    onText
+  ) => {
+    let res = null;
+    try {
+      res = await fetch(`${API_URL}/api/chat/stream`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+        },
+        body: JSON.stringify({
+          message,
+          preferences,
+          session_id: sessionId,
+          is_followup: isFollowup,
+          model_choice: modelChoice,
+        }),
+      });
+    } catch (err) {
+      console.error("Streaming request failed, falling back:", err);
+    }
+
+    if (!res || !res.ok || !res.body || typeof TextDecoder === "undefined") {
+      return sendRequest(message, preferences, sessionId, isFollowup, modelChoice);
+    }
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let text = "";
+
+    try {
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Frames are "event: <name>\ndata: <json>\n\n"
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+          const frame = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+
+          let event = "message";
+          let data = "";
+          for (const line of frame.split("\n")) {
+            if (line.startsWith("event:")) event = line.slice(6).trim();
+            else if (line.startsWith("data:")) data += line.slice(5).trim();
+          }
+          if (!data) continue;
+          const payload = JSON.parse(data);
+
+          if (event === "token") {
+            text += payload.text;
+            onText(text);
+          } else if (event === "done") {
+            reader.cancel();
+            return payload;
+          } else if (event === "error") {
+            reader.cancel();
+            throw new Error(payload.detail);
+          }
+        }
+      }
+    } catch (err) {
+      throw new Error("API request failed: " + err.message);
+    }
+    throw new Error("API request failed: the response stream ended early");
+  };
+
   // Process recommendations and fetch product details
-  const processRecommendations = async (data, sessionId) => {
+  // onProduct(recommendations, index, productDetail) is called for each product as soon as it is detailed
+  const processRecommendations = async (data, sessionId, onProduct) => {
     // Helper to extract recommendations from response
     const extractRecommendations = (responseText) => {
       try {
@@ -367,14 +446,60 @@ const App = () => {
       });
     };
 
+    // Receive product details pushed by the server, falling back to polling
+    const subscribeToProductDetails = (sessionId, onProductEvent) => {
+      if (typeof EventSource === "undefined") {
+        return pollForProductDetails(sessionId);
+      }
+
+      return new Promise((resolve, reject) => {
+        const source = new EventSource(
+          `${API_URL}/api/product-details/${sessionId}/events`
+        );
+        let settled = false;
+
+        // Each product is pushed as soon as its details are ready
+        source.addEventListener("product", (event) => {
+          try {
+            const { index, product_detail } = JSON.parse(event.data);
+            onProductEvent(index, product_detail);
+          } catch (err) {
+            console.error("Error parsing product event:", err);
+          }
+        });
+
+        source.addEventListener("ready", (event) => {
+          settled = true;
+          source.close();
+          try {
+            resolve(JSON.parse(event.data));
+          } catch (err) {
+            reject(err);
+          }
+        });
+
+        source.onerror = () => {
+          source.close();
+          if (!settled) {
+            settled = true;
+            pollForProductDetails(sessionId).then(resolve, reject);
+          }
+        };
+      });
+    };
+
     // Parse the original response for recommendations
     const parsedResponse = extractRecommendations(data.response);
+    const recommendations = parsedResponse.recommendations || [];
 
-    // Wait for product details to be ready
-    const detailsData = await pollForProductDetails(sessionId);
+    // Wait for product details to be ready, showing each product as it arrives
+    const detailsData = await subscribeToProductDetails(
+      sessionId,
+      (index, productDetail) => onProduct(recommendations, index, productDetail)
+    );
 
     return {
-      recommendations: parsedResponse.recommendations || [],
+      recommendations,
       details: detailsData.product_details || [],
       overview: parsedResponse.overview || null,
     };
@@ -426,14 +551,43 @@ const App = () => {
       content: isFollowup ? "AI is thinking..." : "Analyzing your needs...",
     });
 
+    // The overview is shown as soon as its first tokens arrive
+    const overviewMessageId = `overview-${Date.now()}`;
+    let overviewShown = false;
+
+    const updateOverview = (update) => {
+      setMessages((prev) =>
+        prev.map((msg) =>
+          msg.id === overviewMessageId ? { ...msg, ...update } : msg
+        )
+      );
+    };
+
+    const showStreamedText = (text) => {
+      if (!overviewShown) {
+        if (extractOverview(text) === null) return;
+        overviewShown = true;
+        removeLoadingMessages();
+        addToMessageQueue({
+          type: "json_output",
+          id: overviewMessageId,
+          content: text,
+          streaming: true,
+        });
+      } else {
+        updateOverview({ content: text });
+      }
+    };
+
     try {
       // Make API request
-      const data = await sendRequest(
+      const data = await streamRequest(
         message,
         preferences,
         sessionId,
         isFollowup,
-        modelChoice
+        modelChoice,
+        showStreamedText
       );
       removeLoadingMessages();
 
@@ -448,6 +602,9 @@ const App = () => {
 
       if (clarifyingQuestions) {
         // We need clarification - show questions and update state
+        if (overviewShown) {
+          setMessages((prev) => prev.filter((msg) => msg.id !== overviewMessageId));
+        }
         setIsClarified(false);
         setClarifyingQuestions(clarifyingQuestions);
 
@@ -471,11 +628,16 @@ const App = () => {
       setIsClarified(true);
       setClarifyingQuestions(null);
 
-      // Immediately show JSON response (for overview)
-      addToMessageQueue({
-        type: "json_output",
-        content: data.response,
-      });
+      // Show the overview, or complete the one streamed so far
+      if (overviewShown) {
+        updateOverview({ content: data.response, streaming: false });
+      } else {
+        addToMessageQueue({
+          type: "json_output",
+          id: overviewMessageId,
+          content: data.response,
+        });
+      }
 
       // Add the loading message for product details
       addToMessageQueue({
@@ -483,17 +645,13 @@ const App = () => {
         content: "Fetching recommendation details...",
       });
 
-      // Process recommendations and fetch product details
-      try {
-        const results = await processRecommendations(
-          data,
-          data.session_id || sessionId
-        );
+      // Product cards are shown with the first detailed product and filled in as the rest arrive
+      const productsMessageId = `products-${Date.now()}`;
+      let productsShown = false;
 
-        // Remove loading messages
+      const showProducts = (recommendations, details) => {
+        productsShown = true;
         removeLoadingMessages();
-
-        // Add assistant message and product cards
         addToMessageQueue([
           {
             type: "assistant",
@@ -501,12 +659,60 @@ const App = () => {
           },
           {
             type: "products",
-            content: {
-              recommendations: results.recommendations,
-              details: results.details,
-            },
+            id: productsMessageId,
+            content: { recommendations, details },
           },
         ]);
+      };
+
+      const updateProductDetails = (updateDetails) => {
+        setMessages((prev) =>
+          prev.map((msg) =>
+            msg.id === productsMessageId
+              ? {
+                  ...msg,
+                  content: {
+                    ...msg.content,
+                    details: updateDetails(msg.content.details),
+                  },
+                }
+              : msg
+          )
+        );
+      };
+
+      const handleProductDetail = (recommendations, index, productDetail) => {
+        if (!productsShown) {
+          showProducts(recommendations, []);
+          addToMessageQueue({
+            type: "loading",
+            content: "Fetching remaining product details...",
+          });
+        }
+        updateProductDetails((details) => {
+          const nextDetails = [...(details || [])];
+          nextDetails[index] = productDetail;
+          return nextDetails;
+        });
+      };
+
+      // Process recommendations and fetch product details
+      try {
+        const results = await processRecommendations(
+          data,
+          data.session_id || sessionId,
+          handleProductDetail
+        );
+
+        // Remove loading messages
+        removeLoadingMessages();
+
+        // Add assistant message and product cards, or complete the ones already shown
+        if (productsShown) {
+          updateProductDetails(() => results.details);
+        } else {
+          showProducts(results.recommendations, results.details);
+        }
 
         // Update state
         setRecommendations(results.recommendations);
@@ -524,6 +730,9 @@ const App = () => {
     } catch (err) {
       console.error("Error sending query:", err);
       removeLoadingMessages();
+      if (overviewShown) {
+        updateOverview({ streaming: false });
+      }
       setError("Error: " + err.message);
     } finally {
       setLoading(false);
@@ -647,7 +856,12 @@ const App = () => {
 
             case "json_output":
               // Replace JSONDisplay with OverviewMessage
-              return <OverviewMessage content={message.content} />;
+              return (
+                <OverviewMessage
+                  content={message.content}
+                  streaming={message.streaming}
+                />
+              );
 
             case "clarification":
               return (